@@ -0,0 +1,154 @@
+"""Admission control: concurrency limits with a bounded, prioritised wait queue."""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+# Waiting requests are admitted in this order
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class Rejected(Exception):
+    """A request that was not admitted.
+
+    status is 429 when the wait queue is full and 503 when the request waited
+    too long; retry_after is a suggested delay in seconds.
+    """
+
+    def __init__(self, status: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Admission:
+    """Lets at most limit requests run at once; up to max_queue more wait.
+
+    Waiting requests are admitted interactive first, then batch, in arrival
+    order within a priority. Everything blocks (call from a worker thread
+    or via asyncio.to_thread).
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int = 16, timeout: float = 30.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = {429: 0, 503: 0}
+        self._waiting: list[tuple[int, int]] = []  # Heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._average_hold = 1.0  # Seconds a slot is held, moving average
+        self._cond = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Rough seconds until a new request would get a slot."""
+        with self._cond:
+            return self._retry_after()
+
+    def _retry_after(self) -> int:
+        ahead = len(self._waiting) + 1
+        return max(1, math.ceil(self._average_hold * ahead / max(1, self.limit)))
+
+    def acquire(self, priority: str = "interactive") -> float:
+        """Wait for a slot and return when it was granted; raises Rejected."""
+        with self._cond:
+            if self.active < self.limit and not self._waiting:
+                return self._grant()
+            if len(self._waiting) >= self.max_queue:
+                self.rejected[429] += 1
+                raise Rejected(429, self._retry_after(), f"{self.name}: too many waiting requests")
+            entry = (PRIORITIES.get(priority, 1), next(self._arrivals))
+            heapq.heappush(self._waiting, entry)
+            deadline = time.monotonic() + self.timeout
+            while not (self.active < self.limit and self._waiting[0] == entry):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()  # The next waiter may be at the head now
+                    self.rejected[503] += 1
+                    raise Rejected(
+                        503, self._retry_after(), f"{self.name}: timed out waiting for a slot"
+                    )
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            self._cond.notify_all()
+            return self._grant()
+
+    def _grant(self) -> float:
+        self.active += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, granted: float | None = None) -> None:
+        """Free a slot; granted (from acquire) updates the Retry-After estimate."""
+        with self._cond:
+            self.active -= 1
+            if granted is not None:
+                held = time.monotonic() - granted
+                self._average_hold = 0.8 * self._average_hold + 0.2 * held
+            self._cond.notify_all()
+
+    def release_after(self, items: Iterable[str], granted: float | None = None) -> Iterator[str]:
+        """Yield from items, releasing the slot when they end or the consumer stops.
+
+        Also released when the iterator is closed or dropped without ever being
+        started (a generator's finally wouldn't run then, e.g. when the client
+        disconnects before the first chunk).
+        """
+        return _ReleasingIterator(self, items, granted)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "queued": len(self._waiting),
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": {str(status): n for status, n in self.rejected.items()},
+                "retry_after": self._retry_after(),
+            }
+
+
+class _ReleasingIterator:
+    """Iterator over items that releases an admission slot exactly once."""
+
+    def __init__(self, admission: Admission, items: Iterable[str], granted: float | None):
+        self._admission = admission
+        self._items = iter(items)
+        self._granted = granted
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._items)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            close = getattr(self._items, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._admission.release(self._granted)
+
+    def __del__(self) -> None:
+        self.close()
@@ -0,0 +1,112 @@
+"""Cached, precompressed serving of templates and static files."""
+
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+from typing import cast
+
+from fastapi import Request, Response
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:
+    brotli = None
+
+
+class Asset:
+    """A file loaded into memory with its ETag and compressed variants."""
+
+    def __init__(self, path: Path, media_type: str):
+        self.path = path
+        self.media_type = media_type
+        self.mtime_ns = path.stat().st_mtime_ns
+        body = path.read_bytes()
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # encoding -> body; only kept when compression actually helps
+        self.variants: dict[str, bytes] = {"identity": body}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants["gzip"] = compressed
+        if brotli is not None:
+            compressed_br = cast(bytes, brotli.compress(body, quality=11))  # type: ignore
+            if len(compressed_br) < len(body):
+                self.variants["br"] = compressed_br
+
+    def etag_for(self, encoding: str) -> str:
+        """Strong ETag, distinct per content encoding."""
+        if encoding == "identity":
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    """Encodings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted: set[str] = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(asset: Asset, accept_encoding: str) -> str:
+    """Pick the smallest variant the client accepts (brotli, then gzip)."""
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+
+class AssetCache:
+    """Loads assets once; in dev mode, reloads an asset when its file changes."""
+
+    def __init__(self, dev: bool = False):
+        self.dev = dev
+        self._assets: dict[Path, Asset] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, media_type: str) -> Asset:
+        with self._lock:
+            asset = self._assets.get(path)
+        if asset is not None and self.dev and path.stat().st_mtime_ns != asset.mtime_ns:
+            asset = None
+        if asset is None:
+            asset = Asset(path, media_type)
+            with self._lock:
+                self._assets[path] = asset
+        return asset
+
+    def response(
+        self, request: Request, path: Path, media_type: str, cache_control: str
+    ) -> Response:
+        """Serve an asset with ETag, Cache-Control and content negotiation."""
+        asset = self.get(path, media_type)
+        encoding = choose_encoding(asset, request.headers.get("accept-encoding", ""))
+        etag = asset.etag_for(encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache" if self.dev else cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.variants[encoding], media_type=media_type, headers=headers)
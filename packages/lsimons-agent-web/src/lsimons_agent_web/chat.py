@@ -0,0 +1,214 @@
+"""WebSocket chat transport: many sessions and turns over one connection.
+
+Client frames (JSON):
+- {"type": "chat", "session": s, "message": m, "turn": t} - queue a turn
+  (turn id optional); turns in one session run one after another, and
+  "priority": "batch" lets interactive turns go first when slots are busy
+- {"type": "cancel", "session": s} - stop the running turn, and with
+  "all": true drop queued turns too
+- {"type": "ping"} - answered with {"type": "pong"}
+
+Server frames:
+- {"type": "event", "session": s, "turn": t, "event": e, "data": d} for
+  e in started, text, tool, usage, warning, cancelled, error, done
+  (error data has "status" and "retry_after" when the server is too busy)
+- {"type": "push", "event": e, "data": d} - server-initiated notifications
+- {"type": "ping"} - keep-alive when idle
+- {"type": "error", "message": m} - malformed frames
+"""
+
+import asyncio
+import contextlib
+import json
+import threading
+import uuid
+from collections.abc import Callable, Generator
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+from lsimons_agent.tokens import Usage
+
+from lsimons_agent_web.admission import Admission, Rejected
+
+ConversationGetter = Callable[[str | None], tuple[list[dict[str, Any]], Usage]]
+ConversationSaver = Callable[[str | None, list[dict[str, Any]], Usage], None]
+ProcessMessage = Callable[..., Generator[tuple[str, Any]]]
+SessionLock = Callable[[str | None], contextlib.AbstractContextManager[Any]]
+
+# Open connections, for pushes
+_connections: set[ChatConnection] = set()
+_connections_lock = threading.Lock()
+
+
+def push(event: str, data: Any = None) -> None:
+    """Send a notification to every connected chat client (callable from any thread)."""
+    with _connections_lock:
+        connections = list(_connections)
+    for connection in connections:
+        connection.send_threadsafe({"type": "push", "event": event, "data": data})
+
+
+def connection_count() -> int:
+    with _connections_lock:
+        return len(_connections)
+
+
+class _SessionRunner:
+    """Queued turns of one session on one connection."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue[tuple[str, str, str]] = asyncio.Queue()
+        self.cancel: threading.Event | None = None  # Set to stop the running turn
+        self.task: asyncio.Task[None] | None = None
+
+
+class ChatConnection:
+    """Serves one /ws/chat client."""
+
+    KEEPALIVE = 20.0  # Seconds of silence before the server sends a ping
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        get_conversation: ConversationGetter,
+        process: ProcessMessage,
+        admission: Admission | None = None,
+        save_conversation: ConversationSaver | None = None,
+        session_lock: SessionLock | None = None,
+    ):
+        self.websocket = websocket
+        self.get_conversation = get_conversation
+        self.process = process
+        self.admission = admission
+        self.save_conversation = save_conversation
+        # Held for a whole turn, so other connections and endpoints using the
+        # same session wait instead of interleaving with it
+        self.session_lock = session_lock
+        self._outgoing: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._sessions: dict[str, _SessionRunner] = {}
+        self._loop = asyncio.get_running_loop()
+
+    def send_threadsafe(self, frame: dict[str, Any]) -> None:
+        self._loop.call_soon_threadsafe(self._outgoing.put_nowait, frame)
+
+    async def _send_loop(self) -> None:
+        """Single writer for the socket, so frames from turn threads never interleave."""
+        while True:
+            try:
+                frame = await asyncio.wait_for(self._outgoing.get(), timeout=self.KEEPALIVE)
+            except TimeoutError:
+                frame = {"type": "ping"}
+            await self.websocket.send_json(frame)
+
+    async def run(self) -> None:
+        with _connections_lock:
+            _connections.add(self)
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                try:
+                    frame: Any = json.loads(text)
+                except ValueError:
+                    # A bad frame doesn't end the connection (and its turns)
+                    self._outgoing.put_nowait({"type": "error", "message": "Invalid JSON"})
+                    continue
+                if isinstance(frame, dict):
+                    self._handle(frame)  # type: ignore[arg-type]
+                else:
+                    self._outgoing.put_nowait({"type": "error", "message": "Expected an object"})
+        except WebSocketDisconnect, RuntimeError:
+            pass
+        finally:
+            with _connections_lock:
+                _connections.discard(self)
+            for runner in self._sessions.values():
+                if runner.cancel is not None:
+                    runner.cancel.set()
+                if runner.task is not None:
+                    runner.task.cancel()
+            sender.cancel()
+
+    def _handle(self, frame: dict[str, Any]) -> None:
+        frame_type = frame.get("type")
+        session = str(frame.get("session") or "")
+        if frame_type == "chat":
+            turn = str(frame.get("turn") or uuid.uuid4().hex[:12])
+            runner = self._sessions.get(session)
+            if runner is None:
+                runner = self._sessions[session] = _SessionRunner()
+                runner.task = asyncio.create_task(self._run_session(session, runner))
+            priority = str(frame.get("priority") or "interactive")
+            runner.queue.put_nowait((turn, str(frame.get("message", "")), priority))
+        elif frame_type == "cancel":
+            runner = self._sessions.get(session)
+            if runner is not None:
+                if frame.get("all"):
+                    while not runner.queue.empty():
+                        turn, _, _ = runner.queue.get_nowait()
+                        self._event(session, turn, "cancelled", None)
+                        self._event(session, turn, "done", None)
+                if runner.cancel is not None:
+                    runner.cancel.set()
+        elif frame_type == "ping":
+            self._outgoing.put_nowait({"type": "pong"})
+        else:
+            self._outgoing.put_nowait({"type": "error", "message": f"Unknown type {frame_type!r}"})
+
+    def _event(self, session: str, turn: str, event: str, data: Any) -> dict[str, Any]:
+        frame = {"type": "event", "session": session, "turn": turn, "event": event, "data": data}
+        self._outgoing.put_nowait(frame)
+        return frame
+
+    async def _run_session(self, session: str, runner: _SessionRunner) -> None:
+        while True:
+            turn, message, priority = await runner.queue.get()
+            runner.cancel = threading.Event()
+            self._event(session, turn, "started", {"message": message})
+            await asyncio.to_thread(self._run_turn, session, turn, message, priority, runner.cancel)
+            runner.cancel = None
+
+    def _run_turn(
+        self, session: str, turn: str, message: str, priority: str, cancel: threading.Event
+    ) -> None:
+        """Run process_message, forwarding its events (runs in a worker thread)."""
+        granted: float | None = None
+        if self.admission is not None:
+            try:
+                granted = self.admission.acquire(priority)
+            except Rejected as e:
+                error = {"message": e.reason, "status": e.status, "retry_after": e.retry_after}
+                self._send_events(session, turn, [("error", error), ("done", None)])
+                return
+        try:
+            self._forward(session, turn, message, cancel)
+        finally:
+            if self.admission is not None:
+                self.admission.release(granted)
+
+    def _forward(self, session: str, turn: str, message: str, cancel: threading.Event) -> None:
+        lock = self.session_lock(session or None) if self.session_lock else contextlib.nullcontext()
+        with lock:
+            conversation, usage = self.get_conversation(session or None)
+            try:
+                for event in self.process(
+                    conversation, message, usage, cancel=cancel, session=session or None
+                ):
+                    self._send_events(session, turn, [event])
+            except Exception as e:
+                self._send_events(session, turn, [("error", {"message": str(e)}), ("done", None)])
+            finally:
+                if self.save_conversation is not None:
+                    self.save_conversation(session or None, conversation, usage)
+
+    def _send_events(self, session: str, turn: str, events: list[tuple[str, Any]]) -> None:
+        for event_type, data in events:
+            self.send_threadsafe(
+                {
+                    "type": "event",
+                    "session": session,
+                    "turn": turn,
+                    "event": event_type,
+                    "data": data,
+                }
+            )
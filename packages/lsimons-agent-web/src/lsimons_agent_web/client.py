@@ -1,7 +1,10 @@
 """CLI client that connects to lsimons-agent-web server."""
 
+import argparse
 import json
 import sys
+import time
+from collections.abc import Iterator
 from typing import Any
 
 import httpx
@@ -29,9 +32,122 @@ ASCII_ART = f"""{CYAN}{BOLD}
 """
 
 
+class SSEEvent:
+    """A server-sent event."""
+
+    def __init__(self, event: str, data: str, id: str | None = None, retry: int | None = None):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def json(self) -> dict[str, Any]:
+        """Decode the data field (a JSON object for all of the server's events)."""
+        return json.loads(self.data) if self.data else {}
+
+
+class SSEParser:
+    """Incremental parser for text/event-stream, following the HTML spec.
+
+    Chunks can split lines (and CRLF pairs) anywhere. Handles multi-line data,
+    comments, and the id and retry fields.
+    """
+
+    def __init__(self):
+        self.last_event_id: str | None = None
+        self.retry: int | None = None
+        self._buffer = ""
+        self._skip_lf = False  # Previous chunk ended with CR, possibly of a CRLF
+        self._event = ""
+        self._data: list[str] = []
+
+    def feed(self, chunk: str) -> list[SSEEvent]:
+        """Parse a chunk of the stream; returns the events it completed."""
+        if self._skip_lf and chunk.startswith("\n"):
+            chunk = chunk[1:]
+        self._skip_lf = chunk.endswith("\r")
+        self._buffer += chunk
+        lines = self._buffer.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self._buffer = lines.pop()
+        events: list[SSEEvent] = []
+        for line in lines:
+            event = self._line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _line(self, line: str) -> SSEEvent | None:
+        if not line:
+            return self._dispatch()
+        if line.startswith(":"):
+            return None  # Comment, e.g. a keep-alive
+        name, colon, value = line.partition(":")
+        if colon and value.startswith(" "):
+            value = value[1:]
+        if name == "event":
+            self._event = value
+        elif name == "data":
+            self._data.append(value)
+        elif name == "id" and "\0" not in value:
+            self.last_event_id = value
+        elif name == "retry" and value.isascii() and value.isdigit():
+            self.retry = int(value)
+        return None
+
+    def _dispatch(self) -> SSEEvent | None:
+        event, data = self._event, self._data
+        self._event, self._data = "", []
+        if not data:
+            return None
+        return SSEEvent(event or "message", "\n".join(data), self.last_event_id, self.retry)
+
+
+class ChatClient:
+    """Talks to the server over one keep-alive connection reused across messages.
+
+    With a session id the server keeps a separate conversation for this client
+    instead of using the shared default one.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8765",
+        timeout: float = 300.0,
+        session: str | None = None,
+    ):
+        self._http = httpx.Client(base_url=base_url, timeout=timeout)
+        self.session = session
+
+    def chat(self, message: str) -> Iterator[SSEEvent]:
+        """Send a message and yield response events as they arrive."""
+        parser = SSEParser()
+        body: dict[str, str] = {"message": message}
+        if self.session:
+            body["session"] = self.session
+        with self._http.stream("POST", "/chat", json=body) as response:
+            response.raise_for_status()
+            for chunk in response.iter_text():
+                yield from parser.feed(chunk)
+
+    def clear(self) -> None:
+        response = self._http.post("/clear", timeout=10.0)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._http.close()
+
+
 def run() -> None:
     """Run the CLI client that connects to the web server."""
-    base_url = "http://localhost:8765"
+    parser = argparse.ArgumentParser(description="Chat with a running lsimons-agent-web server")
+    parser.add_argument("--url", default="http://localhost:8765", help="server base URL")
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print time to first event and total turn time",
+    )
+    args = parser.parse_args()
+    client = ChatClient(args.url)
 
     print(ASCII_ART)
     print(f"{BOLD}{MAGENTA}lsimons-agent{RESET}")
@@ -44,6 +160,7 @@ def run() -> None:
             user_input = input(f"{BOLD}{GREEN}You:{RESET} ").strip()
         except KeyboardInterrupt, EOFError:
             print(f"\n{DIM}Bye!{RESET}")
+            client.close()
             break
 
         if not user_input:
@@ -51,44 +168,46 @@ def run() -> None:
 
         if user_input == "/clear":
             try:
-                httpx.post(f"{base_url}/clear", timeout=10.0)
+                client.clear()
                 print(f"{DIM}Cleared.{RESET}")
-            except httpx.RequestError as e:
+            except httpx.HTTPError as e:
                 print(f"{RED}Error: {e}{RESET}")
             continue
 
         try:
-            _send_message(base_url, user_input)
-        except httpx.RequestError as e:
+            _send_message(client, user_input, args.timings)
+        except httpx.HTTPError as e:
             print(f"{RED}Error: {e}{RESET}")
 
 
-def _send_message(base_url: str, message: str) -> None:
+def _send_message(client: ChatClient, message: str, timings: bool = False) -> None:
     """Send a message and stream the response."""
-    with httpx.stream(
-        "POST",
-        f"{base_url}/chat",
-        json={"message": message},
-        timeout=300.0,
-    ) as response:
-        response.raise_for_status()
-
-        event_type: str | None = None
-        current_text = ""
-
-        for line in response.iter_lines():
-            if line.startswith("event: "):
-                event_type = line[7:]
-            elif line.startswith("data: "):
-                data: dict[str, Any] = json.loads(line[6:])
-                _handle_event(event_type, data, current_text)
-                if event_type == "text":
-                    if not current_text:
-                        current_text = str(data.get("content", ""))
-                    else:
-                        current_text += str(data.get("content", ""))
-                elif event_type in ("tool", "done"):
-                    current_text = ""
+    start = time.perf_counter()
+    first_event: float | None = None
+    current_text = ""
+    turn_usage: dict[str, Any] | None = None
+
+    for event in client.chat(message):
+        if first_event is None:
+            first_event = time.perf_counter() - start
+        data = event.json()
+        _handle_event(event.event, data, current_text)
+        if event.event == "usage":
+            turn_usage = data.get("turn")
+        elif event.event == "text":
+            current_text += str(data.get("content", ""))
+        elif event.event in ("tool", "done"):
+            current_text = ""
+
+    if timings:
+        total = time.perf_counter() - start
+        first = f"{first_event:.3f}s" if first_event is not None else "-"
+        tokens = ""
+        if turn_usage:
+            tokens = f", {turn_usage['total_tokens']} tokens"
+            if turn_usage.get("cached_tokens"):
+                tokens += f" ({turn_usage['cached_tokens']} cached)"
+        print(f"{DIM}[first event {first}, total {total:.3f}s{tokens}]{RESET}")
 
 
 def _handle_event(event_type: str | None, data: dict[str, Any], current_text: str) -> None:
@@ -104,7 +223,10 @@ def _handle_event(event_type: str | None, data: dict[str, Any], current_text: st
     elif event_type == "tool":
         name = str(data.get("name", ""))
         args: dict[str, Any] = data.get("args", {})
-        print(f"\n{YELLOW}[Tool: {name}({format_args(args)})]{RESET}")
+        repeat = " (repeated, not run)" if data.get("cached") else ""
+        print(f"\n{YELLOW}[Tool: {name}({format_args(args)}){repeat}]{RESET}")
+    elif event_type == "warning":
+        print(f"\n{RED}[Warning: {data.get('message', '')}]{RESET}")
     elif event_type == "done":
         print("\n")
 
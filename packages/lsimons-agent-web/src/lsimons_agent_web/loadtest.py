@@ -0,0 +1,365 @@
+"""Load generator for lsimons-agent-web.
+
+Drives concurrent chat sessions (each with its own server-side conversation)
+and terminal WebSocket viewers against a running server, usually backed by
+mock_llm.server, and reports throughput, latency percentiles, error rates and
+server memory over time.
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+from websockets.exceptions import WebSocketException
+from websockets.sync.client import connect
+
+from lsimons_agent_web.client import ChatClient
+
+DEFAULT_PROMPTS = ["how are you"]
+REJECTED = (429, 503)  # Admission control turning a turn away: back off, don't count as errors
+MAX_BACKOFF = 10.0  # Seconds
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """Nearest-rank percentile (p in 0-100), or None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def load_prompts(path: Path | None) -> list[str]:
+    """Read prompts from a file, one per line (blank lines and # comments skipped)."""
+    if path is None:
+        return DEFAULT_PROMPTS
+    lines = path.read_text().splitlines()
+    prompts = [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    return prompts or DEFAULT_PROMPTS
+
+
+def backoff(failures: int, retry_after: str | None = None) -> float:
+    """Seconds to wait after consecutive failures: Retry-After if given, else exponential."""
+    if retry_after is not None:
+        try:
+            return min(max(float(retry_after), 0.0), MAX_BACKOFF)
+        except ValueError:
+            pass  # An HTTP date; fall back to our own schedule
+    return min(0.05 * 2 ** (failures - 1), MAX_BACKOFF)
+
+
+class Stats:
+    """Measurements collected by the load generator threads."""
+
+    def __init__(self):
+        self.turns = 0
+        self.turn_errors = 0
+        self.turns_rejected = 0  # 429/503 from admission control
+        self.events = 0
+        self.first_event: list[float] = []  # Seconds from sending to the first event
+        self.event_gaps: list[float] = []  # Seconds between consecutive events
+        self.turn_times: list[float] = []
+        self.echoes = 0
+        self.echo_errors = 0
+        self.echo_latency: list[float] = []  # Seconds from typing to seeing the output
+        self.rss: list[tuple[float, int]] = []  # (seconds since start, bytes)
+        self.errors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def error(self, kind: str, e: Exception) -> None:
+        key = f"{kind}: {type(e).__name__}"
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def turn(self, first_event: float | None, gaps: list[float], total: float, events: int) -> None:
+        with self._lock:
+            self.turns += 1
+            self.events += events
+            if first_event is not None:
+                self.first_event.append(first_event)
+            self.event_gaps.extend(gaps)
+            self.turn_times.append(total)
+
+    def turn_failed(self, e: Exception) -> None:
+        with self._lock:
+            self.turn_errors += 1
+        self.error("chat", e)
+
+    def turn_rejected(self) -> None:
+        with self._lock:
+            self.turns_rejected += 1
+
+    def echo(self, latency: float) -> None:
+        with self._lock:
+            self.echoes += 1
+            self.echo_latency.append(latency)
+
+    def echoes_missed(self, count: int) -> None:
+        with self._lock:
+            self.echo_errors += count
+
+    def sample_rss(self, elapsed: float, rss: int) -> None:
+        with self._lock:
+            self.rss.append((elapsed, rss))
+
+    def report(self, duration: float) -> dict[str, Any]:
+        """Summarize the run."""
+
+        def latencies(values: list[float]) -> dict[str, float | None]:
+            return {f"p{p}": percentile(values, p) for p in (50, 95, 99)}
+
+        with self._lock:
+            turns_attempted = self.turns + self.turn_errors + self.turns_rejected
+            echoes_attempted = self.echoes + self.echo_errors
+            return {
+                "duration": duration,
+                "chat": {
+                    "turns": self.turns,
+                    "errors": self.turn_errors,
+                    "error_rate": self.turn_errors / turns_attempted if turns_attempted else 0.0,
+                    "rejected": self.turns_rejected,
+                    "rejected_rate": (
+                        self.turns_rejected / turns_attempted if turns_attempted else 0.0
+                    ),
+                    "turns_per_second": self.turns / duration if duration else 0.0,
+                    "events_per_second": self.events / duration if duration else 0.0,
+                    "first_event": latencies(self.first_event),
+                    "event_gap": latencies(self.event_gaps),
+                    "turn_time": latencies(self.turn_times),
+                },
+                "terminal": {
+                    "echoes": self.echoes,
+                    "errors": self.echo_errors,
+                    "error_rate": self.echo_errors / echoes_attempted if echoes_attempted else 0.0,
+                    "echo_latency": latencies(self.echo_latency),
+                },
+                "rss": list(self.rss),
+                "errors": dict(self.errors),
+            }
+
+
+def chat_worker(url: str, worker: int, prompts: list[str], deadline: float, stats: Stats) -> None:
+    """Send prompts in a loop over one connection, in a conversation of its own.
+
+    After a failed or rejected turn the worker waits (Retry-After, or an
+    exponential backoff) so an overloaded server isn't hammered with retries.
+    """
+    client = ChatClient(url, session=f"loadtest-{worker}")
+    try:
+        turn = 0
+        failures = 0
+        while time.monotonic() < deadline:
+            prompt = prompts[(worker + turn) % len(prompts)]
+            turn += 1
+            start = last = time.perf_counter()
+            first_event: float | None = None
+            gaps: list[float] = []
+            events = 0
+            try:
+                for _ in client.chat(prompt):
+                    now = time.perf_counter()
+                    if first_event is None:
+                        first_event = now - start
+                    else:
+                        gaps.append(now - last)
+                    last = now
+                    events += 1
+            except httpx.HTTPError as e:
+                failures += 1
+                retry_after = None
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in REJECTED:
+                    stats.turn_rejected()
+                    retry_after = e.response.headers.get("Retry-After")
+                else:
+                    stats.turn_failed(e)
+                time.sleep(
+                    max(0.0, min(backoff(failures, retry_after), deadline - time.monotonic()))
+                )
+                continue
+            failures = 0
+            stats.turn(first_event, gaps, time.perf_counter() - start, events)
+    finally:
+        client.close()
+
+
+class EchoProbe:
+    """Markers typed into the shared shell, with the time each was sent."""
+
+    def __init__(self):
+        self.sent: dict[str, float] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> tuple[str, str]:
+        """Return (input to type, marker the shell will print)."""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        # The shell prints the evaluated marker; the echoed input doesn't contain it
+        return f"echo lt-$(({seq}+0))-end\r", f"lt-{seq}-end"
+
+    def mark_sent(self, marker: str) -> None:
+        with self._lock:
+            self.sent[marker] = time.perf_counter()
+
+    def pending(self) -> list[tuple[str, float]]:
+        with self._lock:
+            return list(self.sent.items())
+
+
+def terminal_worker(
+    ws_url: str, worker: int, deadline: float, interval: float, probe: EchoProbe, stats: Stats
+) -> None:
+    """View the shared shell terminal; worker 0 also types markers into it.
+
+    Every viewer measures how long each marker takes to show up in its output,
+    which covers the PTY round trip and the fan-out to all viewers.
+    """
+    seen: set[str] = set()
+    output = ""
+    next_input = time.monotonic()
+    try:
+        with connect(ws_url, open_timeout=10) as ws:
+            joined = time.perf_counter()
+            while time.monotonic() < deadline:
+                # Wait for the shell to print something (its prompt) before typing
+                if worker == 0 and output and time.monotonic() >= next_input:
+                    command, marker = probe.next()
+                    probe.mark_sent(marker)
+                    ws.send(command.encode())
+                    next_input = time.monotonic() + interval
+                try:
+                    data = ws.recv(timeout=0.1)
+                except TimeoutError:
+                    continue
+                text = data.decode(errors="replace") if isinstance(data, bytes) else data
+                output = (output + text)[-4096:]
+                for marker, sent in probe.pending():
+                    if marker not in seen and marker in output:
+                        seen.add(marker)
+                        stats.echo(time.perf_counter() - sent)
+    except (OSError, WebSocketException) as e:
+        stats.error("terminal", e)
+        return
+    # Markers sent while this viewer was connected (allowing the last one time to arrive)
+    missed = [
+        marker
+        for marker, sent in probe.pending()
+        if marker not in seen and joined <= sent < time.perf_counter() - 2.0
+    ]
+    stats.echoes_missed(len(missed))
+
+
+def rss_sampler(url: str, start: float, deadline: float, interval: float, stats: Stats) -> None:
+    """Sample server memory from /api/metrics."""
+    with httpx.Client(base_url=url, timeout=10.0) as http:
+        while True:
+            try:
+                rss = http.get("/api/metrics").json().get("rss")
+                if rss is not None:
+                    stats.sample_rss(time.monotonic() - start, int(rss))
+            except (httpx.HTTPError, ValueError) as e:
+                stats.error("metrics", e)
+            if time.monotonic() + interval > deadline:
+                return
+            time.sleep(interval)
+
+
+def run_load(
+    url: str,
+    prompts: list[str],
+    chat_sessions: int = 4,
+    terminals: int = 0,
+    duration: float = 30.0,
+    sample_interval: float = 1.0,
+    echo_interval: float = 0.5,
+) -> dict[str, Any]:
+    """Run the load test and return its report."""
+    stats = Stats()
+    probe = EchoProbe()
+    ws_url = url.replace("http", "ws", 1).rstrip("/") + "/ws/terminal/shell"
+    start = time.monotonic()
+    deadline = start + duration
+    threads = [
+        threading.Thread(target=rss_sampler, args=(url, start, deadline, sample_interval, stats))
+    ]
+    for worker in range(chat_sessions):
+        threads.append(
+            threading.Thread(target=chat_worker, args=(url, worker, prompts, deadline, stats))
+        )
+    for worker in range(terminals):
+        threads.append(
+            threading.Thread(
+                target=terminal_worker,
+                args=(ws_url, worker, deadline, echo_interval, probe, stats),
+            )
+        )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.report(time.monotonic() - start)
+
+
+def _ms(value: float | None) -> str:
+    return f"{value * 1000:.1f}ms" if value is not None else "-"
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Human-readable summary of a report."""
+    chat = report["chat"]
+    terminal = report["terminal"]
+
+    def row(name: str, values: dict[str, float | None]) -> str:
+        return f"  {name:<14}" + "  ".join(f"{p} {_ms(v):>9}" for p, v in values.items())
+
+    lines = [
+        f"Duration: {report['duration']:.1f}s",
+        f"Chat: {chat['turns']} turns, {chat['turns_per_second']:.2f} turns/s, "
+        f"{chat['events_per_second']:.1f} events/s, error rate {chat['error_rate']:.1%}, "
+        f"rejected {chat['rejected_rate']:.1%}",
+        row("first event", chat["first_event"]),
+        row("event gap", chat["event_gap"]),
+        row("turn time", chat["turn_time"]),
+        f"Terminal: {terminal['echoes']} echoes, error rate {terminal['error_rate']:.1%}",
+        row("echo latency", terminal["echo_latency"]),
+    ]
+    if report["errors"]:
+        lines.append("Errors:")
+        lines.extend(f"  {kind}: {count}" for kind, count in sorted(report["errors"].items()))
+    if report["rss"]:
+        lines.append("Server RSS:")
+        lines.extend(f"  {t:6.1f}s {rss / 1024 / 1024:8.1f} MB" for t, rss in report["rss"])
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run a load test against a running server."""
+    parser = argparse.ArgumentParser(description="Load test a running lsimons-agent-web server")
+    parser.add_argument("--url", default="http://localhost:8765", help="server base URL")
+    parser.add_argument("--chat", type=int, default=4, help="concurrent chat sessions")
+    parser.add_argument("--terminals", type=int, default=0, help="terminal WebSocket viewers")
+    parser.add_argument("--prompts", type=Path, help="file with one prompt per line")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="RSS sample seconds")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_load(
+        args.url,
+        load_prompts(args.prompts),
+        chat_sessions=args.chat,
+        terminals=args.terminals,
+        duration=args.duration,
+        sample_interval=args.sample_interval,
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
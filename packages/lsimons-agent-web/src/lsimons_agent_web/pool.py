@@ -0,0 +1,97 @@
+"""Pool of pre-spawned login shells for instant terminal open."""
+
+import shlex
+import threading
+
+from lsimons_agent_web.terminal import Terminal
+
+
+class ShellPool:
+    """Keeps a few login shells started ahead of time.
+
+    A login shell takes as long as the user's rc files to become ready. The pool
+    pays that cost in the background: acquire() hands out a warm shell, types a
+    cd into the project for it, and refills the pool on a background thread.
+    After stop() (at server shutdown) the pool stays empty.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        shell: str = "/bin/zsh",
+        rlimits: dict[int, tuple[int, int]] | None = None,
+    ):
+        self.size = size
+        self.shell = shell
+        self.rlimits = rlimits
+        self._ready: list[Terminal] = []
+        self._lock = threading.Lock()
+        self._filling = False
+        self._stopped = False
+
+    def acquire(self, cwd: str) -> Terminal | None:
+        """Take a warm shell and cd it into cwd, or None if the pool is empty."""
+        terminal: Terminal | None = None
+        stale: list[Terminal] = []
+        with self._lock:
+            while self._ready:
+                candidate = self._ready.pop(0)
+                if candidate.is_running():
+                    terminal = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.stop()
+        self.fill_async()
+        if terminal is None:
+            return None
+
+        terminal.cwd = cwd
+        # The leading space keeps it out of the history (HIST_IGNORE_SPACE in zsh,
+        # HISTCONTROL=ignorespace in bash)
+        terminal.write(f" cd -- {shlex.quote(cwd)} && clear\n".encode())
+        return terminal
+
+    def fill(self) -> None:
+        """Start shells until the pool is full."""
+        while True:
+            with self._lock:
+                if self._stopped or len(self._ready) >= self.size:
+                    return
+            terminal = Terminal(shell=self.shell, rlimits=self.rlimits)
+            terminal.start()
+            with self._lock:
+                if not self._stopped:
+                    self._ready.append(terminal)
+                    continue
+            terminal.stop()  # Stopped while this one was starting
+            return
+
+    def _fill_loop(self) -> None:
+        try:
+            self.fill()
+        finally:
+            with self._lock:
+                self._filling = False
+
+    def fill_async(self) -> None:
+        """Refill the pool on a background thread."""
+        with self._lock:
+            if self._stopped or self._filling or len(self._ready) >= self.size:
+                return
+            self._filling = True
+        threading.Thread(target=self._fill_loop, daemon=True).start()
+
+    def ready_count(self) -> int:
+        """Number of warm shells waiting to be handed out."""
+        with self._lock:
+            return len(self._ready)
+
+    def stop(self) -> None:
+        """Stop all warm shells, and don't start new ones."""
+        with self._lock:
+            self._stopped = True
+            ready = self._ready
+            self._ready = []
+        for terminal in ready:
+            terminal.stop()
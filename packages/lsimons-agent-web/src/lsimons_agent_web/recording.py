@@ -0,0 +1,172 @@
+"""Asciicast v2 recording of terminal sessions."""
+
+import codecs
+import contextlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from typing import Any, TextIO
+
+# Recording file names are generated by us; anything else is rejected
+RECORDING_NAME = re.compile(r"^[\w.-]+\.cast$")
+
+# Queue items: (monotonic time, event code, data), or None to stop the writer
+_Event = tuple[float, str, bytes | str] | None
+
+
+class Recorder:
+    """Records terminal output to asciicast v2 files.
+
+    The PTY read path only puts a timestamped chunk on a queue. A background
+    writer thread decodes, batches and appends events, flushing at most every
+    FLUSH_INTERVAL seconds, and rotates to a new file (with its own header)
+    once the current one exceeds max_bytes. If writing fails (e.g. a full
+    disk), failed is set and later output is dropped rather than queued.
+    """
+
+    FLUSH_INTERVAL = 1.0
+    BATCH_SIZE = 256
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str,
+        rows: int = 24,
+        cols: int = 80,
+        title: str | None = None,
+        max_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.name = name
+        self.rows = rows
+        self.cols = cols
+        self.title = title
+        self.max_bytes = max_bytes
+        self.paths: list[Path] = []
+        self._queue: SimpleQueue[_Event] = SimpleQueue()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._file_start = 0.0
+        self._file_size = 0
+        self._file: TextIO | None = None
+        self.failed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def output(self, data: bytes) -> None:
+        """Record terminal output (never blocks)."""
+        if not self.failed:
+            self._queue.put((time.monotonic(), "o", data))
+
+    def resize(self, rows: int, cols: int) -> None:
+        """Record a terminal resize."""
+        if not self.failed:
+            self._queue.put((time.monotonic(), "r", f"{cols}x{rows}"))
+
+    def close(self) -> None:
+        """Write out everything queued and close the file."""
+        self._queue.put(None)
+        self._writer.join(timeout=5.0)
+
+    def _open(self, start: float) -> TextIO:
+        """Start a new recording file with an asciicast header."""
+        if self._file is not None:
+            self._file.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        part = len(self.paths)
+        suffix = f".{part}" if part else ""
+        path = self.directory / f"{self.name}{suffix}.cast"
+        self.paths.append(path)
+        header: dict[str, Any] = {
+            "version": 2,
+            "width": self.cols,
+            "height": self.rows,
+            "timestamp": int(time.time()),
+            "env": {"TERM": "xterm-256color"},
+        }
+        if self.title:
+            header["title"] = self.title
+        line = json.dumps(header) + "\n"
+        # "x": never truncate another recording
+        file = open(path, "x", encoding="utf-8")  # noqa: SIM115
+        file.write(line)
+        self._file_start = start
+        self._file_size = len(line)
+        return file
+
+    def _encode(self, event: tuple[float, str, bytes | str]) -> str:
+        when, code, data = event
+        if code == "r" and isinstance(data, str):
+            self.cols, self.rows = (int(n) for n in data.split("x"))
+        text = self._decoder.decode(data) if isinstance(data, bytes) else data
+        return json.dumps([round(when - self._file_start, 6), code, text]) + "\n"
+
+    def _write(self, events: list[tuple[float, str, bytes | str]]) -> None:
+        """Append a batch of events, rotating first if the file is full."""
+        if not events:
+            return
+        if self._file is None or self._file_size > self.max_bytes:
+            self._file = self._open(events[0][0])
+        chunk = "".join(self._encode(event) for event in events)
+        self._file.write(chunk)
+        self._file.flush()
+        self._file_size += len(chunk)
+
+    def _write_loop(self) -> None:
+        """Write queued events until closed or writing fails (runs in thread)."""
+        try:
+            self._write_events()
+        except OSError, ValueError:
+            self.failed = True
+            # Nobody will write these; don't keep them
+            with contextlib.suppress(Empty):
+                while True:
+                    self._queue.get_nowait()
+        finally:
+            if self._file is not None:
+                with contextlib.suppress(OSError):
+                    self._file.close()
+                self._file = None
+
+    def _write_events(self) -> None:
+        """Batch queued events into appends."""
+        pending: list[tuple[float, str, bytes | str]] = []
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                event = self._queue.get(timeout=self.FLUSH_INTERVAL)
+                if event is None:
+                    stopping = True
+                else:
+                    pending.append(event)
+            except Empty:
+                pass
+            now = time.monotonic()
+            full = len(pending) >= self.BATCH_SIZE
+            if stopping or full or now - last_flush >= self.FLUSH_INTERVAL:
+                self._write(pending)
+                pending = []
+                last_flush = now
+
+
+def list_recordings(directory: Path) -> list[dict[str, Any]]:
+    """List recordings in a directory, newest first."""
+    if not directory.is_dir():
+        return []
+    recordings: list[dict[str, Any]] = []
+    for path in directory.glob("*.cast"):
+        stat = path.stat()
+        recordings.append({"name": path.name, "size": stat.st_size, "modified": stat.st_mtime})
+    recordings.sort(key=lambda r: r["modified"], reverse=True)
+    return recordings
+
+
+def recording_path(directory: Path, name: str) -> Path | None:
+    """Resolve a recording name to a path, or None if invalid or missing."""
+    if not RECORDING_NAME.match(name):
+        return None
+    path = directory / name
+    return path if path.is_file() else None
@@ -0,0 +1,226 @@
+"""Cached index of git repositories under ~/git, organized by org."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+
+# inotify event masks (see inotify(7))
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000  # Watch removed, e.g. after its directory was deleted
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal inotify wrapper (Linux only) for watching directories."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify not available")
+        self.fd: int = self._libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched: dict[str, int] = {}  # Path to watch descriptor
+
+    def watch(self, path: str) -> None:
+        """Watch a directory for entries being added or removed."""
+        if path in self._watched:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._watched[path] = wd
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for events, draining them; returns True if any arrived."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        # Mostly only the fact that something changed matters, but a deleted
+        # directory's watch is gone: forget it so a re-created one is watched again
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size + name_len
+            if mask & (IN_DELETE_SELF | IN_IGNORED):
+                self._watched = {p: w for p, w in self._watched.items() if w != wd}
+        return True
+
+
+def _is_visible_dir(entry: os.DirEntry[str]) -> bool:
+    if entry.name.startswith("."):
+        return False
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+class RepoIndex:
+    """Cached {org: [repo, ...]} index of base_dir/org/repo git checkouts.
+
+    Each org is only rescanned when its directory mtime changes (a repo was
+    added, removed or renamed), using os.scandir. A background thread keeps the
+    index fresh, woken by inotify on Linux and polling mtimes elsewhere. Every
+    change bumps a version number, so watchers can ask for changes since the
+    version they last saw.
+    """
+
+    POLL_INTERVAL = 5.0  # Seconds between mtime checks without inotify
+    SAFETY_INTERVAL = 60.0  # Seconds between mtime checks with inotify
+    MAX_CHANGES = 100  # Change log entries kept for changes_since()
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.version = 0
+        self._orgs: dict[str, tuple[int, list[str]]] = {}  # org -> (mtime_ns, repos)
+        self._changes: list[tuple[int, list[str], list[str]]] = []  # (version, added, removed)
+        self._scanned = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # One scan at a time
+        self._watcher: threading.Thread | None = None
+        self._inotify: Inotify | None = None
+
+    def _scan_org(self, org_path: str) -> tuple[list[str], bool]:
+        """List git repositories in one org directory, and whether it has other dirs."""
+        repos: list[str] = []
+        other_dirs = False
+        try:
+            with os.scandir(org_path) as entries:
+                for entry in entries:
+                    if not _is_visible_dir(entry):
+                        continue
+                    # Check if it's a git repo
+                    if os.path.exists(os.path.join(entry.path, ".git")):
+                        repos.append(entry.name)
+                    else:
+                        other_dirs = True
+        except OSError:
+            return [], False
+        return sorted(repos), other_dirs
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rescan orgs whose directory changed (or all, if force); returns True on changes."""
+        with self._refresh_lock:
+            return self._refresh(force)
+
+    def _refresh(self, force: bool) -> bool:
+        orgs: dict[str, tuple[int, list[str]]] = {}
+        org_paths: list[str] = []
+        try:
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    if not _is_visible_dir(entry):
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    cached = self._orgs.get(entry.name)
+                    if cached is not None and cached[0] == mtime and not force:
+                        orgs[entry.name] = cached
+                    else:
+                        repos, other_dirs = self._scan_org(entry.path)
+                        # A directory without .git may be a clone in progress, which
+                        # won't touch the org mtime when it completes: rescan next time
+                        orgs[entry.name] = (-1 if other_dirs else mtime, repos)
+                    org_paths.append(entry.path)
+        except OSError:
+            pass
+
+        if self._inotify is not None:
+            for path in org_paths:
+                self._inotify.watch(path)
+
+        with self._lock:
+            before = _flatten(self._orgs)
+            after = _flatten(orgs)
+            self._orgs = orgs
+            self._scanned = True
+            added = sorted(after - before)
+            removed = sorted(before - after)
+            if not added and not removed:
+                return False
+            self.version += 1
+            self._changes.append((self.version, added, removed))
+            del self._changes[: -self.MAX_CHANGES]
+            return True
+
+    def repos(self) -> dict[str, list[str]]:
+        """Return the index as {org: [repo, ...]}, sorted, without empty orgs."""
+        return self.snapshot()[1]
+
+    def snapshot(self) -> tuple[int, dict[str, list[str]]]:
+        """Return the current version together with the index."""
+        if not self._scanned:
+            self.refresh()
+        with self._lock:
+            repos = {org: repos for org, (_, repos) in sorted(self._orgs.items()) if repos}
+            return self.version, repos
+
+    def changes_since(self, version: int) -> tuple[int, list[str], list[str]] | None:
+        """Repos ("org/repo") added and removed after version, with the current version.
+
+        Returns None if version is too old for the change log; callers should
+        fetch the full index instead.
+        """
+        with self._lock:
+            if version == self.version:
+                return (version, [], [])
+            if not self._changes or version < self._changes[0][0] - 1:
+                return None
+            added: set[str] = set()
+            removed: set[str] = set()
+            for change_version, change_added, change_removed in self._changes:
+                if change_version <= version:
+                    continue
+                added = (added - set(change_removed)) | set(change_added)
+                removed = (removed - set(change_added)) | set(change_removed)
+            return (self.version, sorted(added), sorted(removed))
+
+    def _watch_loop(self) -> None:
+        """Keep the index fresh (runs in thread)."""
+        while True:
+            self.refresh()
+            if self._inotify is not None:
+                if self._inotify.wait(self.SAFETY_INTERVAL):
+                    # Let a burst of changes (e.g. a clone) settle before rescanning
+                    while self._inotify.wait(0.2):
+                        pass
+            else:
+                time.sleep(self.POLL_INTERVAL)
+
+    def start(self) -> None:
+        """Start watching base_dir in the background (idempotent)."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            try:
+                self._inotify = Inotify()
+                self._inotify.watch(str(self.base_dir))
+            except OSError:
+                self._inotify = None
+            self._watcher = threading.Thread(target=self._watch_loop, daemon=True)
+            self._watcher.start()
+
+
+def _flatten(orgs: dict[str, tuple[int, list[str]]]) -> set[str]:
+    return {f"{org}/{repo}" for org, (_, repos) in orgs.items() for repo in repos}
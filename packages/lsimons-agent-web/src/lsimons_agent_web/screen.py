@@ -0,0 +1,143 @@
+"""Headless terminal screen used to replay state to reconnecting viewers."""
+
+from collections.abc import Iterable, Mapping
+
+import pyte
+from pyte.graphics import BG_AIXTERM, BG_ANSI, FG_AIXTERM, FG_ANSI
+from pyte.screens import Char
+
+# pyte colour names back to SGR codes (built from pyte's own tables)
+_FG_CODES = {name: code for code, name in (FG_ANSI | FG_AIXTERM).items()}
+_BG_CODES = {name: code for code, name in (BG_ANSI | BG_AIXTERM).items()}
+
+# Private modes pyte enables by default (autowrap, cursor visible)
+_DEFAULT_PRIVATE_MODES = {7, 25}
+
+
+def _color_sgr(color: str, codes: dict[str, int], extended: int) -> str:
+    """SGR parameter for a pyte colour: a name, or a hex string for 256/true colour."""
+    if color in codes:
+        return str(codes[color])
+    try:
+        r, g, b = int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16)
+    except ValueError:
+        return str(codes["default"])
+    return f"{extended};2;{r};{g};{b}"
+
+
+def _sgr(char: Char) -> str:
+    """Escape sequence selecting the attributes of one cell, starting from a reset."""
+    params = ["0"]
+    if char.bold:
+        params.append("1")
+    if char.italics:
+        params.append("3")
+    if char.underscore:
+        params.append("4")
+    if char.blink:
+        params.append("5")
+    if char.reverse:
+        params.append("7")
+    if char.strikethrough:
+        params.append("9")
+    if char.fg != "default":
+        params.append(_color_sgr(char.fg, _FG_CODES, 38))
+    if char.bg != "default":
+        params.append(_color_sgr(char.bg, _BG_CODES, 48))
+    return f"\x1b[{';'.join(params)}m"
+
+
+def _render_line(line: Mapping[int, Char], columns: int, default: Char) -> str:
+    """Render one screen line with SGR attributes, trimming trailing blanks."""
+    cells = [line.get(x, default) for x in range(columns)]
+    while cells and cells[-1].data == " " and cells[-1][1:] == default[1:]:
+        cells.pop()
+
+    out: list[str] = []
+    attrs = default[1:]
+    for cell in cells:
+        if not cell.data:
+            # Second half of a wide character
+            continue
+        if cell[1:] != attrs:
+            out.append(_sgr(cell))
+            attrs = cell[1:]
+        out.append(cell.data)
+    if attrs != default[1:]:
+        out.append("\x1b[0m")
+    return "".join(out)
+
+
+class ScreenMirror:
+    """Feeds terminal output through a headless VT parser.
+
+    Keeps the current screen plus a bounded history of lines that scrolled off
+    the top, so a reconnecting viewer gets a compact redraw instead of the raw
+    byte log (which for full-screen TUIs is mostly stale frames and can start
+    in the middle of an escape sequence).
+
+    Parsing is deferred: feed() only buffers, and the buffered output is parsed
+    once it grows past PARSE_THRESHOLD or when a snapshot is needed.
+    """
+
+    PARSE_THRESHOLD = 16 * 1024
+
+    def __init__(self, rows: int = 24, cols: int = 80, history: int = 500):
+        self._screen = pyte.HistoryScreen(cols, rows, history=history)
+        self._stream = pyte.ByteStream(self._screen)
+        self._pending: list[bytes] = []
+        self._pending_size = 0
+        self._fed = False
+
+    def feed(self, data: bytes) -> None:
+        """Queue terminal output for parsing."""
+        self._pending.append(data)
+        self._pending_size += len(data)
+        self._fed = True
+        if self._pending_size > self.PARSE_THRESHOLD:
+            self.flush()
+
+    def flush(self) -> None:
+        """Parse all queued output."""
+        if self._pending:
+            self._stream.feed(b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def resize(self, rows: int, cols: int) -> None:
+        """Resize the screen, after parsing output written at the old size."""
+        self.flush()
+        self._screen.resize(rows, cols)
+
+    def display(self) -> list[str]:
+        """Plain text of the current screen lines."""
+        self.flush()
+        return list(self._screen.display)
+
+    def snapshot(self) -> bytes:
+        """Serialize history and screen as bytes that redraw the terminal from reset."""
+        if not self._fed:
+            return b""
+        self.flush()
+        screen = self._screen
+        default = screen.default_char
+        history: Iterable[Mapping[int, Char]] = screen.history.top
+
+        out = ["\x1bc"]  # Full reset of the receiving terminal
+        for line in history:
+            out.append(_render_line(line, screen.columns, default) + "\r\n")
+        rows = [
+            _render_line(screen.buffer[y], screen.columns, default) for y in range(screen.lines)
+        ]
+        out.append("\r\n".join(rows))
+
+        # Restore private modes the program turned on (cursor keys, bracketed paste, mouse)
+        for mode in sorted(screen.mode):
+            if mode >= 32 and mode >> 5 not in _DEFAULT_PRIVATE_MODES:
+                out.append(f"\x1b[?{mode >> 5}h")
+        cursor = screen.cursor
+        out.append(f"\x1b[{cursor.y + 1};{cursor.x + 1}H")
+        out.append(_sgr(cursor.attrs))
+        if cursor.hidden:
+            out.append("\x1b[?25l")
+        return "".join(out).encode()
@@ -1,25 +1,92 @@
 """Web server for lsimons-agent."""
 
 import asyncio
-import contextlib
 import json
-import subprocess
+import os
+import re
+import resource
 import sys
-from collections.abc import Generator
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
-from lsimons_agent.agent import new_conversation, process_message
-
+from lsimons_agent.agent import default_checkpoints, new_conversation, process_message, undo_note
+from lsimons_agent.jobs import JobManager
+from lsimons_agent.tokens import Usage
+
+from lsimons_agent_web.admission import Admission, Rejected
+from lsimons_agent_web.assets import AssetCache
+from lsimons_agent_web.chat import ChatConnection, connection_count, push
+from lsimons_agent_web.pool import ShellPool
+from lsimons_agent_web.recording import list_recordings, recording_path
+from lsimons_agent_web.repos import RepoIndex
+from lsimons_agent_web.sessions import SessionKey, SessionManager, process_rss
+from lsimons_agent_web.store import SessionStore
+from lsimons_agent_web.sync import SyncJob, SyncManager
 from lsimons_agent_web.terminal import Terminal
-
-app = FastAPI()
+from lsimons_agent_web.workers import FORWARDED_HEADER, PrivateListener, forward_websocket
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
+    """Per-worker startup and shutdown."""
+    shell_pool.fill_async()
+    repo_index.start()
+    if store is not None:
+        private_listener.start()
+    yield
+    shell_pool.stop()
+    if store is not None:
+        private_listener.stop()
+        store.release_terminals()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Terminal session limits
+MAX_TERMINALS = int(os.environ.get("LSIMONS_AGENT_MAX_TERMINALS", "16"))
+TERMINAL_IDLE_TIMEOUT = float(os.environ.get("LSIMONS_AGENT_TERMINAL_IDLE_TIMEOUT", "3600"))
+
+# Admission control: concurrent chat turns and terminal connections, each with a
+# bounded wait queue; requests beyond that get 429/503 (WebSockets close with 1013)
+MAX_QUEUED = int(os.environ.get("LSIMONS_AGENT_MAX_QUEUED", "16"))
+QUEUE_TIMEOUT = float(os.environ.get("LSIMONS_AGENT_QUEUE_TIMEOUT", "30"))
+chat_admission = Admission(
+    "chat",
+    limit=int(os.environ.get("LSIMONS_AGENT_MAX_CHAT_TURNS", "4")),
+    max_queue=MAX_QUEUED,
+    timeout=QUEUE_TIMEOUT,
+)
+terminal_admission = Admission(
+    "terminals",
+    limit=int(os.environ.get("LSIMONS_AGENT_MAX_TERMINAL_CONNECTIONS", "32")),
+    max_queue=MAX_QUEUED,
+    timeout=QUEUE_TIMEOUT,
+)
+
+# Resource limits applied to every spawned terminal process
+TERMINAL_RLIMITS: dict[int, tuple[int, int]] = {resource.RLIMIT_CORE: (0, 0)}
+if max_memory_mb := os.environ.get("LSIMONS_AGENT_TERMINAL_MAX_MEMORY_MB"):
+    _max_memory = int(max_memory_mb) * 1024 * 1024
+    TERMINAL_RLIMITS[resource.RLIMIT_AS] = (_max_memory, _max_memory)
 
 # Terminal sessions keyed by (project_path, terminal_type, agent)
-# e.g., ("/Users/foo/git/org/repo", "agent", "claude") or ("...", "shell", None)
-terminals: dict[tuple[str, str, str | None], Terminal] = {}
+sessions = SessionManager(max_sessions=MAX_TERMINALS, idle_timeout=TERMINAL_IDLE_TIMEOUT)
+
+# Login shells started ahead of time so opening a shell terminal is instant
+SHELL_POOL_SIZE = int(os.environ.get("LSIMONS_AGENT_SHELL_POOL_SIZE", "2"))
+shell_pool = ShellPool(size=SHELL_POOL_SIZE, rlimits=TERMINAL_RLIMITS)
+
+# Opt-in asciicast recording of every terminal session
+_recordings_dir = os.environ.get("LSIMONS_AGENT_RECORDINGS_DIR")
+RECORDINGS_DIR = Path(_recordings_dir).expanduser() if _recordings_dir else None
 
 # Agent command mapping
 AGENT_COMMANDS: dict[str, list[str]] = {
@@ -34,6 +101,12 @@ AGENT_COMMANDS: dict[str, list[str]] = {
 GIT_BASE_DIR = Path.home() / "git"
 DEFAULT_PROJECT = GIT_BASE_DIR / "lsimons" / "lsimons-agent"
 
+# Cached index of the repositories in GIT_BASE_DIR
+repo_index = RepoIndex(GIT_BASE_DIR)
+
+# Background `auto git-sync` runs, one at a time
+sync_jobs = SyncManager(["auto", "git-sync"], repo_index)
+
 
 def get_resource_path(relative_path: str) -> Path:
     """Get path to resource, handling PyInstaller bundled mode."""
@@ -47,97 +120,334 @@ def get_resource_path(relative_path: str) -> Path:
 TEMPLATES_DIR = get_resource_path("templates")
 STATIC_DIR = get_resource_path("static")
 
-# Single-user conversation state
+# Templates and static files are read once; dev mode reloads them when they change
+assets = AssetCache(dev=os.environ.get("LSIMONS_AGENT_DEV") == "1")
+
+# Single-user conversation state, with its token usage
 messages = new_conversation()
+usage = Usage()
+
+# Separate conversations for API clients that pass a "session" id (e.g. load tests)
+MAX_CONVERSATIONS = 100
+conversations: OrderedDict[str, tuple[list[dict[str, Any]], Usage]] = OrderedDict()
+conversations_lock = threading.Lock()
+# Held for a whole turn (load, process, save), so turns of one session from
+# several connections or endpoints run one after another
+session_locks: OrderedDict[str, threading.Lock] = OrderedDict()
+# Background jobs of each session's conversation, so sessions can't see or kill
+# each other's jobs
+session_jobs: OrderedDict[str, JobManager] = OrderedDict()
+
+# Optional SQLite store for conversations and terminal ownership, needed to run
+# several worker processes; without it all state lives in this process
+DEFAULT_STORE = Path.home() / ".local" / "state" / "lsimons-agent" / "sessions.db"
+_store_path = os.environ.get("LSIMONS_AGENT_STORE")
+store = SessionStore(Path(_store_path).expanduser(), MAX_CONVERSATIONS) if _store_path else None
+
+# Private port of this worker, for terminal connections relayed by other workers
+private_listener = PrivateListener(app)
+
+
+def get_conversation(session: str | None) -> tuple[list[dict[str, Any]], Usage]:
+    """Return the conversation and its usage for a session id, or the default ones."""
+    if store is not None:
+        return store.load_conversation(session or "") or (new_conversation(), Usage())
+    if not session:
+        return messages, usage
+    with conversations_lock:
+        conversation = conversations.get(session)
+        if conversation is None:
+            conversation = conversations[session] = (new_conversation(), Usage())
+            while len(conversations) > MAX_CONVERSATIONS:
+                conversations.popitem(last=False)
+        conversations.move_to_end(session)
+        return conversation
+
+
+def session_lock(session: str | None) -> threading.Lock:
+    """The lock for a session's turns."""
+    key = session or ""
+    with conversations_lock:
+        lock = session_locks.get(key)
+        if lock is None:
+            lock = session_locks[key] = threading.Lock()
+            # Forget locks of idle sessions, never one a turn is holding
+            excess = len(session_locks) - MAX_CONVERSATIONS
+            idle = [k for k, held in session_locks.items() if k != key and not held.locked()]
+            for old in idle[: max(0, excess)]:
+                del session_locks[old]
+        session_locks.move_to_end(key)
+        return lock
+
+
+def conversation_jobs(session: str | None) -> JobManager:
+    """The background jobs of a session's conversation."""
+    key = session or ""
+    with conversations_lock:
+        manager = session_jobs.get(key)
+        if manager is None:
+            manager = session_jobs[key] = JobManager()
+            # Forget the jobs of idle sessions, never ones still running
+            excess = len(session_jobs) - MAX_CONVERSATIONS
+            idle = [k for k, m in session_jobs.items() if k != key and not m.any_running()]
+            for old in idle[: max(0, excess)]:
+                session_jobs.pop(old).close()
+        session_jobs.move_to_end(key)
+        return manager
+
+
+def save_conversation(
+    session: str | None, conversation: list[dict[str, Any]], session_usage: Usage
+) -> None:
+    """Write a conversation back to the store after a turn (in memory it's already current)."""
+    if store is not None:
+        store.save_conversation(session or "", conversation, session_usage)
 
 
-def event_stream(user_message: str) -> Generator[str]:
+def event_stream(user_message: str, session: str | None = None) -> Generator[str]:
     """Generate SSE events for a chat response."""
-    for event_type, data in process_message(messages, user_message):
-        if event_type == "text":
-            yield f"event: text\ndata: {json.dumps({'content': data})}\n\n"
-        elif event_type == "tool":
-            yield f"event: tool\ndata: {json.dumps(data)}\n\n"
-        elif event_type == "done":
-            yield "event: done\ndata: {}\n\n"
-
-
-def scan_git_repos() -> dict[str, list[str]]:
-    """Scan ~/git for git repositories, organized by org."""
-    repos: dict[str, list[str]] = {}
-
-    if not GIT_BASE_DIR.exists():
-        return repos
-
-    for org_dir in sorted(GIT_BASE_DIR.iterdir()):
-        if not org_dir.is_dir() or org_dir.name.startswith("."):
-            continue
-
-        org_repos: list[str] = []
-        for repo_dir in sorted(org_dir.iterdir()):
-            if not repo_dir.is_dir() or repo_dir.name.startswith("."):
-                continue
-            # Check if it's a git repo
-            if (repo_dir / ".git").exists():
-                org_repos.append(repo_dir.name)
-
-        if org_repos:
-            repos[org_dir.name] = org_repos
-
-    return repos
+    with session_lock(session):
+        conversation, session_usage = get_conversation(session)
+        try:
+            for event_type, data in process_message(
+                conversation,
+                user_message,
+                session_usage,
+                checkpoints=default_checkpoints(session or ""),
+                jobs=conversation_jobs(session),
+            ):
+                if event_type == "text":
+                    yield f"event: text\ndata: {json.dumps({'content': data})}\n\n"
+                elif event_type == "tool":
+                    yield f"event: tool\ndata: {json.dumps(data)}\n\n"
+                elif event_type == "usage":
+                    yield f"event: usage\ndata: {json.dumps(data)}\n\n"
+                elif event_type == "warning":
+                    yield f"event: warning\ndata: {json.dumps({'message': data})}\n\n"
+                elif event_type == "done":
+                    yield "event: done\ndata: {}\n\n"
+        finally:
+            save_conversation(session, conversation, session_usage)
 
 
 @app.get("/", response_class=HTMLResponse)
-def index() -> str:
+def index(request: Request) -> Response:
     """Serve the terminal page."""
-    return (TEMPLATES_DIR / "terminal.html").read_text()
+    # Revalidate every load so template changes show up after a restart
+    return assets.response(
+        request, TEMPLATES_DIR / "terminal.html", "text/html; charset=utf-8", "no-cache"
+    )
 
 
 @app.get("/favicon.ico")
-def favicon() -> FileResponse:
+def favicon(request: Request) -> Response:
     """Serve the favicon."""
-    return FileResponse(STATIC_DIR / "favicon.ico", media_type="image/x-icon")
+    return assets.response(
+        request, STATIC_DIR / "favicon.ico", "image/x-icon", "public, max-age=86400"
+    )
 
 
 @app.get("/logo.png")
-def logo() -> FileResponse:
+def logo(request: Request) -> Response:
     """Serve the logo."""
-    return FileResponse(STATIC_DIR / "logo.png", media_type="image/png")
+    return assets.response(request, STATIC_DIR / "logo.png", "image/png", "public, max-age=86400")
 
 
 @app.post("/chat")
 def chat_endpoint(request: dict[str, Any]) -> StreamingResponse:
-    """Handle chat messages and return SSE stream."""
+    """Handle chat messages and return SSE stream.
+
+    "priority": "batch" marks non-interactive traffic, which waits behind
+    interactive requests when all turn slots are busy.
+    """
+    session = request.get("session")
+    try:
+        granted = chat_admission.acquire(str(request.get("priority") or "interactive"))
+    except Rejected as e:
+        raise HTTPException(
+            status_code=e.status, detail=e.reason, headers={"Retry-After": str(e.retry_after)}
+        ) from e
+    stream = event_stream(str(request.get("message", "")), str(session) if session else None)
     return StreamingResponse(
-        event_stream(str(request.get("message", ""))),
-        media_type="text/event-stream",
+        chat_admission.release_after(stream, granted), media_type="text/event-stream"
     )
 
 
 @app.post("/clear")
 def clear() -> dict[str, str]:
     """Clear conversation history."""
-    global messages
+    global messages, usage
     messages = new_conversation()
+    usage = Usage()
+    conversation_jobs(None).close()
+    if store is not None:
+        store.delete_conversation("")
+    push("cleared")
     return {"status": "ok"}
 
 
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket) -> None:
+    """Chat over a WebSocket: several sessions and turns, cancellation, and pushes."""
+    await websocket.accept()
+    connection = ChatConnection(
+        websocket,
+        get_conversation,
+        _process_message,
+        chat_admission,
+        save_conversation,
+        session_lock,
+    )
+    await connection.run()
+
+
+def _process_message(
+    *args: Any, session: str | None = None, **kwargs: Any
+) -> Generator[tuple[str, Any]]:
+    # Looked up on each call so tests can replace process_message
+    return process_message(
+        *args,
+        checkpoints=default_checkpoints(session or ""),
+        jobs=conversation_jobs(session),
+        **kwargs,
+    )
+
+
+@app.get("/api/usage")
+def get_usage(session: str | None = None) -> dict[str, Any]:
+    """Token usage of a conversation so far."""
+    return get_conversation(session)[1].to_dict()
+
+
+@app.get("/api/checkpoints")
+def list_checkpoints(session: str | None = None) -> list[dict[str, Any]]:
+    """A session's turns that changed files, oldest first, with the files each one changed."""
+    checkpoints = default_checkpoints(session or "")
+    turns = checkpoints.list_turns() if checkpoints is not None else []
+    return [
+        {"id": t["id"], "label": t["label"], "created": t["created"], "files": list(t["files"])}
+        for t in turns
+    ]
+
+
+@app.post("/api/undo")
+def undo(session: str | None = None) -> dict[str, Any]:
+    """Restore the files changed by the session's latest turn that changed any."""
+    checkpoints = default_checkpoints(session or "")
+    turn = checkpoints.undo() if checkpoints is not None else None
+    if turn is None:
+        raise HTTPException(status_code=404, detail="Nothing to undo")
+    if turn["restored"]:
+        conversation, session_usage = get_conversation(session)
+        conversation.append({"role": "user", "content": undo_note(turn)})
+        save_conversation(session, conversation, session_usage)
+    return {
+        "id": turn["id"],
+        "label": turn["label"],
+        "restored": turn["restored"],
+        "failed": turn["failed"],
+    }
+
+
 @app.get("/api/repos")
-def list_repos() -> dict[str, list[str]]:
-    """List available git repositories."""
-    return scan_git_repos()
+def list_repos(refresh: bool = False) -> dict[str, list[str]]:
+    """List available git repositories (refresh=true forces a full rescan)."""
+    if refresh:
+        repo_index.refresh(force=True)
+    return repo_index.repos()
 
 
 @app.post("/api/sync")
-def sync_repos() -> dict[str, list[str]]:
-    """Run auto git-sync and return updated repo list."""
-    with contextlib.suppress(subprocess.CalledProcessError, FileNotFoundError):
-        subprocess.run(["auto", "git-sync"], check=True, capture_output=True)
-    return scan_git_repos()
+def sync_repos() -> dict[str, Any]:
+    """Start auto git-sync in the background (or join the running sync)."""
+    return sync_jobs.start().to_dict()
+
+
+def _get_sync_job(job_id: str) -> SyncJob:
+    job = sync_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
+
+
+@app.get("/api/sync/{job_id}")
+def sync_status(job_id: str) -> dict[str, Any]:
+    """Get the status of a sync job."""
+    return _get_sync_job(job_id).to_dict()
+
+
+@app.post("/api/sync/{job_id}/cancel")
+def sync_cancel(job_id: str) -> dict[str, Any]:
+    """Cancel a running sync job."""
+    job = _get_sync_job(job_id)
+    job.cancel()
+    return job.to_dict()
+
+
+def sync_event_stream(job: SyncJob) -> Generator[str]:
+    """Generate SSE events for sync progress, ending with the result."""
+    seen = 0
+    finished = False
+    while not finished:
+        lines, finished = job.wait_for_progress(seen, timeout=15.0)
+        seen += len(lines)
+        for line in lines:
+            yield f"event: progress\ndata: {json.dumps({'line': line})}\n\n"
+        if not lines and not finished:
+            yield ": keep-alive\n\n"
+    result = job.to_dict()
+    result["repos"] = repo_index.repos()
+    yield f"event: done\ndata: {json.dumps(result)}\n\n"
+
+
+@app.get("/api/sync/{job_id}/events")
+def sync_events(job_id: str) -> StreamingResponse:
+    """Stream sync progress as SSE."""
+    return StreamingResponse(
+        sync_event_stream(_get_sync_job(job_id)), media_type="text/event-stream"
+    )
+
+
+@app.websocket("/ws/repos")
+async def repos_websocket(websocket: WebSocket) -> None:
+    """Push the repo list, then repos added and removed as they change."""
+    await websocket.accept()
+    repo_index.start()
+
+    try:
+        version, repos = await asyncio.to_thread(repo_index.snapshot)
+        await websocket.send_json({"type": "repos", "repos": repos})
+        while True:
+            # Wait for changes, noticing a disconnect in the meantime
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=0.5)
+                if message.get("type") == "websocket.disconnect":
+                    break
+            except TimeoutError:
+                pass
+
+            changes = repo_index.changes_since(version)
+            if changes is None:
+                # Too far behind the change log: send everything again
+                version, repos = await asyncio.to_thread(repo_index.snapshot)
+                await websocket.send_json({"type": "repos", "repos": repos})
+                continue
+            new_version, added, removed = changes
+            if new_version != version:
+                version = new_version
+                await websocket.send_json({"type": "changes", "added": added, "removed": removed})
+    except WebSocketDisconnect, RuntimeError:
+        # WebSocket disconnected
+        pass
 
 
-async def _handle_terminal_websocket(websocket: WebSocket, terminal: Terminal) -> None:
-    """Handle WebSocket I/O for a terminal."""
+async def _handle_terminal_websocket(
+    websocket: WebSocket, key: SessionKey, terminal: Terminal
+) -> None:
+    """Handle WebSocket I/O for one viewer of a terminal."""
+    # Each viewer reads from its own cursor, starting with a snapshot of the screen
+    # (and getting a fresh snapshot if it falls behind the scrollback)
+    subscriber = terminal.subscribe()
     try:
         while True:
             # Check if terminal is still running
@@ -145,10 +455,8 @@ async def _handle_terminal_websocket(websocket: WebSocket, terminal: Terminal) -
                 break
 
             # Poll for terminal output
-            while True:
-                data = terminal.read_nowait()
-                if data is None:
-                    break
+            data = subscriber.read_nowait()
+            if data is not None:
                 try:
                     await websocket.send_bytes(data)
                 except RuntimeError:
@@ -161,22 +469,54 @@ async def _handle_terminal_websocket(websocket: WebSocket, terminal: Terminal) -
                 if message.get("type") == "websocket.disconnect":
                     break
                 if "bytes" in message:
-                    terminal.write(message["bytes"])
+                    subscriber.write(message["bytes"])
                 elif "text" in message:
                     # Handle JSON commands (resize)
                     try:
                         cmd: dict[str, Any] = json.loads(message["text"])
                         if cmd.get("type") == "resize":
-                            terminal.resize(cmd["rows"], cmd["cols"])
+                            terminal.resize(cmd["rows"], cmd["cols"], subscriber)
                     except json.JSONDecodeError:
                         # Plain text input
-                        terminal.write(message["text"].encode())
+                        subscriber.write(message["text"].encode())
             except TimeoutError:
                 pass
 
     except WebSocketDisconnect, RuntimeError:
         # WebSocket disconnected
         pass
+    finally:
+        terminal.unsubscribe(subscriber)
+        sessions.touch(key)
+
+
+async def _admit_terminal(websocket: WebSocket) -> float | None:
+    """Wait for a terminal connection slot; when refused, close with 1013 (try again later)."""
+    try:
+        return await asyncio.to_thread(terminal_admission.acquire)
+    except Rejected as e:
+        await websocket.close(code=1013, reason=f"{e.reason}; retry after {e.retry_after}s")
+        return None
+
+
+async def _forward_to_owner(websocket: WebSocket, key: SessionKey) -> bool:
+    """Relay the connection when another worker owns the terminal; True if it did."""
+    if store is None or websocket.headers.get(FORWARDED_HEADER):
+        return False
+    query = f"?{websocket.url.query}" if websocket.url.query else ""
+    for _ in range(3):
+        pid, port = await asyncio.to_thread(
+            store.claim_terminal, json.dumps(key), private_listener.port
+        )
+        if pid == os.getpid():
+            return False
+        url = f"ws://127.0.0.1:{port}{websocket.url.path}{query}"
+        if await forward_websocket(websocket, url):
+            return True
+        # The owner is gone (its pid may live on in another process): take over
+        await asyncio.to_thread(store.drop_terminal_owner, json.dumps(key), pid, port)
+    await websocket.close(code=1011)
+    return True
 
 
 def get_project_path(project: str | None) -> str:
@@ -191,13 +531,23 @@ def get_project_path(project: str | None) -> str:
     return str(DEFAULT_PROJECT)
 
 
+def record_if_enabled(terminal: Terminal, key: SessionKey) -> Terminal:
+    """Start recording a new terminal when recording is enabled."""
+    if RECORDINGS_DIR is not None:
+        project_path, terminal_type, agent = key
+        label = f"{Path(project_path).name}-{terminal_type}-{agent or 'shell'}"
+        # Same-named repos in other orgs, or a quick reopen, share the rest
+        unique = uuid.uuid4().hex[:8]
+        name = time.strftime("%Y%m%d-%H%M%S-") + re.sub(r"[^\w.-]", "_", label) + f"-{unique}"
+        terminal.start_recording(RECORDINGS_DIR, name)
+    return terminal
+
+
 @app.websocket("/ws/terminal/agent")
 async def terminal_agent_websocket(
     websocket: WebSocket, agent: str = "lsimons", project: str | None = None
 ) -> None:
     """WebSocket endpoint for agent terminal."""
-    global terminals
-
     await websocket.accept()
 
     # Validate agent type
@@ -205,72 +555,139 @@ async def terminal_agent_websocket(
         agent = "lsimons"
 
     project_path = get_project_path(project)
-    key = (project_path, "agent", agent)
-
-    # Clean up dead terminal
-    if key in terminals and not terminals[key].is_running():
-        terminals[key].stop()
-        del terminals[key]
-
-    # Start new terminal or reconnect to existing
-    if key not in terminals:
-        terminal = Terminal(command=AGENT_COMMANDS[agent], cwd=project_path)
-        terminal.start()
-        terminals[key] = terminal
-    else:
-        # Reconnecting - replay scrollback buffer
-        scrollback = terminals[key].get_scrollback()
-        if scrollback:
-            await websocket.send_bytes(scrollback)
-
-    await _handle_terminal_websocket(websocket, terminals[key])
+    key: SessionKey = (project_path, "agent", agent)
+
+    def new_agent() -> Terminal:
+        command = AGENT_COMMANDS[agent]
+        terminal = Terminal(command=command, cwd=project_path, rlimits=TERMINAL_RLIMITS)
+        return record_if_enabled(terminal, key)
+
+    if await _forward_to_owner(websocket, key):
+        return
+    granted = await _admit_terminal(websocket)
+    if granted is None:
+        return
+    try:
+        # Start new terminal or attach to existing (possibly shared with other viewers)
+        terminal = await asyncio.to_thread(sessions.attach, key, new_agent)
+        await _handle_terminal_websocket(websocket, key, terminal)
+    finally:
+        terminal_admission.release(granted)
 
 
 @app.websocket("/ws/terminal/shell")
 async def terminal_shell_websocket(websocket: WebSocket, project: str | None = None) -> None:
     """WebSocket endpoint for shell terminal."""
-    global terminals
-
     await websocket.accept()
 
     project_path = get_project_path(project)
-    key = (project_path, "shell", None)
-
-    # Clean up dead terminal
-    if key in terminals and not terminals[key].is_running():
-        terminals[key].stop()
-        del terminals[key]
-
-    # Start new terminal or reconnect to existing
-    if key not in terminals:
-        terminal = Terminal(cwd=project_path)
-        terminal.start()
-        terminals[key] = terminal
-    else:
-        # Reconnecting - replay scrollback buffer
-        scrollback = terminals[key].get_scrollback()
-        if scrollback:
-            await websocket.send_bytes(scrollback)
+    key: SessionKey = (project_path, "shell", None)
+
+    def new_shell() -> Terminal:
+        # Prefer a pre-warmed login shell over paying for rc files now
+        warm = shell_pool.acquire(project_path)
+        terminal = warm or Terminal(cwd=project_path, rlimits=TERMINAL_RLIMITS)
+        return record_if_enabled(terminal, key)
+
+    if await _forward_to_owner(websocket, key):
+        return
+    granted = await _admit_terminal(websocket)
+    if granted is None:
+        return
+    try:
+        # Start new terminal or attach to existing (possibly shared with other viewers)
+        terminal = await asyncio.to_thread(sessions.attach, key, new_shell)
+        await _handle_terminal_websocket(websocket, key, terminal)
+    finally:
+        terminal_admission.release(granted)
+
+
+@app.get("/api/terminals")
+def list_terminals() -> list[dict[str, Any]]:
+    """List terminal sessions with viewer counts, idle time and memory use."""
+    return sessions.list_sessions()
+
+
+@app.get("/api/recordings")
+def list_terminal_recordings() -> list[dict[str, Any]]:
+    """List asciicast recordings, newest first."""
+    if RECORDINGS_DIR is None:
+        return []
+    return list_recordings(RECORDINGS_DIR)
 
-    await _handle_terminal_websocket(websocket, terminals[key])
+
+@app.get("/api/recordings/{name}")
+def get_terminal_recording(name: str) -> FileResponse:
+    """Download an asciicast recording."""
+    path = recording_path(RECORDINGS_DIR, name) if RECORDINGS_DIR is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    return FileResponse(path, media_type="application/x-asciicast", filename=name)
+
+
+@app.get("/api/metrics")
+def metrics() -> dict[str, Any]:
+    """Server process metrics, sampled by load tests."""
+    if store is not None:
+        conversation_count = store.conversation_count()
+    else:
+        with conversations_lock:
+            conversation_count = len(conversations)
+    return {
+        "pid": os.getpid(),
+        "rss": process_rss(os.getpid()),
+        "terminals": len(sessions),
+        "conversations": conversation_count,
+        "chat_connections": connection_count(),
+        "admission": {"chat": chat_admission.to_dict(), "terminals": terminal_admission.to_dict()},
+    }
 
 
 @app.post("/terminal/stop")
 def terminal_stop() -> dict[str, str]:
     """Stop all terminal sessions."""
-    global terminals
-    for terminal in terminals.values():
-        terminal.stop()
-    terminals.clear()
+    sessions.stop_all()
     return {"status": "ok"}
 
 
 def main() -> None:
     """Run the web server."""
+    import argparse
+
     import uvicorn
 
-    print("Starting web server on http://localhost:8765")
-    uvicorn.run(app, host="127.0.0.1", port=8765)
+    global store
+
+    parser = argparse.ArgumentParser(description="Web server for lsimons-agent")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("LSIMONS_AGENT_WORKERS", "1")),
+        help="worker processes (more than one needs a session store)",
+    )
+    parser.add_argument(
+        "--store",
+        default=os.environ.get("LSIMONS_AGENT_STORE"),
+        help=f"SQLite session store (default with several workers: {DEFAULT_STORE})",
+    )
+    args = parser.parse_args()
+
+    store_path: str | None = args.store
+    if args.workers > 1 and not store_path:
+        store_path = str(DEFAULT_STORE)
+    if store_path:
+        # Worker processes import this module afresh and read the store from the environment
+        os.environ["LSIMONS_AGENT_STORE"] = store_path
+        store = SessionStore(Path(store_path).expanduser(), MAX_CONVERSATIONS)
+        print(f"Session store: {store.path}")
+
+    print(f"Starting web server on http://localhost:8765 ({args.workers} workers)")
+    if args.workers > 1:
+        uvicorn.run(
+            "lsimons_agent_web.server:app", host="127.0.0.1", port=8765, workers=args.workers
+        )
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8765)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""Terminal session manager with idle reaping and a session cap."""
+
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from lsimons_agent_web.terminal import Terminal
+
+# Terminal sessions keyed by (project_path, terminal_type, agent)
+# e.g., ("/Users/foo/git/org/repo", "agent", "claude") or ("...", "shell", None)
+SessionKey = tuple[str, str, str | None]
+
+
+def process_rss(pid: int) -> int | None:
+    """Return resident memory of a process in bytes, or None if unknown."""
+    status = Path(f"/proc/{pid}/status")
+    if status.exists():
+        try:
+            for line in status.read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        except OSError, ValueError:
+            return None
+        return None
+    if sys.platform == "darwin":
+        try:
+            result = subprocess.run(
+                ["ps", "-o", "rss=", "-p", str(pid)],
+                capture_output=True,
+                text=True,
+                timeout=2,
+            )
+            return int(result.stdout.strip()) * 1024
+        except OSError, ValueError, subprocess.TimeoutExpired:
+            return None
+    return None
+
+
+class SessionManager:
+    """Owns all terminal sessions.
+
+    Sessions are kept in least-recently-used order. Starting a session beyond
+    max_sessions evicts the least recently used one, preferring sessions nobody
+    is watching. A background reaper stops sessions that have had no viewers and
+    no output for idle_timeout seconds.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 16,
+        idle_timeout: float = 3600.0,
+        reap_interval: float = 30.0,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._sessions: OrderedDict[SessionKey, Terminal] = OrderedDict()
+        self._last_used: dict[SessionKey, float] = {}
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+
+    def attach(self, key: SessionKey, factory: Callable[[], Terminal]) -> Terminal:
+        """Return the running terminal for key, starting one with factory if needed.
+
+        The factory and the stops of evicted sessions can block (forking a PTY,
+        joining reader threads), so they run outside the lock. If another caller
+        starts the same key meanwhile, theirs wins and ours is stopped.
+        """
+        self._start_reaper()
+        evicted: list[Terminal] = []
+        with self._lock:
+            terminal = self._running(key, evicted)
+            if terminal is not None:
+                self._use(key)
+        if terminal is None:
+            started = factory()
+            started.start()
+            with self._lock:
+                terminal = self._running(key, evicted)
+                if terminal is None:
+                    while len(self._sessions) >= self.max_sessions:
+                        victim = self._lru_victim()
+                        evicted.append(self._sessions.pop(victim))
+                        self._last_used.pop(victim, None)
+                    terminal = started
+                    self._sessions[key] = terminal
+                else:
+                    evicted.append(started)
+                self._use(key)
+        self._stop_all(evicted)
+        return terminal
+
+    def _use(self, key: SessionKey) -> None:
+        """Mark key as most recently used (caller holds the lock)."""
+        self._sessions.move_to_end(key)
+        self._last_used[key] = time.monotonic()
+
+    def _running(self, key: SessionKey, evicted: list[Terminal]) -> Terminal | None:
+        """The running terminal for key, moving a dead one to evicted (caller holds the lock)."""
+        terminal = self._sessions.get(key)
+        if terminal is not None and not terminal.is_running():
+            evicted.append(self._sessions.pop(key))
+            self._last_used.pop(key, None)
+            terminal = None
+        return terminal
+
+    def touch(self, key: SessionKey) -> None:
+        """Mark a session as used, e.g. when a viewer detaches."""
+        with self._lock:
+            if key in self._sessions:
+                self._use(key)
+
+    def _lru_victim(self) -> SessionKey:
+        """Pick the session to evict (caller holds the lock)."""
+        for key, terminal in self._sessions.items():
+            if terminal.subscriber_count() == 0:
+                return key
+        return next(iter(self._sessions))
+
+    def _idle_keys(self, now: float) -> list[SessionKey]:
+        """Sessions with no viewers, no recent output and no recent use."""
+        idle: list[SessionKey] = []
+        for key, terminal in self._sessions.items():
+            if not terminal.is_running():
+                idle.append(key)
+                continue
+            if terminal.subscriber_count() > 0:
+                continue
+            last_active = max(terminal.last_output, self._last_used.get(key, 0.0))
+            if now - last_active > self.idle_timeout:
+                idle.append(key)
+        return idle
+
+    def reap_idle(self) -> list[SessionKey]:
+        """Stop idle and dead sessions, returning their keys."""
+        with self._lock:
+            keys = self._idle_keys(time.monotonic())
+            stopped = [self._sessions.pop(key) for key in keys]
+            for key in keys:
+                self._last_used.pop(key, None)
+        self._stop_all(stopped)
+        return keys
+
+    def _reap_loop(self) -> None:
+        """Periodically reap idle sessions (runs in thread)."""
+        while True:
+            time.sleep(self.reap_interval)
+            self.reap_idle()
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+            self._reaper.start()
+
+    def stop_all(self) -> None:
+        """Stop every session in parallel."""
+        with self._lock:
+            stopped = list(self._sessions.values())
+            self._sessions.clear()
+            self._last_used.clear()
+        self._stop_all(stopped)
+
+    def _stop_all(self, terminals: list[Terminal]) -> None:
+        """Stop terminals concurrently so teardown takes one stop, not one per session."""
+        if not terminals:
+            return
+        if len(terminals) == 1:
+            terminals[0].stop()
+            return
+        with ThreadPoolExecutor(max_workers=len(terminals)) as executor:
+            for terminal in terminals:
+                executor.submit(terminal.stop)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def list_sessions(self) -> list[dict[str, Any]]:
+        """Describe sessions in least-recently-used order, with memory accounting."""
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._sessions.items())
+            last_used = dict(self._last_used)
+        sessions: list[dict[str, Any]] = []
+        for (project, terminal_type, agent), terminal in items:
+            key = (project, terminal_type, agent)
+            last_active = max(terminal.last_output, last_used.get(key, 0.0))
+            sessions.append(
+                {
+                    "project": project,
+                    "type": terminal_type,
+                    "agent": agent,
+                    "pid": terminal.pid,
+                    "running": terminal.is_running(),
+                    "viewers": terminal.subscriber_count(),
+                    "idle_seconds": round(now - last_active, 1),
+                    "scrollback_bytes": terminal.scrollback_size(),
+                    "rss_bytes": process_rss(terminal.pid) if terminal.pid else None,
+                }
+            )
+        return sessions
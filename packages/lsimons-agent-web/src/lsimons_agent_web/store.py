@@ -0,0 +1,145 @@
+"""SQLite session store shared by several server worker processes.
+
+Conversations (with their token usage) are stored as JSON so any worker can
+continue any chat session. Terminals are real processes and can't move, so
+the store instead records which worker owns each terminal session and the
+private port it listens on; other workers forward terminal WebSockets there.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from lsimons_agent.tokens import Usage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    session TEXT PRIMARY KEY,
+    messages TEXT NOT NULL,
+    usage TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terminal_owners (
+    key TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    port INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SessionStore:
+    """Conversations and terminal ownership in one SQLite database (WAL mode).
+
+    Safe to use from many threads and processes: each thread gets its own
+    connection, and WAL lets readers proceed while a worker writes.
+    """
+
+    def __init__(self, path: Path, max_conversations: int = 100):
+        self.path = path
+        self.max_conversations = max_conversations
+        self._local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        db: sqlite3.Connection | None = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit; multi-statement updates use explicit transactions
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def load_conversation(self, session: str) -> tuple[list[dict[str, Any]], Usage] | None:
+        row = (
+            self._db()
+            .execute("SELECT messages, usage FROM conversations WHERE session = ?", (session,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        messages: list[dict[str, Any]] = json.loads(row[0])
+        return messages, Usage.from_dict(json.loads(row[1]))
+
+    def save_conversation(self, session: str, messages: list[dict[str, Any]], usage: Usage) -> None:
+        """Store a conversation, dropping the least recently saved beyond the cap."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?)",
+                (session, json.dumps(messages), json.dumps(usage.to_dict()), time.time()),
+            )
+            db.execute(
+                "DELETE FROM conversations WHERE session NOT IN "
+                "(SELECT session FROM conversations ORDER BY updated DESC LIMIT ?)",
+                (self.max_conversations,),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def delete_conversation(self, session: str) -> None:
+        self._db().execute("DELETE FROM conversations WHERE session = ?", (session,))
+
+    def conversation_count(self) -> int:
+        return int(self._db().execute("SELECT COUNT(*) FROM conversations").fetchone()[0])
+
+    def claim_terminal(self, key: str, port: int) -> tuple[int, int]:
+        """Return (pid, port) of the worker owning a terminal session.
+
+        The caller becomes the owner when nobody, or a worker that has
+        exited, owned it.
+        """
+        pid = os.getpid()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT pid, port FROM terminal_owners WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (row[0] == pid or pid_alive(row[0])):
+                owner = (int(row[0]), int(row[1]))
+            else:
+                db.execute(
+                    "INSERT OR REPLACE INTO terminal_owners VALUES (?, ?, ?, ?)",
+                    (key, pid, port, time.time()),
+                )
+                owner = (pid, port)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return owner
+
+    def drop_terminal_owner(self, key: str, pid: int, port: int) -> None:
+        """Forget an owner that can't be reached (unless someone else claimed it since).
+
+        Needed because a crashed worker's pid may be reused by an unrelated
+        process, which pid_alive can't tell apart.
+        """
+        self._db().execute(
+            "DELETE FROM terminal_owners WHERE key = ? AND pid = ? AND port = ?", (key, pid, port)
+        )
+
+    def release_terminals(self) -> None:
+        """Give up every terminal session owned by this process (at shutdown)."""
+        self._db().execute("DELETE FROM terminal_owners WHERE pid = ?", (os.getpid(),))
@@ -0,0 +1,153 @@
+"""Background repository sync jobs with streamed progress."""
+
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any
+
+from lsimons_agent_web.repos import RepoIndex
+
+
+class SyncJob:
+    """Runs the sync command in the background, collecting output lines as progress."""
+
+    def __init__(self, command: list[str], index: RepoIndex):
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.status = "running"  # running, done, failed or cancelled
+        self.lines: list[str] = []
+        self.added: list[str] = []
+        self.removed: list[str] = []
+        self.returncode: int | None = None
+        self.started = time.time()
+        self.finished: float | None = None
+        self._index = index
+        self._index_version, _ = index.snapshot()
+        self._process: subprocess.Popen[str] | None = None
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _append(self, line: str) -> None:
+        with self._cond:
+            self.lines.append(line)
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        """Run the command and the final rescan (runs in thread)."""
+        try:
+            # New session so cancel() can stop git processes spawned by the command
+            process = subprocess.Popen(
+                self.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                start_new_session=True,
+            )
+        except OSError as e:
+            self._append(f"Error: {e}")
+            self._finish("failed")
+            return
+
+        self._process = process
+        if self._cancelled:
+            # Cancelled while starting
+            self.cancel()
+        for line in process.stdout or []:
+            self._append(line.rstrip("\n"))
+        self.returncode = process.wait()
+
+        if self._cancelled:
+            status = "cancelled"
+        elif self.returncode == 0:
+            status = "done"
+        else:
+            status = "failed"
+        # Even a failed or cancelled sync may have cloned or removed some repos.
+        # The rescan only lists orgs whose directories changed.
+        self._index.refresh()
+        changes = self._index.changes_since(self._index_version)
+        if changes is not None:
+            _, self.added, self.removed = changes
+        self._finish(status)
+
+    def _finish(self, status: str) -> None:
+        with self._cond:
+            self.status = status
+            self.finished = time.time()
+            self._cond.notify_all()
+
+    def is_running(self) -> bool:
+        return self.status == "running"
+
+    def cancel(self) -> None:
+        """Stop the sync command (and anything it started)."""
+        if not self.is_running():
+            return
+        self._cancelled = True
+        process = self._process
+        if process is None or process.poll() is not None:
+            return
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            with contextlib.suppress(ProcessLookupError, PermissionError):
+                os.killpg(process.pid, signal.SIGKILL)
+
+    def wait_for_progress(self, seen: int, timeout: float) -> tuple[list[str], bool]:
+        """Wait for output lines past the first `seen`; returns (new lines, finished)."""
+        with self._cond:
+            if len(self.lines) <= seen and self.is_running():
+                self._cond.wait(timeout)
+            return self.lines[seen:], not self.is_running()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "lines": len(self.lines),
+            "returncode": self.returncode,
+            "started": self.started,
+            "finished": self.finished,
+            "added": self.added,
+            "removed": self.removed,
+        }
+
+
+class SyncManager:
+    """Starts sync jobs, running at most one at a time."""
+
+    MAX_JOBS = 10  # Finished jobs kept around for status queries
+
+    def __init__(self, command: list[str], index: RepoIndex):
+        self.command = command
+        self.index = index
+        self._jobs: dict[str, SyncJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> SyncJob:
+        """Start a sync, or return the one already running."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.is_running():
+                    return job
+            job = SyncJob(self.command, self.index)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.MAX_JOBS:
+                del self._jobs[next(iter(self._jobs))]
+        job.start()
+        return job
+
+    def get(self, job_id: str) -> SyncJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -2,43 +2,114 @@
 
 import contextlib
 import fcntl
+import functools
 import glob
 import os
 import pty
+import resource
 import select
 import struct
 import termios
 import threading
-from queue import Empty, Queue
+import time
+from pathlib import Path
+
+from lsimons_agent_web.recording import Recorder
+from lsimons_agent_web.screen import ScreenMirror
+
+
+@functools.cache
+def terminal_env() -> dict[str, str]:
+    """Environment for terminal processes, computed once per server process."""
+    # Set up environment for colors and proper shell detection
+    env = os.environ.copy()
+    env["TERM"] = "xterm-256color"
+    env["CLICOLOR"] = "1"
+    env["CLICOLOR_FORCE"] = "1"
+    env["COLORTERM"] = "truecolor"
+    env["TERM_PROGRAM"] = "lsimons-agent"
+    env["LC_TERMINAL"] = "lsimons-agent"
+    # Remove ZDOTDIR so zsh uses $HOME for .zshrc
+    env.pop("ZDOTDIR", None)
+
+    # Ensure PATH includes common bin directories (app bundles have minimal PATH)
+    home = os.path.expanduser("~")
+    extra_paths = [
+        f"{home}/git/lsimons/lsimons-agent/.venv/bin",
+        f"{home}/.local/bin",
+        f"{home}/.cargo/bin",
+        "/opt/homebrew/bin",
+        "/opt/homebrew/sbin",
+        "/usr/local/bin",
+        "/usr/local/sbin",
+    ]
+    # Add NVM node bin directories (glob for any installed version)
+    nvm_paths = glob.glob(f"{home}/.local/share/nvm/versions/node/*/bin")
+    nvm_paths += glob.glob(f"{home}/.nvm/versions/node/*/bin")
+    extra_paths.extend(sorted(nvm_paths, reverse=True))  # Prefer newer versions
+    current_path = env.get("PATH", "/usr/bin:/bin")
+    env["PATH"] = ":".join(extra_paths) + ":" + current_path
+    return env
+
+
+class Subscriber:
+    """A viewer attached to a terminal, reading output from its own cursor."""
+
+    def __init__(self, terminal: Terminal, cursor: int):
+        self.terminal = terminal
+        self.cursor = cursor  # Absolute offset into the terminal output stream
+        self.replay = b""  # Screen snapshot to send before any further output
+        self.resyncs = 0  # Times this viewer fell behind and was resynced
+        self.last_input = 0.0
+
+    def read_nowait(self) -> bytes | None:
+        """Non-blocking read of output this viewer has not seen yet."""
+        return self.terminal.read_from(self)
+
+    def write(self, data: bytes) -> bool:
+        """Send input to the terminal, subject to input arbitration."""
+        return self.terminal.write(data, self)
 
 
 class Terminal:
     """Manages a PTY-based terminal session."""
 
     SCROLLBACK_SIZE = 64 * 1024  # 64KB scrollback buffer
+    INPUT_LEASE = 2.0  # Seconds a typing viewer keeps input before others can take over
 
     def __init__(
         self,
         shell: str = "/bin/zsh",
         command: list[str] | None = None,
         cwd: str | None = None,
+        rlimits: dict[int, tuple[int, int]] | None = None,
     ):
         self.shell = shell
         self.command = command  # Command to run instead of interactive shell
         self.cwd = cwd  # Working directory for the terminal
+        self.rlimits = rlimits or {}  # resource.RLIMIT_* -> (soft, hard) for the child
         self.master_fd: int | None = None
         self.pid: int | None = None
-        self.output_queue: Queue[bytes] = Queue()
+        self.rows = 24
+        self.cols = 80
+        self.recorder: Recorder | None = None  # Set by start_recording()
         self._reader_thread: threading.Thread | None = None
         self._running = False
         self._scrollback: bytearray = bytearray()
+        self._scrollback_start = 0  # Absolute offset of the first scrollback byte
         self._scrollback_lock = threading.Lock()
+        self.screen = ScreenMirror()  # Parsed screen state, for replay to new viewers
+        self._subscribers: list[Subscriber] = []
+        self._input_owner: Subscriber | None = None
+        self._own_cursor = Subscriber(self, 0)  # Used by read_nowait()
+        self.last_output = time.monotonic()
 
     def start(self) -> None:
         """Fork a PTY and spawn the shell or command."""
         if self._running:
             return
 
+        env = terminal_env()  # Cached, so the child only has to exec
         pid, fd = pty.fork()
         if pid == 0:
             # Child process - change to working directory
@@ -46,34 +117,9 @@ class Terminal:
                 with contextlib.suppress(OSError):
                     os.chdir(self.cwd)
 
-            # Set up environment for colors and proper shell detection
-            env = os.environ.copy()
-            env["TERM"] = "xterm-256color"
-            env["CLICOLOR"] = "1"
-            env["CLICOLOR_FORCE"] = "1"
-            env["COLORTERM"] = "truecolor"
-            env["TERM_PROGRAM"] = "lsimons-agent"
-            env["LC_TERMINAL"] = "lsimons-agent"
-            # Remove ZDOTDIR so zsh uses $HOME for .zshrc
-            env.pop("ZDOTDIR", None)
-
-            # Ensure PATH includes common bin directories (app bundles have minimal PATH)
-            home = os.path.expanduser("~")
-            extra_paths = [
-                f"{home}/git/lsimons/lsimons-agent/.venv/bin",
-                f"{home}/.local/bin",
-                f"{home}/.cargo/bin",
-                "/opt/homebrew/bin",
-                "/opt/homebrew/sbin",
-                "/usr/local/bin",
-                "/usr/local/sbin",
-            ]
-            # Add NVM node bin directories (glob for any installed version)
-            nvm_paths = glob.glob(f"{home}/.local/share/nvm/versions/node/*/bin")
-            nvm_paths += glob.glob(f"{home}/.nvm/versions/node/*/bin")
-            extra_paths.extend(sorted(nvm_paths, reverse=True))  # Prefer newer versions
-            current_path = env.get("PATH", "/usr/bin:/bin")
-            env["PATH"] = ":".join(extra_paths) + ":" + current_path
+            for limit, values in self.rlimits.items():
+                with contextlib.suppress(OSError, ValueError):
+                    resource.setrlimit(limit, values)
 
             # Exec shell or command
             if self.command:
@@ -93,20 +139,25 @@ class Terminal:
 
     def _read_loop(self) -> None:
         """Read from PTY and queue output (runs in thread)."""
-        while self._running and self.master_fd is not None:
+        fd = self.master_fd
+        while self._running and fd is not None:
             try:
-                ready, _, _ = select.select([self.master_fd], [], [], 0.1)
+                ready, _, _ = select.select([fd], [], [], 0.1)
                 if ready:
-                    data = os.read(self.master_fd, 4096)
+                    data = os.read(fd, 4096)
                     if data:
-                        self.output_queue.put(data)
-                        # Store in scrollback buffer
+                        self.last_output = time.monotonic()
+                        # Store in scrollback ring; viewers read from their own cursors
                         with self._scrollback_lock:
                             self._scrollback.extend(data)
                             # Trim if too large
                             if len(self._scrollback) > self.SCROLLBACK_SIZE:
                                 excess = len(self._scrollback) - self.SCROLLBACK_SIZE
                                 del self._scrollback[:excess]
+                                self._scrollback_start += excess
+                            self.screen.feed(data)
+                        if self.recorder is not None:
+                            self.recorder.output(data)
                     else:
                         # EOF - process exited
                         self._running = False
@@ -116,20 +167,91 @@ class Terminal:
                 self._running = False
                 break
 
-    def write(self, data: bytes) -> None:
-        """Send input to the PTY."""
+    def subscribe(self) -> Subscriber:
+        """Attach a new viewer; its first read is a snapshot of the current screen."""
+        with self._scrollback_lock:
+            subscriber = Subscriber(self, self._scrollback_start + len(self._scrollback))
+            subscriber.replay = self.screen.snapshot()
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Detach a viewer, releasing input if it held it."""
+        with self._scrollback_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            if self._input_owner is subscriber:
+                self._input_owner = None
+
+    def subscriber_count(self) -> int:
+        """Number of attached viewers."""
+        with self._scrollback_lock:
+            return len(self._subscribers)
+
+    def read_from(self, subscriber: Subscriber) -> bytes | None:
+        """Return output past the subscriber's cursor and advance it.
+
+        A subscriber whose cursor fell out of the scrollback ring missed output;
+        it gets a snapshot of the current screen (which starts with a terminal
+        reset) instead.
+        """
+        with self._scrollback_lock:
+            if subscriber.replay:
+                replay = subscriber.replay
+                subscriber.replay = b""
+                return replay
+            end = self._scrollback_start + len(self._scrollback)
+            if subscriber.cursor >= end:
+                return None
+            if subscriber.cursor < self._scrollback_start:
+                subscriber.resyncs += 1
+                subscriber.cursor = end
+                return self.screen.snapshot()
+            data = bytes(self._scrollback[subscriber.cursor - self._scrollback_start :])
+            subscriber.cursor = end
+            return data
+
+    def _may_write(self, subscriber: Subscriber, now: float) -> bool:
+        """Check whether a viewer may send input (caller holds the lock)."""
+        owner = self._input_owner
+        if owner is None or owner is subscriber:
+            return True
+        return now - owner.last_input > self.INPUT_LEASE
+
+    def write(self, data: bytes, subscriber: Subscriber | None = None) -> bool:
+        """Send input to the PTY.
+
+        Input from a viewer is only accepted while no other viewer is typing;
+        the typing viewer holds input until it is quiet for INPUT_LEASE seconds.
+        Returns False if the input was dropped.
+        """
+        if subscriber is not None:
+            now = time.monotonic()
+            with self._scrollback_lock:
+                if not self._may_write(subscriber, now):
+                    return False
+                self._input_owner = subscriber
+                subscriber.last_input = now
         if self.master_fd is not None:
             os.write(self.master_fd, data)
+        return True
 
     def read_nowait(self) -> bytes | None:
-        """Non-blocking read from output queue."""
-        try:
-            return self.output_queue.get_nowait()
-        except Empty:
-            return None
-
-    def resize(self, rows: int, cols: int) -> None:
-        """Resize the terminal window."""
+        """Non-blocking read of output not yet returned by this method."""
+        return self.read_from(self._own_cursor)
+
+    def resize(self, rows: int, cols: int, subscriber: Subscriber | None = None) -> None:
+        """Resize the terminal window (ignored for viewers without input)."""
+        if subscriber is not None:
+            with self._scrollback_lock:
+                if not self._may_write(subscriber, time.monotonic()):
+                    return
+        self.rows = rows
+        self.cols = cols
+        with self._scrollback_lock:
+            self.screen.resize(rows, cols)
+        if self.recorder is not None:
+            self.recorder.resize(rows, cols)
         if self.master_fd is not None:
             winsize = struct.pack("HHHH", rows, cols, 0, 0)
             fcntl.ioctl(self.master_fd, termios.TIOCSWINSZ, winsize)
@@ -139,11 +261,22 @@ class Terminal:
         if self.master_fd is not None:
             os.write(self.master_fd, b"\x0c")  # Ctrl+L
 
+    def scrollback_size(self) -> int:
+        """Bytes currently held in the scrollback buffer."""
+        with self._scrollback_lock:
+            return len(self._scrollback)
+
     def get_scrollback(self) -> bytes:
         """Get the scrollback buffer contents."""
         with self._scrollback_lock:
             return bytes(self._scrollback)
 
+    def start_recording(self, directory: Path, name: str) -> None:
+        """Record output from now on to asciicast files in directory."""
+        if self.recorder is None:
+            title = " ".join(self.command or [self.shell])
+            self.recorder = Recorder(directory, name, self.rows, self.cols, title=title)
+
     def stop(self) -> None:
         """Stop the terminal session."""
         self._running = False
@@ -165,6 +298,10 @@ class Terminal:
             self._reader_thread.join(timeout=1.0)
             self._reader_thread = None
 
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
     def is_running(self) -> bool:
         """Check if terminal is running."""
         return self._running
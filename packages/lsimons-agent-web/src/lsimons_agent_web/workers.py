@@ -0,0 +1,96 @@
+"""Routing terminal WebSockets between server worker processes.
+
+With several workers, the listening socket hands each connection to an
+arbitrary worker, but a terminal lives in the worker that started it. Each
+worker therefore also serves the app on a private localhost port (recorded
+in the session store), and a worker that receives a connection for another
+worker's terminal relays it there.
+"""
+
+import asyncio
+import contextlib
+import socket
+import threading
+
+import uvicorn
+from fastapi import FastAPI, WebSocket
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+
+# Marks relayed connections, which are always served by the worker they reach
+FORWARDED_HEADER = "x-lsimons-agent-forwarded"
+
+
+class PrivateListener:
+    """Serves the app on a private localhost port, in a background thread."""
+
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.port = 0
+        self._server: uvicorn.Server | None = None
+
+    def start(self) -> int:
+        """Start serving and return the port."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self.port = int(sock.getsockname()[1])
+        # The main server runs the lifespan; the thread must not touch signals
+        config = uvicorn.Config(self.app, lifespan="off", log_level="warning")
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+        return self.port
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+
+async def forward_websocket(websocket: WebSocket, url: str) -> bool:
+    """Relay an accepted WebSocket to url until either side closes.
+
+    Returns False, leaving the client connection open, when url can't be
+    reached at all (e.g. its worker crashed), so the caller can take over.
+    An owner that answers but turns the connection down (e.g. an HTTP error
+    status) is still running the terminal, so the client is closed instead.
+    """
+    try:
+        upstream = await connect(url, additional_headers={FORWARDED_HEADER: "1"})
+    except OSError:
+        return False
+    except WebSocketException:
+        with contextlib.suppress(RuntimeError):
+            await websocket.close(code=1011)
+        return True
+    try:
+        async with upstream:
+
+            async def to_upstream() -> None:
+                with contextlib.suppress(WebSocketException, RuntimeError):
+                    while True:
+                        message = await websocket.receive()
+                        if message["type"] == "websocket.disconnect":
+                            return
+                        if message.get("bytes") is not None:
+                            await upstream.send(message["bytes"])
+                        elif message.get("text") is not None:
+                            await upstream.send(message["text"])
+
+            async def to_client() -> None:
+                with contextlib.suppress(WebSocketException, RuntimeError):
+                    async for data in upstream:
+                        if isinstance(data, bytes):
+                            await websocket.send_bytes(data)
+                        else:
+                            await websocket.send_text(data)
+
+            tasks = [asyncio.create_task(to_upstream()), asyncio.create_task(to_client())]
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                task.cancel()
+            close_code = upstream.close_code or 1000
+    except OSError, WebSocketException, RuntimeError:
+        # Owner went away mid-session, or the client did
+        close_code = 1011
+    with contextlib.suppress(RuntimeError):
+        await websocket.close(code=close_code)
+    return True
@@ -0,0 +1,92 @@
+"""Tests for admission module."""
+
+import gc
+import threading
+import time
+from collections.abc import Iterator
+
+import pytest
+from lsimons_agent_web.admission import Admission, Rejected
+
+
+def wait_until_queued(admission: Admission, n: int) -> None:
+    deadline = time.monotonic() + 5
+    while admission.to_dict()["queued"] < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_admits_up_to_limit_then_rejects_when_queue_full():
+    admission = Admission("test", limit=1, max_queue=0)
+    granted = admission.acquire()
+    with pytest.raises(Rejected) as info:
+        admission.acquire()
+    assert info.value.status == 429
+    assert info.value.retry_after >= 1
+    admission.release(granted)
+    admission.release(admission.acquire())
+    assert admission.to_dict()["rejected"] == {"429": 1, "503": 0}
+
+
+def test_times_out_waiting():
+    admission = Admission("test", limit=1, max_queue=1, timeout=0.05)
+    admission.acquire()
+    with pytest.raises(Rejected) as info:
+        admission.acquire()
+    assert info.value.status == 503
+    assert admission.to_dict()["queued"] == 0
+
+
+def test_interactive_admitted_before_batch():
+    admission = Admission("test", limit=1, max_queue=4)
+    granted = admission.acquire()
+    order: list[str] = []
+
+    def wait(priority: str) -> None:
+        admission.acquire(priority)
+        order.append(priority)
+        admission.release()
+
+    batch = threading.Thread(target=wait, args=("batch",))
+    batch.start()
+    wait_until_queued(admission, 1)
+    interactive = threading.Thread(target=wait, args=("interactive",))
+    interactive.start()
+    wait_until_queued(admission, 2)
+
+    admission.release(granted)
+    batch.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "batch"]
+    assert admission.to_dict()["active"] == 0
+
+
+def test_release_after_releases_when_stream_ends():
+    admission = Admission("test", limit=1)
+    stream = admission.release_after(iter(["a", "b"]), admission.acquire())
+    assert admission.to_dict()["active"] == 1
+    assert list(stream) == ["a", "b"]
+    assert admission.to_dict()["active"] == 0
+
+
+def test_release_after_releases_a_stream_never_started():
+    admission = Admission("test", limit=1)
+    closed: list[bool] = []
+
+    def items() -> Iterator[str]:
+        try:
+            yield "a"
+        finally:
+            closed.append(True)
+
+    stream = admission.release_after(items(), admission.acquire())
+    del stream  # Like a response dropped before its first chunk
+    gc.collect()
+    assert admission.to_dict()["active"] == 0
+
+    stream = admission.release_after(items(), admission.acquire())
+    assert next(stream) == "a"
+    stream.close()  # type: ignore[attr-defined]
+    stream.close()  # type: ignore[attr-defined]
+    assert closed == [True]
+    assert admission.to_dict()["active"] == 0
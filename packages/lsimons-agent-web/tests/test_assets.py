@@ -0,0 +1,76 @@
+"""Tests for assets module."""
+
+import gzip
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from lsimons_agent_web.assets import Asset, AssetCache, choose_encoding
+from lsimons_agent_web.server import app
+
+
+def _asset(tmp_path: Path, content: bytes) -> Asset:
+    path = tmp_path / "page.html"
+    path.write_bytes(content)
+    return Asset(path, "text/html")
+
+
+def test_asset_precompresses_when_smaller(tmp_path: Path):
+    asset = _asset(tmp_path, b"<p>hello</p>" * 100)
+    assert gzip.decompress(asset.variants["gzip"]) == asset.variants["identity"]
+
+
+def test_asset_skips_compression_when_larger(tmp_path: Path):
+    asset = _asset(tmp_path, b"x")
+    assert list(asset.variants) == ["identity"]
+
+
+def test_etag_differs_per_encoding(tmp_path: Path):
+    asset = _asset(tmp_path, b"<p>hello</p>" * 100)
+    assert asset.etag_for("identity") != asset.etag_for("gzip")
+    assert asset.etag_for("identity").startswith('"')
+
+
+def test_choose_encoding(tmp_path: Path):
+    asset = _asset(tmp_path, b"<p>hello</p>" * 100)
+    assert choose_encoding(asset, "gzip, deflate") == "gzip"
+    assert choose_encoding(asset, "gzip;q=0") == "identity"
+    assert choose_encoding(asset, "") == "identity"
+    assert choose_encoding(asset, "*") in ("gzip", "br")
+
+
+def test_dev_mode_reloads_changed_files():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "page.html"
+        path.write_text("one")
+        cache = AssetCache(dev=True)
+        first = cache.get(path, "text/html")
+        assert cache.get(path, "text/html") is first
+
+        path.write_text("two!")
+        os.utime(path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+        assert cache.get(path, "text/html").variants["identity"] == b"two!"
+
+
+def test_index_served_with_validators_and_304():
+    client = TestClient(app)
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "no-cache"
+    assert "<html" in response.text.lower()
+    etag = response.headers["etag"]
+
+    cached = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_logo_is_cacheable():
+    client = TestClient(app)
+    response = client.get("/logo.png")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert "max-age" in response.headers["cache-control"]
+    assert response.headers["etag"]
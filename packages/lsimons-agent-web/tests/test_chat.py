@@ -0,0 +1,143 @@
+"""Tests for the WebSocket chat transport."""
+
+import threading
+from typing import Any
+
+from fastapi.testclient import TestClient
+from lsimons_agent_web.server import app
+
+
+def receive_turn(ws: Any, turn: str) -> list[dict[str, Any]]:
+    """Frames of one turn up to its done event (frames of other turns are skipped)."""
+    frames: list[dict[str, Any]] = []
+    while True:
+        frame = ws.receive_json()
+        if frame.get("turn") != turn:
+            continue
+        frames.append(frame)
+        if frame["event"] == "done":
+            return frames
+
+
+def test_ws_chat_turn_and_ping() -> None:
+    def mock_process_message(
+        messages: list[dict[str, Any]], user_message: str, session_usage: Any = None, **kwargs: Any
+    ) -> Any:
+        yield ("text", f"echo {user_message}")
+        yield ("done", None)
+
+    import lsimons_agent_web.server as server_module
+
+    original = server_module.process_message
+    server_module.process_message = mock_process_message
+    try:
+        with TestClient(app).websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+
+            ws.send_json({"type": "chat", "session": "ws-a", "turn": "t1", "message": "hi"})
+            frames = receive_turn(ws, "t1")
+            assert [f["event"] for f in frames] == ["started", "text", "done"]
+            assert frames[1]["data"] == "echo hi"
+            assert all(f["session"] == "ws-a" for f in frames)
+
+            ws.send_json({"type": "bogus"})
+            assert ws.receive_json()["type"] == "error"
+    finally:
+        server_module.process_message = original
+
+
+def test_ws_chat_cancel_and_push() -> None:
+    started = threading.Event()
+
+    def mock_process_message(
+        messages: list[dict[str, Any]],
+        user_message: str,
+        session_usage: Any = None,
+        cancel: threading.Event | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        assert cancel is not None
+        started.set()
+        cancel.wait(5)
+        yield ("cancelled", None)
+        yield ("done", None)
+
+    import lsimons_agent_web.server as server_module
+
+    original = server_module.process_message
+    server_module.process_message = mock_process_message
+    try:
+        client = TestClient(app)
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "chat", "session": "ws-b", "turn": "t1", "message": "slow"})
+            assert ws.receive_json()["event"] == "started"
+            assert started.wait(5)
+            ws.send_json({"type": "cancel", "session": "ws-b"})
+            frames = receive_turn(ws, "t1")
+            assert [f["event"] for f in frames] == ["cancelled", "done"]
+
+            client.post("/clear")
+            assert ws.receive_json() == {"type": "push", "event": "cleared", "data": None}
+    finally:
+        server_module.process_message = original
+
+
+def test_ws_chat_bad_frame_keeps_turns_running() -> None:
+    release = threading.Event()
+
+    def mock_process_message(
+        messages: list[dict[str, Any]], user_message: str, session_usage: Any = None, **kwargs: Any
+    ) -> Any:
+        release.wait(5)
+        yield ("text", "finished")
+        yield ("done", None)
+
+    import lsimons_agent_web.server as server_module
+
+    original = server_module.process_message
+    server_module.process_message = mock_process_message
+    try:
+        with TestClient(app).websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "chat", "session": "ws-c", "turn": "t1", "message": "hi"})
+            assert ws.receive_json()["event"] == "started"
+            ws.send_text("not json")
+            assert ws.receive_json() == {"type": "error", "message": "Invalid JSON"}
+            release.set()
+            frames = receive_turn(ws, "t1")
+            assert [f["event"] for f in frames] == ["text", "done"]
+    finally:
+        server_module.process_message = original
+
+
+def test_turns_of_one_session_run_one_at_a_time() -> None:
+    lock = threading.Lock()
+    active = [0, 0]  # Current, most seen
+
+    def mock_process_message(
+        messages: list[dict[str, Any]], user_message: str, session_usage: Any = None, **kwargs: Any
+    ) -> Any:
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        threading.Event().wait(0.2)
+        with lock:
+            active[0] -= 1
+        yield ("done", None)
+
+    import lsimons_agent_web.server as server_module
+
+    original = server_module.process_message
+    server_module.process_message = mock_process_message
+    try:
+        client = TestClient(app)
+        with client.websocket_connect("/ws/chat") as a, client.websocket_connect("/ws/chat") as b:
+            a.send_json({"type": "chat", "session": "ws-d", "turn": "a1", "message": "one"})
+            b.send_json({"type": "chat", "session": "ws-d", "turn": "b1", "message": "two"})
+            response = client.post("/chat", json={"message": "three", "session": "ws-d"})
+            assert response.status_code == 200
+            receive_turn(a, "a1")
+            receive_turn(b, "b1")
+        assert active[1] == 1
+    finally:
+        server_module.process_message = original
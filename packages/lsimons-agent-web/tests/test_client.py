@@ -1,6 +1,6 @@
 """Tests for client module."""
 
-from lsimons_agent_web.client import format_args
+from lsimons_agent_web.client import SSEParser, format_args
 
 
 def testformat_args_simple():
@@ -22,3 +22,25 @@ def testformat_args_multiple():
     result = format_args({"a": "1", "b": "2"})
     assert "a='1'" in result
     assert "b='2'" in result
+
+
+def test_sse_parser_handles_split_chunks():
+    """Test that events split across chunks (and CRLF pairs) are parsed once complete."""
+    parser = SSEParser()
+    assert parser.feed('event: text\r\ndata: {"con') == []
+    assert parser.feed('tent": "hi"}\r') == []
+    events = parser.feed("\n\r\n")
+    assert len(events) == 1
+    assert events[0].event == "text"
+    assert events[0].json() == {"content": "hi"}
+
+
+def test_sse_parser_multiline_data_comments_and_fields():
+    """Test multi-line data, comments, id and retry."""
+    parser = SSEParser()
+    events = parser.feed(": keep-alive\n\nid: 7\nretry: 3000\ndata: a\ndata:b\n\nretry: x\n\n")
+    assert len(events) == 1
+    assert events[0].event == "message"
+    assert events[0].data == "a\nb"
+    assert events[0].id == "7"
+    assert parser.retry == 3000
@@ -0,0 +1,53 @@
+"""Tests for loadtest module."""
+
+from pathlib import Path
+
+from lsimons_agent_web.loadtest import (
+    MAX_BACKOFF,
+    Stats,
+    backoff,
+    format_report,
+    load_prompts,
+    percentile,
+)
+
+
+def test_percentile_nearest_rank() -> None:
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_load_prompts_skips_blanks_and_comments(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.txt"
+    path.write_text("# scripted prompts\nhello world\n\nhow are you\n")
+    assert load_prompts(path) == ["hello world", "how are you"]
+
+
+def test_report_counts_and_rates() -> None:
+    stats = Stats()
+    stats.turn(0.1, [0.01, 0.02], 0.5, 3)
+    stats.turn_failed(OSError("refused"))
+    stats.turn_rejected()
+    stats.echo(0.005)
+    stats.sample_rss(1.0, 50 * 1024 * 1024)
+
+    report = stats.report(2.0)
+    assert report["chat"]["turns"] == 1
+    assert report["chat"]["error_rate"] == 1 / 3
+    assert report["chat"]["rejected"] == 1
+    assert report["chat"]["events_per_second"] == 1.5
+    assert report["chat"]["first_event"]["p50"] == 0.1
+    assert report["terminal"]["echoes"] == 1
+    assert report["errors"] == {"chat: OSError": 1}
+    assert "50.0 MB" in format_report(report)
+
+
+def test_backoff_honours_retry_after() -> None:
+    assert backoff(1, "2") == 2.0
+    assert backoff(1, "3600") == MAX_BACKOFF
+    assert backoff(1) < backoff(2) < backoff(3)
+    assert backoff(1, "Wed, 21 Oct 2015 07:28:00 GMT") == backoff(1)
+    assert backoff(100) == MAX_BACKOFF
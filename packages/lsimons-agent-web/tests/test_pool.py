@@ -0,0 +1,72 @@
+"""Tests for pool module."""
+
+import tempfile
+import time
+
+from lsimons_agent_web.pool import ShellPool
+from lsimons_agent_web.terminal import terminal_env
+
+
+def test_acquire_from_empty_pool_returns_none():
+    pool = ShellPool(size=0, shell="/bin/sh")
+    assert pool.acquire("/tmp") is None
+
+
+def test_fill_starts_shells():
+    pool = ShellPool(size=2, shell="/bin/sh")
+    try:
+        pool.fill()
+        assert pool.ready_count() == 2
+    finally:
+        pool.stop()
+    assert pool.ready_count() == 0
+    # A stopped pool (server shutdown) starts no new shells
+    pool.fill()
+    assert pool.ready_count() == 0
+
+
+def test_stop_during_background_fill_keeps_pool_empty():
+    pool = ShellPool(size=2, shell="/bin/sh")
+    pool.fill_async()
+    pool.stop()
+    for _ in range(100):
+        with pool._lock:
+            if not pool._filling:
+                break
+        time.sleep(0.05)
+    assert pool.ready_count() == 0
+    pool.fill_async()
+    time.sleep(0.3)
+    assert pool.ready_count() == 0
+
+
+def test_acquire_changes_directory_and_refills():
+    pool = ShellPool(size=1, shell="/bin/sh")
+    pool.fill()
+    terminal = None
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            terminal = pool.acquire(tmpdir)
+            assert terminal is not None
+            assert terminal.is_running()
+            assert terminal.cwd == tmpdir
+
+            terminal.write(b"echo dir=$(pwd)\n")
+            time.sleep(0.3)
+            assert b"dir=" + tmpdir.encode() in terminal.get_scrollback()
+
+            # The pool refills in the background
+            for _ in range(50):
+                if pool.ready_count() == 1:
+                    break
+                time.sleep(0.05)
+            assert pool.ready_count() == 1
+    finally:
+        if terminal is not None:
+            terminal.stop()
+        pool.stop()
+
+
+def test_terminal_env_is_cached():
+    assert terminal_env() is terminal_env()
+    assert terminal_env()["TERM"] == "xterm-256color"
@@ -0,0 +1,102 @@
+"""Tests for recording module."""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from lsimons_agent_web.recording import Recorder, list_recordings, recording_path
+from lsimons_agent_web.terminal import Terminal
+
+
+def _events(path: Path) -> tuple[dict[str, object], list[list[object]]]:
+    lines = path.read_text().splitlines()
+    return json.loads(lines[0]), [json.loads(line) for line in lines[1:]]
+
+
+def test_recorder_writes_asciicast_v2():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        recorder = Recorder(Path(tmpdir), "session", rows=10, cols=40, title="sh")
+        recorder.output(b"hello ")
+        recorder.output("wörld".encode()[:2])  # Split multi-byte character
+        recorder.output("wörld".encode()[2:])
+        recorder.resize(20, 100)
+        recorder.close()
+
+        [path] = recorder.paths
+        header, events = _events(path)
+        assert header["version"] == 2
+        assert header["width"] == 40
+        assert header["height"] == 10
+        assert header["title"] == "sh"
+        assert "".join(str(e[2]) for e in events if e[1] == "o") == "hello wörld"
+        assert events[-1][1:] == ["r", "100x20"]
+        times = [float(str(e[0])) for e in events]
+        assert times == sorted(times)
+
+
+def test_recorder_drops_output_after_write_failure(tmp_path: Path):
+    (tmp_path / "taken").write_text("")  # Not a directory, so the first write fails
+    recorder = Recorder(tmp_path / "taken", "session")
+    recorder.output(b"lost")
+    recorder.close()
+    assert recorder.failed
+    recorder.output(b"more")
+    assert recorder._queue.empty()
+
+
+def test_recorder_rotates_files():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        recorder = Recorder(Path(tmpdir), "session", max_bytes=100)
+        recorder.BATCH_SIZE = 1
+        for _ in range(10):
+            recorder.output(b"x" * 50)
+        recorder.close()
+
+        assert len(recorder.paths) > 1
+        assert recorder.paths[1].name == "session.1.cast"
+        for path in recorder.paths:
+            header, _ = _events(path)
+            assert header["version"] == 2
+
+
+def test_list_and_resolve_recordings():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        directory = Path(tmpdir)
+        (directory / "a.cast").write_text("{}\n")
+        assert [r["name"] for r in list_recordings(directory)] == ["a.cast"]
+        assert recording_path(directory, "a.cast") == directory / "a.cast"
+        assert recording_path(directory, "../a.cast") is None
+        assert recording_path(directory, "missing.cast") is None
+        assert list_recordings(directory / "missing") == []
+
+
+def test_terminal_start_recording():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        term = Terminal(shell="/bin/sh")
+        term.start_recording(Path(tmpdir), "term")
+        term.start()
+        term.write(b"echo recorded\n")
+        time.sleep(0.2)
+        term.stop()
+
+        _, events = _events(Path(tmpdir) / "term.cast")
+        assert "recorded" in "".join(str(e[2]) for e in events)
+
+
+def test_recording_names_are_unique(monkeypatch: pytest.MonkeyPatch):
+    import lsimons_agent_web.server as server_module
+
+    names: list[str] = []
+
+    class FakeTerminal:
+        def start_recording(self, directory: Path, name: str) -> None:
+            names.append(name)
+
+    monkeypatch.setattr(server_module, "RECORDINGS_DIR", Path("unused"))
+    for org in ("org1", "org2", "org1"):
+        key = (f"/git/{org}/repo", "shell", None)
+        server_module.record_if_enabled(FakeTerminal(), key)  # type: ignore[arg-type]
+    assert len(set(names)) == 3
+    assert all("-repo-shell-shell-" in name for name in names)
@@ -0,0 +1,123 @@
+"""Tests for repos module."""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from lsimons_agent_web.repos import Inotify, RepoIndex
+
+
+def _make_repo(base: Path, org: str, repo: str) -> None:
+    (base / org / repo / ".git").mkdir(parents=True)
+
+
+def _bump_mtime(path: Path) -> None:
+    # Directory mtimes can have coarse resolution; make the change visible
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_repos_lists_git_checkouts_by_org():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir)
+        _make_repo(base, "org", "b")
+        _make_repo(base, "org", "a")
+        (base / "org" / "not-a-repo").mkdir()
+        (base / ".hidden" / "x" / ".git").mkdir(parents=True)
+        (base / "empty").mkdir()
+
+        assert RepoIndex(base).repos() == {"org": ["a", "b"]}
+
+
+def test_repos_missing_base_dir():
+    assert RepoIndex(Path("/nonexistent/git/base")).repos() == {}
+
+
+def test_refresh_only_rescans_changed_orgs():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir)
+        _make_repo(base, "one", "a")
+        _make_repo(base, "two", "b")
+        index = RepoIndex(base)
+        index.repos()
+
+        # A change that does not touch the org mtime is not picked up...
+        (base / "two" / "b" / ".git").rmdir()
+        assert not index.refresh()
+        assert index.repos()["two"] == ["b"]
+
+        # ...but a forced refresh rescans everything
+        assert index.refresh(force=True)
+        assert "two" not in index.repos()
+
+
+def test_changes_since_reports_additions_and_removals():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir)
+        _make_repo(base, "org", "a")
+        index = RepoIndex(base)
+        version, _ = index.snapshot()
+
+        _make_repo(base, "org", "b")
+        _bump_mtime(base / "org")
+        assert index.refresh()
+
+        (base / "org" / "a" / ".git").rmdir()
+        (base / "org" / "a").rmdir()
+        _bump_mtime(base / "org")
+        assert index.refresh()
+
+        assert index.changes_since(version) == (version + 2, ["org/b"], ["org/a"])
+        assert index.changes_since(version + 2) == (version + 2, [], [])
+
+
+def test_changes_since_too_old_returns_none():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir)
+        index = RepoIndex(base)
+        index.MAX_CHANGES = 1
+        index.repos()
+        for name in ("a", "b", "c"):
+            _make_repo(base, "org", name)
+            _bump_mtime(base / "org")
+            index.refresh()
+        assert index.changes_since(0) is None
+
+
+def test_start_watches_for_new_repos():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir)
+        (base / "org").mkdir()
+        index = RepoIndex(base)
+        index.POLL_INTERVAL = 0.05
+        index.start()
+        time.sleep(0.1)
+
+        _make_repo(base, "org", "new")
+        for _ in range(100):
+            if index.repos().get("org") == ["new"]:
+                break
+            time.sleep(0.05)
+        assert index.repos() == {"org": ["new"]}
+
+
+def test_recreated_directory_is_watched_again(tmp_path: Path):
+    try:
+        inotify = Inotify()
+    except OSError:
+        pytest.skip("inotify not available")
+    try:
+        org = tmp_path / "org"
+        org.mkdir()
+        inotify.watch(str(org))
+        org.rmdir()
+        assert inotify.wait(1)
+
+        org.mkdir()
+        inotify.watch(str(org))
+        (org / "repo").mkdir()
+        assert inotify.wait(1)
+    finally:
+        os.close(inotify.fd)
@@ -0,0 +1,58 @@
+"""Tests for screen module."""
+
+from lsimons_agent_web.screen import ScreenMirror
+
+
+def test_snapshot_empty_before_output():
+    assert ScreenMirror().snapshot() == b""
+
+
+def test_snapshot_renders_current_screen():
+    mirror = ScreenMirror(rows=3, cols=20)
+    mirror.feed(b"hello\r\n")
+    mirror.feed(b"frame 1\rframe 2")
+
+    snapshot = mirror.snapshot()
+    assert snapshot.startswith(b"\x1bc")
+    assert b"hello" in snapshot
+    assert b"frame 2" in snapshot
+    assert b"frame 1" not in snapshot
+    # Cursor restored after "frame 2" on the second row
+    assert snapshot.endswith(b"\x1b[2;8H\x1b[0m")
+
+
+def test_snapshot_keeps_colors():
+    mirror = ScreenMirror(rows=2, cols=20)
+    mirror.feed(b"\x1b[1;31mred\x1b[0m plain \x1b[38;2;1;2;3mtrue\x1b[0m")
+
+    snapshot = mirror.snapshot()
+    assert b"\x1b[0;1;31mred\x1b[0m plain " in snapshot
+    assert b"\x1b[0;38;2;1;2;3mtrue" in snapshot
+
+
+def test_snapshot_includes_bounded_history():
+    mirror = ScreenMirror(rows=2, cols=10, history=3)
+    for i in range(10):
+        mirror.feed(f"line{i}\r\n".encode())
+
+    snapshot = mirror.snapshot()
+    assert b"line9" in snapshot
+    assert b"line6" in snapshot
+    assert b"line5" not in snapshot
+
+
+def test_snapshot_restores_private_modes():
+    mirror = ScreenMirror()
+    mirror.feed(b"\x1b[?1h\x1b[?2004h\x1b[?25l")
+
+    snapshot = mirror.snapshot()
+    assert b"\x1b[?1h" in snapshot
+    assert b"\x1b[?2004h" in snapshot
+    assert snapshot.endswith(b"\x1b[?25l")
+
+
+def test_resize_changes_display():
+    mirror = ScreenMirror(rows=2, cols=10)
+    mirror.resize(4, 40)
+    assert len(mirror.display()) == 4
+    assert len(mirror.display()[0]) == 40
@@ -1,9 +1,14 @@
 """Tests for web server module."""
 
 import json
+from pathlib import Path
 from typing import Any
 
-from lsimons_agent_web.server import TEMPLATES_DIR, app, event_stream
+import pytest
+from fastapi.testclient import TestClient
+from lsimons_agent.checkpoints import Checkpoints
+from lsimons_agent.tools import execute
+from lsimons_agent_web.server import TEMPLATES_DIR, app, event_stream, get_conversation
 
 
 def test_templates_dir_exists() -> None:
@@ -26,15 +31,29 @@ def test_app_has_routes() -> None:
     assert "/clear" in routes
     assert "/api/repos" in routes
     assert "/api/sync" in routes
+    assert "/ws/repos" in routes
+    assert "/ws/chat" in routes
+    assert "/api/sync/{job_id}" in routes
+    assert "/api/sync/{job_id}/events" in routes
+    assert "/api/sync/{job_id}/cancel" in routes
     assert "/ws/terminal/agent" in routes
     assert "/ws/terminal/shell" in routes
     assert "/terminal/stop" in routes
+    assert "/api/terminals" in routes
+    assert "/api/recordings" in routes
+    assert "/api/recordings/{name}" in routes
+    assert "/api/metrics" in routes
+    assert "/api/usage" in routes
+    assert "/api/undo" in routes
+    assert "/api/checkpoints" in routes
     assert "/logo.png" in routes
 
 
 def test_event_stream_formats_text_event() -> None:
     # Create a mock generator that yields a text event
-    def mock_process_message(messages: list[dict[str, Any]], user_message: str) -> Any:
+    def mock_process_message(
+        messages: list[dict[str, Any]], user_message: str, session_usage: Any = None, **kwargs: Any
+    ) -> Any:
         yield ("text", "Hello world")
         yield ("done", None)
 
@@ -63,7 +82,9 @@ def test_event_stream_formats_text_event() -> None:
 
 
 def test_event_stream_formats_tool_event() -> None:
-    def mock_process_message(messages: list[dict[str, Any]], user_message: str) -> Any:
+    def mock_process_message(
+        messages: list[dict[str, Any]], user_message: str, session_usage: Any = None, **kwargs: Any
+    ) -> Any:
         yield ("tool", {"name": "read_file", "args": {"path": "foo.txt"}})
         yield ("done", None)
 
@@ -84,3 +105,50 @@ def test_event_stream_formats_tool_event() -> None:
         assert parsed["args"]["path"] == "foo.txt"
     finally:
         server_module.process_message = original
+
+
+def test_sessions_get_separate_conversations() -> None:
+    import lsimons_agent_web.server as server_module
+
+    first, _ = server_module.get_conversation("a")
+    assert server_module.get_conversation("a")[0] is first
+    assert server_module.get_conversation("b")[0] is not first
+    assert server_module.get_conversation(None)[0] is server_module.messages
+
+
+def test_chat_rejected_when_busy() -> None:
+    import lsimons_agent_web.server as server_module
+    from lsimons_agent_web.admission import Admission
+
+    original = server_module.chat_admission
+    server_module.chat_admission = Admission("chat", limit=0, max_queue=0)
+    try:
+        response = TestClient(app).post("/chat", json={"message": "hi"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert "admission" in TestClient(app).get("/api/metrics").json()
+    finally:
+        server_module.chat_admission = original
+
+
+def test_undo_restores_only_the_sessions_turn(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    Path("a.txt").write_text("a\n")
+    Path("b.txt").write_text("b\n")
+    turn = Checkpoints(tmp_path, "undo-a").begin("edit a")
+    execute("write_file", {"path": "a.txt", "content": "a2\n"}, turn)
+    # A later turn of another session must not be the one undone
+    turn = Checkpoints(tmp_path, "undo-b").begin("edit b")
+    execute("write_file", {"path": "b.txt", "content": "b2\n"}, turn)
+
+    client = TestClient(app)
+    response = client.post("/api/undo?session=undo-a")
+    assert response.status_code == 200
+    assert response.json()["label"] == "edit a"
+    assert Path("a.txt").read_text() == "a\n"
+    assert Path("b.txt").read_text() == "b2\n"
+    assert "a.txt" in get_conversation("undo-a")[0][-1]["content"]
+    assert client.post("/api/undo?session=undo-a").status_code == 404
+    assert [t["label"] for t in client.get("/api/checkpoints?session=undo-b").json()] == ["edit b"]
@@ -0,0 +1,126 @@
+"""Tests for sessions module."""
+
+import os
+import resource
+import time
+
+from lsimons_agent_web.sessions import SessionManager, process_rss
+from lsimons_agent_web.terminal import Terminal
+
+
+def _shell() -> Terminal:
+    return Terminal(shell="/bin/sh")
+
+
+def test_attach_reuses_running_session():
+    manager = SessionManager()
+    try:
+        first = manager.attach(("/tmp", "shell", None), _shell)
+        second = manager.attach(("/tmp", "shell", None), _shell)
+        assert first is second
+        assert len(manager) == 1
+    finally:
+        manager.stop_all()
+
+
+def test_attach_started_concurrently_keeps_one_terminal():
+    manager = SessionManager()
+    key = ("/tmp", "shell", None)
+    losers: list[Terminal] = []
+
+    def racing_shell() -> Terminal:
+        # Another viewer attaches while this factory is still running
+        if not losers:
+            losers.append(Terminal(shell="/bin/sh"))
+            manager.attach(key, _shell)
+            return losers[0]
+        return _shell()
+
+    try:
+        terminal = manager.attach(key, racing_shell)
+        assert terminal is not losers[0]
+        assert terminal.is_running()
+        assert not losers[0].is_running()
+        assert len(manager) == 1
+    finally:
+        manager.stop_all()
+
+
+def test_attach_evicts_least_recently_used():
+    manager = SessionManager(max_sessions=2)
+    try:
+        oldest = manager.attach(("/a", "shell", None), _shell)
+        manager.attach(("/b", "shell", None), _shell)
+        manager.attach(("/c", "shell", None), _shell)
+
+        assert len(manager) == 2
+        assert not oldest.is_running()
+        projects = [s["project"] for s in manager.list_sessions()]
+        assert projects == ["/b", "/c"]
+    finally:
+        manager.stop_all()
+
+
+def test_eviction_prefers_sessions_without_viewers():
+    manager = SessionManager(max_sessions=2)
+    try:
+        watched = manager.attach(("/a", "shell", None), _shell)
+        subscriber = watched.subscribe()
+        manager.attach(("/b", "shell", None), _shell)
+        manager.attach(("/c", "shell", None), _shell)
+
+        assert watched.is_running()
+        projects = [s["project"] for s in manager.list_sessions()]
+        assert projects == ["/a", "/c"]
+        watched.unsubscribe(subscriber)
+    finally:
+        manager.stop_all()
+
+
+def test_reap_idle_stops_unwatched_sessions():
+    manager = SessionManager(idle_timeout=0.0)
+    try:
+        terminal = manager.attach(("/a", "shell", None), _shell)
+        reaped = manager.reap_idle()
+        assert reaped == [("/a", "shell", None)]
+        assert not terminal.is_running()
+        assert len(manager) == 0
+    finally:
+        manager.stop_all()
+
+
+def test_stop_all_stops_every_session():
+    manager = SessionManager()
+    terminals = [manager.attach((f"/{i}", "shell", None), _shell) for i in range(4)]
+    manager.stop_all()
+    assert len(manager) == 0
+    assert not any(t.is_running() for t in terminals)
+
+
+def test_list_sessions_reports_memory():
+    manager = SessionManager()
+    try:
+        manager.attach(("/a", "shell", None), _shell)
+        [session] = manager.list_sessions()
+        assert session["type"] == "shell"
+        assert session["running"]
+        assert session["viewers"] == 0
+        assert session["scrollback_bytes"] >= 0
+    finally:
+        manager.stop_all()
+
+
+def test_process_rss_of_self():
+    rss = process_rss(os.getpid())
+    assert rss is None or rss > 0
+
+
+def test_terminal_applies_rlimits():
+    term = Terminal(shell="/bin/sh", rlimits={resource.RLIMIT_CORE: (0, 0)})
+    term.start()
+    try:
+        term.write(b"echo core=$(ulimit -c)\n")
+        time.sleep(0.2)
+        assert b"core=0" in term.get_scrollback()
+    finally:
+        term.stop()
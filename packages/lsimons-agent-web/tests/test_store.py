@@ -0,0 +1,108 @@
+"""Tests for store module."""
+
+import asyncio
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+from lsimons_agent.tokens import Usage
+from lsimons_agent_web.store import SessionStore
+from lsimons_agent_web.workers import forward_websocket
+
+
+def test_conversation_round_trip(tmp_path: Path):
+    store = SessionStore(tmp_path / "sessions.db")
+    assert store.load_conversation("a") is None
+    usage = Usage()
+    usage.add(10, 5)
+    store.save_conversation("a", [{"role": "user", "content": "hi"}], usage)
+
+    # A second store on the same file, as in another worker process
+    loaded = SessionStore(tmp_path / "sessions.db").load_conversation("a")
+    assert loaded is not None
+    messages, loaded_usage = loaded
+    assert messages == [{"role": "user", "content": "hi"}]
+    assert loaded_usage.to_dict() == usage.to_dict()
+
+    store.delete_conversation("a")
+    assert store.load_conversation("a") is None
+
+
+def test_conversation_cap(tmp_path: Path):
+    store = SessionStore(tmp_path / "sessions.db", max_conversations=2)
+    for session in ("a", "b", "c"):
+        store.save_conversation(session, [], Usage())
+    assert store.conversation_count() == 2
+    assert store.load_conversation("a") is None
+
+
+def test_claim_terminal(tmp_path: Path):
+    store = SessionStore(tmp_path / "sessions.db")
+    assert store.claim_terminal("k", 1234) == (os.getpid(), 1234)
+    assert store.claim_terminal("k", 5678) == (os.getpid(), 1234)
+
+    # Owned by a worker that has exited: taken over
+    exited = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True
+    )
+    dead_pid = int(exited.stdout)
+    store.release_terminals()
+    with sqlite3.connect(tmp_path / "sessions.db") as db:
+        db.execute("INSERT INTO terminal_owners VALUES ('k', ?, 1, 0)", (dead_pid,))
+    assert store.claim_terminal("k", 1234) == (os.getpid(), 1234)
+
+
+def test_drop_unreachable_terminal_owner(tmp_path: Path):
+    store = SessionStore(tmp_path / "sessions.db")
+    # A live but unrelated process that reused a crashed worker's pid
+    with sqlite3.connect(tmp_path / "sessions.db") as db:
+        db.execute("INSERT INTO terminal_owners VALUES ('k', 1, 9, 0)")
+    assert store.claim_terminal("k", 1234) == (1, 9)
+    store.drop_terminal_owner("k", 1, 8)  # Someone else's claim: kept
+    assert store.claim_terminal("k", 1234) == (1, 9)
+    store.drop_terminal_owner("k", 1, 9)
+    assert store.claim_terminal("k", 1234) == (os.getpid(), 1234)
+
+
+def test_forward_to_unreachable_owner_returns_false():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()  # Nothing listens here now
+    client: Any = object()  # Not touched when the owner can't be reached
+    assert not asyncio.run(forward_websocket(client, f"ws://127.0.0.1:{port}/ws"))
+
+
+def test_forward_to_owner_that_rejects_closes_client():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    def reject() -> None:
+        conn, _ = server.accept()
+        with conn:
+            conn.recv(65536)
+            conn.sendall(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n")
+
+    class Client:
+        close_code: int | None = None
+
+        async def close(self, code: int) -> None:
+            self.close_code = code
+
+    thread = threading.Thread(target=reject, daemon=True)
+    thread.start()
+    client: Any = Client()
+    try:
+        # The owner is alive, so no takeover: the client is closed instead
+        assert asyncio.run(forward_websocket(client, f"ws://127.0.0.1:{port}/ws"))
+        assert client.close_code == 1011
+    finally:
+        thread.join(5)
+        server.close()
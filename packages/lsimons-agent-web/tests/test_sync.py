@@ -0,0 +1,84 @@
+"""Tests for sync module."""
+
+import tempfile
+import time
+from pathlib import Path
+
+from lsimons_agent_web.repos import RepoIndex
+from lsimons_agent_web.sync import SyncJob, SyncManager
+
+
+def _wait(job: SyncJob) -> list[str]:
+    lines: list[str] = []
+    finished = False
+    while not finished:
+        new_lines, finished = job.wait_for_progress(len(lines), timeout=5.0)
+        lines += new_lines
+    return lines
+
+
+def test_sync_streams_progress_and_finishes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = SyncManager(["sh", "-c", "echo one; echo two"], RepoIndex(Path(tmpdir)))
+        job = manager.start()
+        assert _wait(job) == ["one", "two"]
+        assert job.status == "done"
+        assert job.returncode == 0
+        assert manager.get(job.id) is job
+
+
+def test_sync_reports_failure():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        job = SyncManager(["sh", "-c", "exit 3"], RepoIndex(Path(tmpdir))).start()
+        _wait(job)
+        assert job.status == "failed"
+        assert job.returncode == 3
+
+
+def test_sync_missing_command_fails():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        job = SyncManager(["nonexistent-sync-command-12345"], RepoIndex(Path(tmpdir))).start()
+        lines = _wait(job)
+        assert job.status == "failed"
+        assert lines[0].startswith("Error:")
+
+
+def test_sync_deduplicates_concurrent_requests():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = SyncManager(["sleep", "5"], RepoIndex(Path(tmpdir)))
+        first = manager.start()
+        second = manager.start()
+        assert first is second
+        first.cancel()
+        _wait(first)
+        assert first.status == "cancelled"
+        assert manager.start() is not first
+        manager.start().cancel()
+
+
+def test_sync_rescans_and_reports_new_repos():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = Path(tmpdir)
+        (base / "org").mkdir()
+        index = RepoIndex(base)
+        # Simulate a sync that clones a repo
+        script = f"sleep 0.1; mkdir -p {base}/org/new/.git"
+        job = SyncManager(["sh", "-c", script], index).start()
+        _wait(job)
+        assert job.added == ["org/new"]
+        assert job.removed == []
+        assert index.repos() == {"org": ["new"]}
+
+
+def test_cancel_stops_child_processes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # The background sleep keeps stdout open, so the job can only finish
+        # promptly if cancel() stopped the whole process group
+        command = ["sh", "-c", "sleep 30 & echo started; wait"]
+        job = SyncManager(command, RepoIndex(Path(tmpdir))).start()
+        job.wait_for_progress(0, timeout=5.0)
+        start = time.monotonic()
+        job.cancel()
+        _wait(job)
+        assert job.status == "cancelled"
+        assert time.monotonic() - start < 5.0
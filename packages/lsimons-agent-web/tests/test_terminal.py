@@ -2,7 +2,7 @@
 
 import time
 
-from lsimons_agent_web.terminal import Terminal
+from lsimons_agent_web.terminal import Subscriber, Terminal
 
 
 def test_terminal_start_stop():
@@ -102,3 +102,92 @@ def test_terminal_scrollback():
         assert b"hello" in scrollback
     finally:
         term.stop()
+
+
+def _drain(subscriber: Subscriber) -> bytes:
+    output = b""
+    while True:
+        data = subscriber.read_nowait()
+        if data is None:
+            return output
+        output += data
+
+
+def test_terminal_multiple_subscribers_see_same_output():
+    """Test that every viewer receives the full output stream."""
+    term = Terminal(shell="/bin/sh")
+    term.start()
+
+    try:
+        first = term.subscribe()
+        second = term.subscribe()
+        assert term.subscriber_count() == 2
+
+        term.write(b"echo hello\n")
+        time.sleep(0.2)
+
+        assert b"hello" in _drain(first)
+        assert b"hello" in _drain(second)
+
+        term.unsubscribe(second)
+        assert term.subscriber_count() == 1
+    finally:
+        term.stop()
+
+
+def test_terminal_slow_subscriber_resyncs_from_screen():
+    """Test that a viewer that fell out of the ring gets a screen snapshot."""
+    term = Terminal(shell="/bin/sh")
+    term.SCROLLBACK_SIZE = 256
+    term.start()
+
+    try:
+        slow = term.subscribe()
+        _drain(slow)  # Initial snapshot
+        term.write(b"i=0; while [ $i -lt 100 ]; do echo line$i; i=$((i+1)); done\n")
+        time.sleep(0.5)
+
+        data = _drain(slow)
+        assert data.startswith(b"\x1bc")
+        assert slow.resyncs == 1
+        assert b"line99" in data
+    finally:
+        term.stop()
+
+
+def test_terminal_new_subscriber_gets_snapshot():
+    """Test that a late viewer gets the rendered screen rather than the raw log."""
+    term = Terminal(shell="/bin/sh")
+    term.start()
+
+    try:
+        term.write(b"printf 'abc\\r\\033[Kxyz\\n'\n")
+        time.sleep(0.3)
+
+        late = term.subscribe()
+        data = _drain(late)
+        assert data.startswith(b"\x1bc")
+        assert b"xyz" in data
+        assert b"\x1b[K" not in data
+    finally:
+        term.stop()
+
+
+def test_terminal_input_arbitration():
+    """Test that a second viewer cannot type while the first holds input."""
+    term = Terminal(shell="/bin/sh")
+    term.start()
+
+    try:
+        first = term.subscribe()
+        second = term.subscribe()
+
+        assert first.write(b"echo one\n")
+        assert not second.write(b"echo two\n")
+
+        # Once the first viewer is quiet for the lease period, input moves over
+        term.INPUT_LEASE = 0.0
+        time.sleep(0.01)
+        assert second.write(b"echo three\n")
+    finally:
+        term.stop()
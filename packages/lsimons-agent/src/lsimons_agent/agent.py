@@ -1,10 +1,26 @@
 """Agent loop for interactive conversation."""
 
+import argparse
 import json
 import os
+import sys
+import threading
 from collections.abc import Generator
+from pathlib import Path
 from typing import Any
 
+from lsimons_agent.budget import REPEAT_NUDGE, ToolCallCache, TurnBudget
+from lsimons_agent.checkpoints import Checkpoints
+from lsimons_agent.jobs import JobManager
+from lsimons_agent.jobs import jobs as default_jobs
+from lsimons_agent.tokens import (
+    CONTEXT_WINDOW,
+    WARN_FRACTION,
+    Usage,
+    cached_prompt_tokens,
+    call_usage,
+    estimate_request,
+)
 from lsimons_agent.tools import TOOLS, bash, execute
 
 # Use lsimons-llm when LLM_API_KEY is set, otherwise use local mock-compatible client
@@ -28,30 +44,95 @@ SYSTEM_PROMPT = """\
 You are a coding assistant. You help the user by reading, writing, and editing \
 files, and running shell commands.
 
+Start a task in an unfamiliar project with repo_map for an outline of its files \
+and symbols, instead of exploring with ls and grep.
+
 When editing files, use edit_file with the exact string to replace - include \
-enough context to make the match unique.
+enough context to make the match unique. For changes to several places or \
+files, send one unified diff to apply_patch instead.
+
+Run long commands (builds, test suites, installs) with bash background=true and \
+keep working; check on them with the job tool.
 
 Be concise. Execute tasks directly without asking for confirmation."""
 
 Event = tuple[str, Any]
 
 
-def process_message(messages: list[dict[str, Any]], user_message: str) -> Generator[Event]:
+def process_message(
+    messages: list[dict[str, Any]],
+    user_message: str,
+    session_usage: Usage | None = None,
+    budget: TurnBudget | None = None,
+    cancel: threading.Event | None = None,
+    checkpoints: Checkpoints | None = None,
+    jobs: JobManager | None = None,
+) -> Generator[Event]:
     """
     Process a user message and yield events.
 
     Yields tuples of (event_type, data):
     - ("text", content) - Agent text response
-    - ("tool", {"name": name, "args": args}) - Tool being executed
+    - ("tool", {"name": name, "args": args}) - Tool being executed (or "cached": True)
+    - ("usage", {"call": ..., "turn": ..., "session": ...}) - Tokens after each LLM call
+    - ("warning", message) - Request close to the context window, or turn stopped
+    - ("cancelled", None) - cancel was set; the turn stopped before finishing
     - ("done", None) - Processing complete
 
-    Modifies messages list in place.
+    Modifies messages list in place, and adds this turn's tokens to session_usage.
+    The turn stops early when it exceeds its budget (default from the
+    environment) or keeps repeating identical tool calls, and when cancel is
+    set (checked before each LLM call and each tool; a call already running
+    finishes first). Files the tools change are checkpointed for undo
+    (default: in the current directory, unless LSIMONS_AGENT_CHECKPOINTS=0).
+    Background jobs belong to jobs (default: the process's own).
     """
     messages.append({"role": "user", "content": user_message})
+    turn_usage = Usage()
+    budget = budget or TurnBudget.from_env()
+    jobs = jobs or default_jobs
+    tool_results = ToolCallCache(jobs)
+    if checkpoints is None:
+        checkpoints = default_checkpoints()
+    turn = checkpoints.begin(user_message) if checkpoints is not None else None
 
     while True:
+        if cancel is not None and cancel.is_set():
+            yield ("cancelled", None)
+            break
+        reason = budget.exceeded(turn_usage.total_tokens)
+        if reason:
+            yield ("warning", f"Turn stopped: {reason}")
+            break
+        budget.iterations += 1
+
+        estimated_prompt = estimate_request(messages, TOOLS)
+        if estimated_prompt > CONTEXT_WINDOW * WARN_FRACTION:
+            yield (
+                "warning",
+                f"Request is about {estimated_prompt} tokens, close to the "
+                f"{CONTEXT_WINDOW} token context window",
+            )
         response = chat(messages, tools=TOOLS)
         message: dict[str, Any] = response["choices"][0]["message"]
+
+        prompt_tokens, completion_tokens, estimated = call_usage(
+            response, estimated_prompt, message
+        )
+        call = Usage()
+        call.add(prompt_tokens, completion_tokens, estimated, cached_prompt_tokens(response))
+        turn_usage.merge(call)
+        if session_usage is not None:
+            session_usage.merge(call)
+        yield (
+            "usage",
+            {
+                "call": call.to_dict(),
+                "turn": turn_usage.to_dict(),
+                "session": session_usage.to_dict() if session_usage is not None else None,
+                "estimated_prompt_tokens": estimated_prompt,
+            },
+        )
         content: str = message.get("content", "")
         tool_calls: list[dict[str, Any]] = message.get("tool_calls", [])
 
@@ -68,12 +149,25 @@ def process_message(messages: list[dict[str, Any]], user_message: str) -> Genera
             name: str = fn["name"]
             args: dict[str, str] = json.loads(fn["arguments"])
 
-            yield ("tool", {"name": name, "args": args})
-
-            try:
-                result = execute(name, args)
-            except Exception as e:
-                result = f"Error: {e}"
+            if cancel is not None and cancel.is_set():
+                # Every tool call still needs a result for the conversation to stay valid
+                messages.append(
+                    {"role": "tool", "tool_call_id": tool_call["id"], "content": "Cancelled"}
+                )
+                continue
+
+            # An identical call with nothing changed since gets the old result back
+            cached = tool_results.lookup(name, args)
+            if cached is not None:
+                yield ("tool", {"name": name, "args": args, "cached": True})
+                result = REPEAT_NUDGE.format(name=name) + cached
+            else:
+                yield ("tool", {"name": name, "args": args})
+                try:
+                    result = execute(name, args, turn, jobs)
+                except Exception as e:
+                    result = f"Error: {e}"
+                tool_results.store(name, args, result)
 
             messages.append(
                 {
@@ -83,21 +177,52 @@ def process_message(messages: list[dict[str, Any]], user_message: str) -> Genera
                 }
             )
 
+        if tool_results.repeats >= tool_results.MAX_REPEATS:
+            yield ("warning", f"Turn stopped: {tool_results.repeats} repeated tool calls")
+            break
+
     yield ("done", None)
 
 
+def default_checkpoints(session: str | None = None) -> Checkpoints | None:
+    """Checkpoints of the current directory (for session), or None when disabled."""
+    if os.environ.get("LSIMONS_AGENT_CHECKPOINTS") == "0":
+        return None
+    return Checkpoints(Path.cwd(), session)
+
+
+def undo_note(turn: dict[str, Any]) -> str:
+    """Tell the model which files an undo put back."""
+    return "[The user undid the file changes of the turn: " + ", ".join(turn["restored"]) + "]"
+
+
 def new_conversation() -> list[dict[str, Any]]:
     """Create a new conversation with system prompt."""
     return [{"role": "system", "content": SYSTEM_PROMPT}]
 
 
 def run() -> None:
-    """Run the interactive CLI agent loop."""
+    """Run the interactive CLI agent loop, or a batch of tasks with --batch."""
+    parser = argparse.ArgumentParser(description="Custom CLI coding agent")
+    parser.add_argument("--batch", metavar="TASKS", help="run tasks from a JSONL file headlessly")
+    parser.add_argument("--workers", type=int, default=4, help="parallel tasks in batch mode")
+    parser.add_argument("--output", help="write batch results here instead of stdout")
+    parser.add_argument("--workdir", help="directory for per-task working directories")
+    args = parser.parse_args()
+    if args.batch:
+        from lsimons_agent.batch import main as run_batch
+
+        sys.exit(run_batch(args.batch, args.workers, args.output, args.workdir))
+
     messages = new_conversation()
+    usage = Usage()
 
     print("lsimons-agent")
     print("-" * 40)
-    print("Type a message, /clear to reset, !cmd for bash, Ctrl+C to exit")
+    print(
+        "Type a message, /clear to reset, /undo to revert the last turn's edits, "
+        "/usage for tokens, !cmd for bash, Ctrl+C to exit"
+    )
     print()
 
     while True:
@@ -112,18 +237,48 @@ def run() -> None:
 
         if user_input == "/clear":
             messages = new_conversation()
+            usage = Usage()
             print("Cleared.")
             continue
 
+        if user_input == "/usage":
+            approx = " (partly estimated)" if usage.estimated else ""
+            print(
+                f"{usage.calls} calls, {usage.prompt_tokens} prompt + "
+                f"{usage.completion_tokens} completion = {usage.total_tokens} tokens{approx}"
+            )
+            if usage.prompt_tokens:
+                share = usage.cached_tokens / usage.prompt_tokens
+                print(f"{usage.cached_tokens} prompt tokens from the prompt cache ({share:.0%})")
+            continue
+
+        if user_input == "/undo":
+            checkpoints = default_checkpoints()
+            turn = checkpoints.undo() if checkpoints is not None else None
+            if turn is None:
+                print("Nothing to undo.")
+                continue
+            print(f"Undid {turn['label'][:60]!r}:")
+            for path in turn["restored"]:
+                print(f"  restored {path}")
+            for path, reason in turn["failed"].items():
+                print(f"  FAILED {path}: {reason}")
+            if turn["restored"]:
+                messages.append({"role": "user", "content": undo_note(turn)})
+            continue
+
         if user_input.startswith("!"):
             print(bash(user_input[1:]))
             continue
 
-        for event_type, data in process_message(messages, user_input):
+        for event_type, data in process_message(messages, user_input, usage):
             if event_type == "text":
                 print(f"\nAgent: {data}")
             elif event_type == "tool":
-                print(f"[Tool: {data['name']}({format_args(data['args'])})]")
+                repeat = " (repeated, not run)" if data.get("cached") else ""
+                print(f"[Tool: {data['name']}({format_args(data['args'])}){repeat}]")
+            elif event_type == "warning":
+                print(f"[Warning: {data}]")
             elif event_type == "done":
                 print()
 
@@ -0,0 +1,135 @@
+"""Headless batch runner: many independent agent conversations in parallel."""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, TextIO
+
+from lsimons_agent.agent import new_conversation, process_message
+from lsimons_agent.jobs import JobManager
+from lsimons_agent.tokens import Usage
+
+
+def load_tasks(path: Path) -> list[dict[str, Any]]:
+    """Read tasks from a JSONL file.
+
+    Each line is an object with a "prompt" (or a list of "prompts", sent as
+    consecutive turns), and optionally an "id" and a "cwd" to run in instead
+    of a fresh empty directory.
+    """
+    tasks: list[dict[str, Any]] = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            task: dict[str, Any] = json.loads(line)
+            if "prompts" not in task:
+                if "prompt" not in task:
+                    raise ValueError(f"{path}:{line_number}: task has no prompt")
+                task["prompts"] = [task["prompt"]]
+            task.setdefault("id", str(line_number))
+            if task.get("cwd"):
+                task["cwd"] = str(Path(task["cwd"]).resolve())
+            tasks.append(task)
+    return tasks
+
+
+def run_task(task: dict[str, Any], workdir: str) -> dict[str, Any]:
+    """Run one task's conversation and return its result (runs in a worker process)."""
+    task_id = str(task["id"])
+    # Ids come from the tasks file; keep "/" and the like out of the directory name
+    safe_id = re.sub(r"[^\w.-]", "_", task_id)[:64]
+    cwd = task.get("cwd") or tempfile.mkdtemp(prefix=f"task-{safe_id}-", dir=workdir)
+    # Each worker process runs one task at a time, so changing its cwd isolates
+    # the relative paths used by the file tools and bash
+    os.chdir(cwd)
+
+    messages = new_conversation()
+    usage = Usage()
+    events: list[dict[str, Any]] = []
+    start = time.perf_counter()
+    first_event: float | None = None
+    turns: list[float] = []
+    error: str | None = None
+    # The task's background jobs end with it, not with the worker process
+    task_jobs = JobManager()
+    try:
+        for prompt in task["prompts"]:
+            turn_start = time.perf_counter()
+            for event_type, data in process_message(messages, str(prompt), usage, jobs=task_jobs):
+                now = time.perf_counter() - start
+                if first_event is None:
+                    first_event = now
+                # Usage is reported once, as totals
+                if event_type not in ("usage", "done"):
+                    events.append({"t": round(now, 3), "type": event_type, "data": data})
+            turns.append(round(time.perf_counter() - turn_start, 3))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        task_jobs.close()
+
+    return {
+        "id": task_id,
+        "status": "error" if error else "ok",
+        "error": error,
+        "cwd": cwd,
+        "timings": {
+            "total": round(time.perf_counter() - start, 3),
+            "first_event": round(first_event, 3) if first_event is not None else None,
+            "turns": turns,
+        },
+        "tokens": usage.to_dict(),
+        "events": events,
+        "transcript": messages[1:],  # Without the system prompt
+    }
+
+
+def run_batch(
+    tasks: list[dict[str, Any]],
+    workers: int = 4,
+    output: TextIO = sys.stdout,
+    workdir: str | None = None,
+) -> int:
+    """Run tasks in a process pool, writing each result as a JSON line when it finishes.
+
+    Returns the number of failed tasks.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="lsimons-agent-batch-")
+    Path(workdir).mkdir(parents=True, exist_ok=True)
+    workdir = str(Path(workdir).resolve())  # Workers change their cwd
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures: dict[Future[dict[str, Any]], dict[str, Any]] = {
+            pool.submit(run_task, task, workdir): task for task in tasks
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (or the task couldn't be sent to it)
+                task_id = str(futures[future]["id"])
+                result = {"id": task_id, "status": "error", "error": f"{type(e).__name__}: {e}"}
+            if result["status"] != "ok":
+                failed += 1
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    return failed
+
+
+def main(tasks_path: str, workers: int, output_path: str | None, workdir: str | None) -> int:
+    """Run a batch from the command line; returns the process exit code."""
+    tasks = load_tasks(Path(tasks_path))
+    print(f"Running {len(tasks)} tasks with {workers} workers", file=sys.stderr)
+    if output_path:
+        with open(output_path, "w") as output:
+            failed = run_batch(tasks, workers, output, workdir)
+    else:
+        failed = run_batch(tasks, workers, sys.stdout, workdir)
+    print(f"{len(tasks) - failed} succeeded, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
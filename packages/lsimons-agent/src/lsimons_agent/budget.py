@@ -0,0 +1,88 @@
+"""Per-turn limits and detection of repeated tool calls."""
+
+import json
+import os
+import time
+from typing import Any
+
+from lsimons_agent.jobs import JobManager, jobs
+
+# Tools that can change what other tools return
+MUTATING_TOOLS = {"write_file", "edit_file", "apply_patch", "bash", "job"}
+
+# Tools whose results change by themselves, so are never reused
+VOLATILE_TOOLS = {"job"}
+
+REPEAT_NUDGE = (
+    "[Repeated call: {name} was already called with these arguments and nothing has "
+    "changed since, so it was not run again. Its previous result follows. Try a "
+    "different approach.]\n"
+)
+
+
+class TurnBudget:
+    """Limits on one turn: LLM calls, wall-clock seconds and tokens (0 = no limit)."""
+
+    def __init__(self, max_iterations: int = 50, max_seconds: float = 900.0, max_tokens: int = 0):
+        self.max_iterations = max_iterations
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.iterations = 0
+        self.started = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> TurnBudget:
+        """Budget configured by LSIMONS_AGENT_MAX_* environment variables."""
+        return cls(
+            max_iterations=int(os.environ.get("LSIMONS_AGENT_MAX_ITERATIONS", "50")),
+            max_seconds=float(os.environ.get("LSIMONS_AGENT_MAX_TURN_SECONDS", "900")),
+            max_tokens=int(os.environ.get("LSIMONS_AGENT_MAX_TURN_TOKENS", "0")),
+        )
+
+    def exceeded(self, tokens: int) -> str | None:
+        """Why the turn must stop before the next LLM call, or None."""
+        if self.max_iterations and self.iterations >= self.max_iterations:
+            return f"reached {self.max_iterations} LLM calls"
+        elapsed = time.monotonic() - self.started
+        if self.max_seconds and elapsed >= self.max_seconds:
+            return f"ran for {elapsed:.0f}s (limit {self.max_seconds:.0f}s)"
+        if self.max_tokens and tokens >= self.max_tokens:
+            return f"used {tokens} tokens (limit {self.max_tokens})"
+        return None
+
+
+class ToolCallCache:
+    """Remembers tool results within a turn to catch identical repeated calls.
+
+    A result is reused only while no mutating tool has run since it was
+    produced (a mutating call's own result is stored after it, so running
+    the same bash command twice in a row is caught too) and no background
+    job of the conversation (jobs) is running, as it may be changing files.
+    """
+
+    MAX_REPEATS = 3  # Reused results in a turn before giving up on the turn
+
+    def __init__(self, jobs: JobManager = jobs):
+        self.jobs = jobs
+        self.repeats = 0
+        self._epoch = 0
+        self._results: dict[str, tuple[int, str]] = {}
+
+    @staticmethod
+    def _key(name: str, args: dict[str, Any]) -> str:
+        return name + ":" + json.dumps(args, sort_keys=True)
+
+    def lookup(self, name: str, args: dict[str, Any]) -> str | None:
+        """The earlier result of an identical call, if it still holds."""
+        if name in VOLATILE_TOOLS or self.jobs.any_running():
+            return None
+        cached = self._results.get(self._key(name, args))
+        if cached is None or cached[0] != self._epoch:
+            return None
+        self.repeats += 1
+        return cached[1]
+
+    def store(self, name: str, args: dict[str, Any], result: str) -> None:
+        if name in MUTATING_TOOLS:
+            self._epoch += 1
+        self._results[self._key(name, args)] = (self._epoch, result)
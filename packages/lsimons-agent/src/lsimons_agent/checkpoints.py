@@ -0,0 +1,230 @@
+"""Per-turn checkpoints of files changed by the agent's tools, for undo.
+
+Before a tool first changes a file in a turn, the file's current content
+(its pre-image) is saved in a content-addressed object store, and the turn's
+manifest records it. Undo restores the files of the latest turn, so it
+costs time proportional to the files that turn touched, not the tree size.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Generator
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAX_TURNS = 50  # Turns kept; older ones (and objects only they use) are removed
+FICLONE = 0x40049409  # Linux ioctl for a copy-on-write clone (btrfs, XFS, ...)
+
+
+def _clone(src: Path, dst: Path) -> None:
+    """Copy src to a new file dst, as a reflink when the filesystem can."""
+    if fcntl is not None:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+                return
+            except OSError:
+                pass
+    shutil.copyfile(src, dst)
+
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class Checkpoints:
+    """Checkpoint store of one workspace, in <root>/.lsimons-agent/checkpoints.
+
+    With a session, turns are tagged with it and only that session's turns
+    are listed and undone (the web server runs several sessions in one
+    workspace). Without one, every turn is.
+
+    Pre-images are stored by hardlink when possible, which is safe because
+    the file tools replace files rather than rewrite them in place; restore
+    verifies each object's hash in case something else (e.g. bash) did.
+    """
+
+    def __init__(self, root: Path, session: str | None = None):
+        self.root = root.absolute()
+        self.session = session
+        self.dir = self.root / ".lsimons-agent" / "checkpoints"
+        self.objects = self.dir / "objects"
+        self.turns = self.dir / "turns"
+        self._lock = threading.Lock()
+
+    def begin(self, label: str) -> Turn:
+        """Start a turn; it is only stored once a file is recorded in it."""
+        return Turn(self, f"{time.time_ns()}-{os.getpid()}", label, self.session)
+
+    def _ensure_dirs(self) -> None:
+        if not self.turns.exists():
+            self.objects.mkdir(parents=True, exist_ok=True)
+            self.turns.mkdir(parents=True, exist_ok=True)
+            # Keep checkpoints out of git status and repo_map
+            (self.dir.parent / ".gitignore").write_text("*\n")
+
+    def store(self, path: Path) -> str:
+        """Save a file's content as an object and return its id (the content hash)."""
+        self._ensure_dirs()
+        digest = file_digest(path)
+        target = self.objects / digest[:2] / digest
+        if target.exists():
+            return digest
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        os.close(fd)
+        os.unlink(temp)
+        try:
+            os.link(path, temp)
+        except OSError:
+            # Other filesystem, or no hardlinks
+            _clone(path, Path(temp))
+        os.replace(temp, target)
+        return digest
+
+    def save_manifest(self, turn: Turn) -> None:
+        self._ensure_dirs()
+        data = {
+            "id": turn.id,
+            "label": turn.label,
+            "session": turn.session,
+            "created": turn.created,
+            "files": turn.files,
+        }
+        fd, temp = tempfile.mkstemp(dir=self.turns, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        path = self.turns / f"{turn.id}.json"
+        is_new = not path.exists()
+        os.replace(temp, path)
+        if is_new:
+            self._prune()
+
+    def list_turns(self) -> list[dict[str, Any]]:
+        """Stored turns (of this session, if any), oldest first."""
+        turns = self._all_turns()
+        if self.session is None:
+            return turns
+        return [turn for turn in turns if turn.get("session") == self.session]
+
+    def _all_turns(self) -> list[dict[str, Any]]:
+        if not self.turns.exists():
+            return []
+        # Ids start with a nanosecond timestamp; sort numerically, skipping stray files
+        stamped: list[tuple[int, Path]] = []
+        for path in self.turns.glob("*.json"):
+            with contextlib.suppress(ValueError):
+                stamped.append((int(path.stem.split("-")[0]), path))
+        turns: list[dict[str, Any]] = []
+        for _, path in sorted(stamped):
+            with contextlib.suppress(OSError, ValueError):
+                turns.append(json.loads(path.read_text()))
+        return turns
+
+    @contextlib.contextmanager
+    def _exclusive(self) -> Generator[None]:
+        """Hold the store's lock, which other instances and processes respect too."""
+        with self._lock:
+            if fcntl is None or not self.dir.exists():
+                yield
+                return
+            with open(self.dir / "lock", "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                yield
+
+    def undo(self) -> dict[str, Any] | None:
+        """Restore the files of the latest turn (of this session) and forget it.
+
+        Returns the turn with "restored" (paths) and "failed" (path: reason),
+        or None if there is nothing to undo.
+        """
+        with self._exclusive():
+            turns = self.list_turns()
+            if not turns:
+                return None
+            turn = turns[-1]
+            restored: list[str] = []
+            failed: dict[str, str] = {}
+            for name, entry in turn["files"].items():
+                try:
+                    self._restore(Path(name), entry)
+                    restored.append(name)
+                except (OSError, ValueError) as e:
+                    failed[name] = str(e)
+            (self.turns / f"{turn['id']}.json").unlink(missing_ok=True)
+            turn["restored"] = restored
+            turn["failed"] = failed
+            return turn
+
+    def _restore(self, path: Path, entry: dict[str, Any]) -> None:
+        object_id: str | None = entry["object"]
+        if object_id is None:
+            # The turn created the file
+            path.unlink(missing_ok=True)
+            return
+        source = self.objects / object_id[:2] / object_id
+        if file_digest(source) != object_id:
+            raise ValueError("saved copy was changed in place since; not restored")
+        path = path.resolve()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            # A copy, not a link, so later edits can't reach the object
+            _clone(source, Path(temp))
+            os.chmod(temp, entry["mode"])
+            os.replace(temp, path)
+        except BaseException:
+            Path(temp).unlink(missing_ok=True)
+            raise
+
+    def _prune(self) -> None:
+        """Drop turns beyond MAX_TURNS and objects no remaining turn uses."""
+        turns = self._all_turns()
+        if len(turns) <= MAX_TURNS:
+            return
+        for turn in turns[:-MAX_TURNS]:
+            (self.turns / f"{turn['id']}.json").unlink(missing_ok=True)
+        used = {entry["object"] for turn in turns[-MAX_TURNS:] for entry in turn["files"].values()}
+        for path in self.objects.glob("*/*"):
+            if path.name not in used:
+                path.unlink(missing_ok=True)
+
+
+class Turn:
+    """The pre-images recorded during one agent turn."""
+
+    def __init__(
+        self, checkpoints: Checkpoints, turn_id: str, label: str, session: str | None = None
+    ):
+        self.checkpoints = checkpoints
+        self.id = turn_id
+        self.label = label
+        self.session = session
+        self.created = time.time()
+        self.files: dict[str, dict[str, Any]] = {}
+
+    def record(self, path: str) -> None:
+        """Save a file's pre-image before its first change in this turn."""
+        name = str(Path(path).resolve())  # Through symlinks, to the file that changes
+        if name in self.files:
+            return
+        p = Path(name)
+        if p.is_file():
+            entry = {"object": self.checkpoints.store(p), "mode": p.stat().st_mode & 0o7777}
+        else:
+            entry = {"object": None, "mode": None}
+        self.files[name] = entry
+        self.checkpoints.save_manifest(self)
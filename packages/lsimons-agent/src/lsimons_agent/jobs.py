@@ -0,0 +1,176 @@
+"""Background jobs: shell commands that keep running between tool calls."""
+
+import atexit
+import codecs
+import os
+import signal
+import subprocess
+import threading
+import time
+import weakref
+
+MAX_OUTPUT = 1_000_000  # Characters of output kept per job; the oldest are dropped
+KILL_GRACE = 2.0  # Seconds between SIGTERM and SIGKILL
+MAX_FINISHED = 20  # Finished jobs kept per manager; older ones are forgotten
+
+
+class Job:
+    """A shell command running in its own process group, with its output collected."""
+
+    def __init__(self, job_id: int, command: str):
+        self.id = job_id
+        self.command = command
+        self.started = time.monotonic()
+        self.ended: float | None = None
+        self.killed = False
+        self.process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,  # So kill() reaches its children too
+        )
+        self.cursor = 0  # Where the next read continues by default
+        self._output = ""
+        self._dropped = 0  # Characters dropped from the front of _output
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def _collect(self) -> None:
+        assert self.process.stdout is not None
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        fd = self.process.stdout.fileno()
+        while chunk := os.read(fd, 65536):
+            self._append(decoder.decode(chunk))
+        self._append(decoder.decode(b"", final=True))
+        self.process.stdout.close()
+        self.process.wait()
+        self.ended = time.monotonic()
+        self._done.set()
+
+    def _append(self, text: str) -> None:
+        with self._lock:
+            self._output += text
+            excess = len(self._output) - MAX_OUTPUT
+            if excess > 0:
+                self._output = self._output[excess:]
+                self._dropped += excess
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    @property
+    def total(self) -> int:
+        """Characters of output produced so far."""
+        with self._lock:
+            return self._dropped + len(self._output)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for the command to finish (and its output to be collected)."""
+        return self._done.wait(timeout)
+
+    def status(self) -> str:
+        if self.running:
+            return f"running for {time.monotonic() - self.started:.0f}s"
+        assert self.ended is not None
+        ran = f"after {self.ended - self.started:.0f}s"
+        if self.killed:
+            return f"killed {ran}"
+        return f"exited with code {self.process.returncode} {ran}"
+
+    def read(self, offset: int | None = None, limit: int = MAX_OUTPUT) -> tuple[str, int, int]:
+        """Output from offset (default: where the last read stopped) as (text, start, end).
+
+        Offsets count characters since the job started; output dropped for
+        being too old is skipped.
+        """
+        with self._lock:
+            start = max(self.cursor if offset is None else offset, self._dropped)
+            begin = start - self._dropped
+            text = self._output[begin : begin + limit]
+        end = start + len(text)
+        self.cursor = max(self.cursor, end)
+        return text, start, end
+
+    def kill(self) -> None:
+        """Stop the command and everything it started."""
+        if not self.running:
+            return
+        self.killed = True
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(self.process.pid, sig)
+            except ProcessLookupError:
+                break
+            if self.wait(KILL_GRACE):
+                break
+
+
+# Every manager, so none leaves jobs running when the process exits
+_managers: weakref.WeakSet[JobManager] = weakref.WeakSet()
+
+
+class JobManager:
+    """The background jobs of one conversation (or agent run), by id.
+
+    Only the newest MAX_FINISHED finished jobs are kept, so their output
+    doesn't pile up over a long-running server.
+    """
+
+    def __init__(self):
+        self._jobs: dict[int, Job] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        _managers.add(self)
+
+    def start(self, command: str) -> Job:
+        with self._lock:
+            job = self._jobs[self._next_id] = Job(self._next_id, command)
+            self._next_id += 1
+            finished = [j for j in self._jobs.values() if not j.running]
+            for old in finished[: max(0, len(finished) - MAX_FINISHED)]:
+                del self._jobs[old.id]
+        return job
+
+    def get(self, job_id: int) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"No job {job_id}")
+        return job
+
+    def forget(self, job: Job) -> None:
+        """Drop a finished job from the list (e.g. a foreground command)."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def list_jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def any_running(self) -> bool:
+        return any(job.running for job in self.list_jobs())
+
+    def kill_all(self) -> None:
+        for job in self.list_jobs():
+            job.kill()
+
+    def close(self) -> None:
+        """Kill and forget every job, e.g. when the conversation ends."""
+        self.kill_all()
+        with self._lock:
+            self._jobs.clear()
+
+
+def _kill_all_managers() -> None:
+    for manager in list(_managers):
+        manager.kill_all()
+
+
+# Jobs of callers that don't bring their own manager (the interactive CLI)
+jobs = JobManager()
+# Don't leave builds running after the agent exits
+atexit.register(_kill_all_managers)
@@ -1,36 +1,89 @@
-"""LLM client for OpenAI-compatible APIs."""
+"""LLM client for OpenAI-compatible APIs.
 
+Requests are built so that consecutive calls in a conversation share a
+byte-identical prefix (tools, system prompt, earlier messages), which is what
+provider-side prompt caching matches on.
+"""
+
+import json
 import os
 from typing import Any
 
 import httpx
 
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def canonical_json(value: Any) -> str:
+    """JSON with sorted keys and no insignificant whitespace, so equal values give equal bytes."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _with_cache_control(message: dict[str, Any]) -> dict[str, Any]:
+    """Copy of message with its text as a content part carrying a cache marker."""
+    part = {"type": "text", "text": message["content"], "cache_control": CACHE_CONTROL}
+    return {**message, "content": [part]}
+
+
+def mark_cache_points(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Messages with cache markers on the system prompt and the end of older history.
+
+    Older history is everything before the latest user message; the marker goes
+    on its last message with text content. The input is not modified.
+    """
+    marked = list(messages)
+    if marked and marked[0].get("role") == "system" and isinstance(marked[0].get("content"), str):
+        marked[0] = _with_cache_control(marked[0])
+    last_user = max((i for i, m in enumerate(marked) if m.get("role") == "user"), default=0)
+    for i in range(last_user - 1, 0, -1):
+        content = marked[i].get("content")
+        if isinstance(content, str) and content:
+            marked[i] = _with_cache_control(marked[i])
+            break
+    return marked
+
+
+def build_payload(
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]] | None = None,
+    model: str = "mock-model",
+    cache_control: bool = False,
+) -> dict[str, Any]:
+    """Chat completion request body; tools are sorted by name so their order is stable."""
+    payload: dict[str, Any] = {
+        "model": model,
+        "messages": mark_cache_points(messages) if cache_control else messages,
+        "max_tokens": 4096,
+    }
+    if tools:
+        payload["tools"] = sorted(tools, key=lambda tool: tool["function"]["name"])
+    return payload
+
 
 def chat(
     messages: list[dict[str, Any]],
     tools: list[dict[str, Any]] | None = None,
     model: str | None = None,
 ) -> dict[str, Any]:
-    """Send messages to LLM and return raw API response dict."""
+    """Send messages to LLM and return raw API response dict.
+
+    With LLM_CACHE_CONTROL=1, explicit cache markers are added for providers
+    that need them (e.g. Anthropic models behind LiteLLM).
+    """
     base_url = os.environ.get("LLM_BASE_URL", "http://localhost:8000")
     auth_token = os.environ.get("LLM_AUTH_TOKEN", "")
     model = model or os.environ.get("LLM_DEFAULT_MODEL", "mock-model")
+    cache_control = os.environ.get("LLM_CACHE_CONTROL") == "1"
 
-    payload: dict[str, Any] = {
-        "model": model,
-        "messages": messages,
-        "max_tokens": 4096,
-    }
-    if tools:
-        payload["tools"] = tools
+    payload = build_payload(messages, tools, model, cache_control)
 
-    headers: dict[str, str] = {}
+    headers: dict[str, str] = {"Content-Type": "application/json"}
     if auth_token:
         headers["Authorization"] = f"Bearer {auth_token}"
 
     response = httpx.post(
         f"{base_url}/chat/completions",
-        json=payload,
+        content=canonical_json(payload).encode(),
         headers=headers,
         timeout=120.0,
     )
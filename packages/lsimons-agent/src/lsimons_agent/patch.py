@@ -0,0 +1,290 @@
+"""Apply multi-file unified diffs, with fuzzy matching and all-or-nothing writes."""
+
+import difflib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+MAX_FUZZ = 2  # Context lines that may be dropped from each end of a hunk
+
+
+class Hunk:
+    """One @@ section: lines before (context and removed) and after (context and added)."""
+
+    def __init__(self, header: str, old_start: int):
+        self.header = header
+        self.old_start = old_start
+        self.lines: list[str] = []  # With their " ", "-" or "+" prefix
+
+    def side(self, keep: str) -> list[str]:
+        return [line[1:] for line in self.lines if line[0] in keep]
+
+
+class FilePatch:
+    """The hunks for one file; old_path or new_path is None for created/deleted files."""
+
+    def __init__(self, old_path: str | None, new_path: str | None):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.hunks: list[Hunk] = []
+
+    @property
+    def path(self) -> str:
+        return self.new_path or self.old_path or ""
+
+
+def split_lines(text: str) -> list[str]:
+    """Lines of text split on "\n" only.
+
+    str.splitlines() also splits on form feeds, "\x1c"-"\x1e", "\x85" and
+    "\u2028", which would rewrite lines the patch never touched.
+    """
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def _header_path(line: str, prefix: str) -> str | None:
+    path = line[4:].split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path.startswith(prefix) else path
+
+
+def parse_patch(text: str) -> list[FilePatch]:
+    """Parse a unified diff (git-style or plain) into per-file hunks.
+
+    Hunk line counts are not trusted (they are often wrong in hand-written
+    diffs): a hunk runs until the next hunk or file header.
+    """
+    files: list[FilePatch] = []
+    # CRLF patches: the "\r" isn't part of the line (file content keeps its own)
+    lines = [line.removesuffix("\r") for line in split_lines(text)]
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            files.append(FilePatch(_header_path(line, "a/"), _header_path(lines[i + 1], "b/")))
+            i += 2
+            continue
+        match = HUNK_HEADER.match(line)
+        if match:
+            if not files:
+                raise ValueError(f"Hunk before any file header: {line}")
+            hunk = Hunk(line, int(match.group(1)))
+            files[-1].hunks.append(hunk)
+            i += 1
+            while i < len(lines):
+                body = lines[i]
+                if body.startswith("@@") or (
+                    body.startswith("--- ")
+                    and i + 1 < len(lines)
+                    and lines[i + 1].startswith("+++ ")
+                ):
+                    break
+                if body.startswith("\\"):
+                    pass  # "\ No newline at end of file"
+                elif body == "":
+                    hunk.lines.append(" ")  # Blank context line with its space stripped
+                elif body[0] in " -+":
+                    hunk.lines.append(body)
+                else:
+                    break
+                i += 1
+            continue
+        i += 1  # "diff --git", "index ..." and other noise
+    if not files:
+        raise ValueError("No file headers (--- / +++) found in patch")
+    return files
+
+
+def _find(lines: list[str], old: list[str], start: int, expected: int) -> int | None:
+    """Index where old occurs at or after start, preferring the one closest to expected."""
+    if not old:
+        return min(max(expected, start), len(lines))
+    candidates = [
+        i for i in range(start, len(lines) - len(old) + 1) if lines[i : i + len(old)] == old
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda i: abs(i - expected))
+
+
+def _locate(lines: list[str], hunk: Hunk, start: int, expected: int) -> tuple[int, int, int, str]:
+    """Find a hunk in lines; returns (index, dropped leading, dropped trailing, how)."""
+    old = hunk.side(" -")
+    stripped_lines = [line.rstrip() for line in lines]
+    for fuzz in range(MAX_FUZZ + 1):
+        for lead in range(fuzz + 1):
+            trail = fuzz - lead
+            # Only context lines can be dropped
+            if any(line[0] != " " for line in hunk.lines[:lead]):
+                continue
+            if trail and any(line[0] != " " for line in hunk.lines[-trail:]):
+                continue
+            if len(old) - lead - trail <= 0 and old:
+                continue
+            candidate = old[lead : len(old) - trail]
+            index = _find(lines, candidate, start, expected + lead)
+            how = "exact" if fuzz == 0 else f"fuzz {fuzz}"
+            if index is None:
+                # Trailing whitespace differences
+                index = _find(
+                    stripped_lines, [c.rstrip() for c in candidate], start, expected + lead
+                )
+                how = "ignoring trailing whitespace" + ("" if fuzz == 0 else f", fuzz {fuzz}")
+            if index is not None:
+                return index, lead, trail, how
+    raise LookupError(_closest(lines, old))
+
+
+def _closest(lines: list[str], old: list[str]) -> str:
+    first = next((line for line in old if line.strip()), "")
+    close = difflib.get_close_matches(first, lines, n=1, cutoff=0.6)
+    if not close:
+        return "lines to change not found"
+    line = lines.index(close[0]) + 1
+    return f"lines to change not found; closest is line {line}: {close[0].strip()!r}"
+
+
+def _apply_hunks(content: str, patch: FilePatch, report: list[str]) -> str | None:
+    """New file content, or None (with failures in report) if any hunk doesn't apply.
+
+    Lines keep their own endings; added lines get the file's ("\r\n" if its
+    first line ends that way).
+    """
+    lines = split_lines(content)
+    had_newline = content.endswith("\n") or not content
+    first_end = content.find("\n")
+    eol = "\r" if first_end > 0 and content[first_end - 1] == "\r" else ""
+    failed = False
+    start = 0
+    offset = 0  # How far earlier hunks moved later lines
+    for number, hunk in enumerate(patch.hunks, 1):
+        bare = [line.removesuffix("\r") for line in lines] if eol else lines
+        try:
+            index, lead, trail, how = _locate(bare, hunk, start, hunk.old_start - 1 + offset)
+        except LookupError as e:
+            report.append(f"{patch.path}: hunk {number} {hunk.header} FAILED: {e}")
+            failed = True
+            continue
+        body = hunk.lines[lead : len(hunk.lines) - trail]
+        old = [line[1:] for line in body if line[0] in " -"]
+        new = [line[1:] for line in body if line[0] in " +"]
+        # Keep the file's version of context lines (whitespace may differ)
+        merged: list[str] = []
+        position = index
+        for line in body:
+            if line[0] == " ":
+                merged.append(lines[position])
+                position += 1
+            elif line[0] == "-":
+                position += 1
+            else:
+                merged.append(line[1:] + eol)
+        lines[index : index + len(old)] = merged
+        start = index + len(new)
+        offset += len(new) - len(old)
+        report.append(f"{patch.path}: hunk {number} applied at line {index + 1} ({how})")
+    if failed:
+        return None
+    if not had_newline and lines:
+        lines[-1] = lines[-1].removesuffix(eol)
+    return "\n".join(lines) + ("\n" if had_newline and lines else "")
+
+
+def current_umask() -> int:
+    """The process umask (reading it means setting it, so it's set straight back)."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def _write_atomic(writes: dict[Path, str | None]) -> None:
+    """Replace all files (None deletes) or, if anything fails, restore them all."""
+    staged: dict[Path, str] = {}
+    try:
+        for path, content in writes.items():
+            if content is None:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+            staged[path] = temp
+            with os.fdopen(fd, "w", newline="") as f:
+                f.write(content)
+            os.chmod(temp, path.stat().st_mode if path.exists() else 0o666 & ~current_umask())
+    except BaseException:
+        for temp in staged.values():
+            os.unlink(temp)
+        raise
+
+    originals = {path: path.read_bytes() if path.exists() else None for path in writes}
+    done: list[Path] = []
+    try:
+        for path in writes:
+            if path in staged:
+                os.replace(staged.pop(path), path)
+            else:
+                path.unlink()
+            done.append(path)
+    except BaseException:
+        for path in done:
+            original = originals[path]
+            if original is None:
+                path.unlink(missing_ok=True)
+            else:
+                path.write_bytes(original)
+        for temp in staged.values():
+            os.unlink(temp)
+        raise
+
+
+def _read(path: Path) -> str:
+    """File content with its line endings as they are."""
+    with open(path, newline="") as f:
+        return f.read()
+
+
+def apply_patch(text: str) -> str:
+    """Apply a multi-file unified diff and return a per-hunk report.
+
+    Every hunk of every file must apply, or no file is changed and ValueError
+    lists what failed.
+    """
+    writes: dict[Path, str | None] = {}
+    report: list[str] = []
+    failed = False
+    for patch in parse_patch(text):
+        source = Path(patch.old_path) if patch.old_path else None
+        if source is not None and not source.exists():
+            report.append(f"{patch.path}: FAILED: file not found")
+            failed = True
+            continue
+        if patch.new_path is None:
+            writes[Path(patch.path)] = None
+            report.append(f"{patch.path}: deleted")
+            continue
+        if source is None:
+            content = ""
+        else:
+            # A file may appear more than once; later sections patch earlier results
+            pending = writes.get(source)
+            content = pending if pending is not None else _read(source)
+        if source is None and Path(patch.new_path).exists():
+            report.append(f"{patch.path}: FAILED: file already exists")
+            failed = True
+            continue
+        new_content = _apply_hunks(content, patch, report)
+        if new_content is None:
+            failed = True
+            continue
+        writes[Path(patch.new_path)] = new_content
+        if source is not None and patch.old_path != patch.new_path:
+            writes[source] = None  # Renamed
+    if failed:
+        raise ValueError("Patch not applied, no files changed:\n" + "\n".join(report))
+    _write_atomic(writes)
+    return "\n".join(report)
@@ -0,0 +1,251 @@
+"""Compact outline of a repository's files and top-level symbols, cached on disk."""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any
+
+CACHE_DIR = Path(
+    os.environ.get("LSIMONS_AGENT_CACHE_DIR", Path.home() / ".cache" / "lsimons-agent")
+)
+CACHE_VERSION = 1
+MAX_FILE_SIZE = 1_000_000  # Larger files are listed without symbols
+MAX_CHARS = 20_000  # Default size limit of the outline
+MAX_FILES = 20_000  # Files listed at most, so a walk of e.g. $HOME stays bounded
+
+# Directories skipped when the project is not a git checkout
+SKIP_DIRS = {"node_modules", "__pycache__", ".venv", "venv", "dist", "build", "target"}
+
+# Top-level declarations by file extension, for languages without a parser here
+SYMBOL_PATTERNS: dict[str, re.Pattern[str]] = {
+    ".js": re.compile(
+        r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?"
+        r"(?:function\*?\s+\w+|class\s+\w+"
+        r"|(?:const|let)\s+\w+(?=\s*=\s*(?:async\s+)?(?:\(|function)))",
+        re.M,
+    ),
+    ".go": re.compile(r"^(?:func\s+(?:\([^)]*\)\s*)?\w+|type\s+\w+\s+\w+)", re.M),
+    ".rs": re.compile(
+        r"^(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:fn|struct|enum|trait|impl|mod|type)\b[^{;]*",
+        re.M,
+    ),
+    ".java": re.compile(
+        r"^\s{0,4}(?:public|protected|private)?\s*(?:static\s+|final\s+|abstract\s+)*"
+        r"(?:class|interface|enum|record)\s+\w+",
+        re.M,
+    ),
+    ".rb": re.compile(r"^\s{0,2}(?:class|module|def)\s+[\w.:]+", re.M),
+    ".sh": re.compile(r"^(?:function\s+)?\w+\s*\(\)", re.M),
+    ".md": re.compile(r"^#{1,2} .+", re.M),
+}
+FENCED_CODE = re.compile(r"^```.*?^```", re.M | re.S)
+for _alias, _language in {
+    ".jsx": ".js",
+    ".mjs": ".js",
+    ".ts": ".js",
+    ".tsx": ".js",
+    ".kt": ".java",
+    ".cs": ".java",
+    ".bash": ".sh",
+}.items():
+    SYMBOL_PATTERNS[_alias] = SYMBOL_PATTERNS[_language]
+
+
+def _signature(node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+    args = [a.arg for a in node.args.posonlyargs + node.args.args]
+    if node.args.vararg:
+        args.append("*" + node.args.vararg.arg)
+    args += [a.arg for a in node.args.kwonlyargs]
+    if node.args.kwarg:
+        args.append("**" + node.args.kwarg.arg)
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{prefix} {node.name}({', '.join(args)})"
+
+
+def python_symbols(source: str) -> list[str]:
+    """Top-level functions, classes (with their methods) and constants."""
+    tree = ast.parse(source)
+    symbols: list[str] = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef):
+            symbols.append(_signature(node))
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            symbols.append(f"class {node.name}({bases})" if bases else f"class {node.name}")
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef | ast.AsyncFunctionDef):
+                    symbols.append("  " + _signature(item))
+        elif isinstance(node, ast.Assign | ast.AnnAssign):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id.isupper():
+                    symbols.append(target.id)
+    return symbols
+
+
+def file_symbols(path: Path) -> list[str]:
+    """Symbols of one file ([] for unknown languages or unparseable files)."""
+    suffix = path.suffix.lower()
+    if suffix != ".py" and suffix not in SYMBOL_PATTERNS:
+        return []
+    try:
+        if path.stat().st_size > MAX_FILE_SIZE:
+            return []
+        source = path.read_text(errors="replace")
+        if suffix == ".py":
+            return python_symbols(source)
+        if suffix == ".md":
+            source = FENCED_CODE.sub("", source)  # "# comments" in code aren't headings
+    except OSError, SyntaxError, ValueError:
+        return []
+    return [m.group(0).strip().rstrip("({ =") for m in SYMBOL_PATTERNS[suffix].finditer(source)]
+
+
+def list_files(root: Path, max_files: int = MAX_FILES) -> list[str]:
+    """Project files relative to root, at most max_files of them.
+
+    In a git checkout these are the tracked and untracked-but-not-ignored
+    files, otherwise everything outside hidden and build directories.
+    """
+    try:
+        # -z: names unquoted, so non-ASCII paths can be stat()ed; decoded like
+        # os.walk does, so names that aren't UTF-8 survive too
+        result = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=root,
+            capture_output=True,
+            timeout=30,
+        )
+        if result.returncode == 0:
+            names = {os.fsdecode(name) for name in result.stdout.split(b"\0") if name}
+            return sorted(names)[:max_files]
+    except OSError, subprocess.TimeoutExpired:
+        pass
+    files: list[str] = []
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in SKIP_DIRS)
+        for name in sorted(names):
+            if not name.startswith("."):
+                files.append(os.path.relpath(os.path.join(directory, name), root))
+                if len(files) >= max_files:
+                    return files
+    return files
+
+
+class RepoMap:
+    """File and symbol outline of one project, kept in a JSON cache file.
+
+    Each file's entry is keyed by its mtime and size, so refresh() only
+    re-parses files that changed since the last call (in any process).
+    """
+
+    def __init__(self, root: Path, cache_dir: Path = CACHE_DIR, max_files: int = MAX_FILES):
+        self.root = root.resolve()
+        self.max_files = max_files
+        self.truncated = False  # The project has more than max_files files
+        digest = hashlib.sha1(str(self.root).encode()).hexdigest()[:16]
+        self.cache_path = cache_dir / "repomap" / f"{digest}.json"
+        self.files: dict[str, dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data: dict[str, Any] = json.loads(self.cache_path.read_text())
+        except OSError, ValueError:
+            return
+        if data.get("version") == CACHE_VERSION and data.get("root") == str(self.root):
+            self.files = data["files"]
+
+    def _save(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": CACHE_VERSION, "root": str(self.root), "files": self.files}
+        fd, temp = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(temp, self.cache_path)
+
+    def refresh(self) -> int:
+        """Bring the outline up to date; returns the number of files re-parsed."""
+        parsed = 0
+        files: dict[str, dict[str, Any]] = {}
+        names = list_files(self.root, self.max_files + 1)
+        self.truncated = len(names) > self.max_files
+        for name in names[: self.max_files]:
+            try:
+                stat = (self.root / name).stat()
+            except OSError:
+                continue  # Deleted but still in the git index
+            key = [stat.st_mtime_ns, stat.st_size]
+            entry = self.files.get(name)
+            if entry is None or entry["key"] != key:
+                entry = {"key": key, "symbols": file_symbols(self.root / name)}
+                parsed += 1
+            files[name] = entry
+        changed = parsed > 0 or files.keys() != self.files.keys()
+        self.files = files
+        if changed:
+            self._save()
+        return parsed
+
+    def outline(self, prefix: str = "", max_chars: int = MAX_CHARS) -> str:
+        """Files under prefix with their symbols indented below, cut at max_chars."""
+        lines: list[str] = []
+        size = 0
+        names = [name for name in self.files if name.startswith(prefix)]
+        for shown, name in enumerate(names):
+            block = [name] + ["  " + symbol for symbol in self.files[name]["symbols"]]
+            block_size = sum(len(line) + 1 for line in block)
+            if size + block_size > max_chars:
+                lines.append(f"[{len(names) - shown} more files; ask for a subdirectory with path]")
+                break
+            lines += block
+            size += block_size
+        text = "\n".join(lines) or f"No files under {prefix or self.root}"
+        if self.truncated:
+            note = (
+                f"[Stopped listing after {self.max_files} files; is {self.root} the project "
+                "you meant? Ask for a subdirectory with path]"
+            )
+            text = note + "\n" + text
+        return text
+
+
+# Maps already loaded in this process, by project root
+_maps: dict[Path, RepoMap] = {}
+
+
+def repo_map(path: str = ".") -> str:
+    """Outline of the project containing path (the current directory by default).
+
+    The project is the enclosing git checkout, or path itself; a path inside
+    it limits the outline to that subdirectory.
+    """
+    target = Path(path).resolve()
+    root = target if target.is_dir() else target.parent
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=root,
+            capture_output=True,
+            timeout=10,
+        )
+        if result.returncode == 0:
+            root = Path(os.fsdecode(result.stdout.strip()))
+    except OSError, subprocess.TimeoutExpired:
+        pass
+    repo = _maps.get(root)
+    if repo is None:
+        repo = _maps[root] = RepoMap(root)
+    repo.refresh()
+    prefix = os.path.relpath(target, repo.root)
+    if prefix == ".":
+        prefix = ""
+    elif target.is_dir():
+        prefix += "/"
+    # Names that aren't UTF-8 hold surrogates, which can't be sent to the LLM
+    return repo.outline(prefix).encode(errors="surrogateescape").decode(errors="replace")
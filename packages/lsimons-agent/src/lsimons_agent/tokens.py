@@ -0,0 +1,116 @@
+"""Token usage accounting and a fast local token estimator."""
+
+import json
+import math
+import os
+from typing import Any
+
+# Context window of the model in use, for overflow warnings
+CONTEXT_WINDOW = int(os.environ.get("LLM_CONTEXT_WINDOW", "128000"))
+WARN_FRACTION = 0.9  # Warn when a request is estimated above this share of the window
+
+MESSAGE_OVERHEAD = 4  # Role and separators per message
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of text: about four characters per token."""
+    return math.ceil(len(text) / 4)
+
+
+def _tool_call_tokens(message: dict[str, Any]) -> int:
+    tool_calls: list[dict[str, Any]] = message.get("tool_calls") or []
+    return sum(estimate_tokens(json.dumps(call.get("function", {}))) for call in tool_calls)
+
+
+def estimate_request(
+    messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
+) -> int:
+    """Estimate the prompt tokens of a chat request without a tokenizer."""
+    total = 0
+    for message in messages:
+        total += MESSAGE_OVERHEAD + estimate_tokens(str(message.get("content") or ""))
+        total += _tool_call_tokens(message)
+    if tools:
+        total += estimate_tokens(json.dumps(tools))
+    return total
+
+
+class Usage:
+    """Token counts summed over LLM calls (one turn, or a whole session)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0  # Prompt tokens the provider served from its prompt cache
+        self.estimated = False  # Some calls had no usage block and were estimated
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool = False,
+        cached_tokens: int = 0,
+    ) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cached_tokens += cached_tokens
+        self.estimated = self.estimated or estimated
+
+    def merge(self, other: Usage) -> None:
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.estimated = self.estimated or other.estimated
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Usage:
+        """Inverse of to_dict."""
+        usage = cls()
+        usage.calls = int(data.get("calls") or 0)
+        usage.prompt_tokens = int(data.get("prompt_tokens") or 0)
+        usage.completion_tokens = int(data.get("completion_tokens") or 0)
+        usage.cached_tokens = int(data.get("cached_tokens") or 0)
+        usage.estimated = bool(data.get("estimated"))
+        return usage
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cached_tokens": self.cached_tokens,
+            "estimated": self.estimated,
+        }
+
+
+def call_usage(
+    response: dict[str, Any], estimated_prompt: int, message: dict[str, Any]
+) -> tuple[int, int, bool]:
+    """(prompt, completion, estimated) tokens of one chat() response.
+
+    Uses the API's usage block when present, otherwise local estimates.
+    """
+    usage: dict[str, Any] | None = response.get("usage")
+    if usage and "prompt_tokens" in usage:
+        return int(usage["prompt_tokens"]), int(usage.get("completion_tokens") or 0), False
+    completion = estimate_tokens(str(message.get("content") or "")) + _tool_call_tokens(message)
+    return estimated_prompt, completion, True
+
+
+def cached_prompt_tokens(response: dict[str, Any]) -> int:
+    """Prompt tokens of a chat() response that were read from the provider's cache.
+
+    OpenAI-style APIs report prompt_tokens_details.cached_tokens; Anthropic
+    models (also through LiteLLM) report cache_read_input_tokens.
+    """
+    usage: dict[str, Any] = response.get("usage") or {}
+    details: dict[str, Any] = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or usage.get("cache_read_input_tokens") or 0)
@@ -1,9 +1,18 @@
 """Tools for the coding agent."""
 
-import subprocess
+import os
+import tempfile
 from pathlib import Path
 from typing import Any
 
+from lsimons_agent.checkpoints import Turn
+from lsimons_agent.jobs import JobManager, jobs
+from lsimons_agent.patch import apply_patch, current_umask, parse_patch
+from lsimons_agent.repomap import repo_map
+
+FOREGROUND_TIMEOUT = 30  # Seconds a command runs before it becomes a background job
+OUTPUT_CHUNK = 20_000  # Characters returned per job output read
+
 TOOLS: list[dict[str, Any]] = [
     {
         "type": "function",
@@ -51,18 +60,81 @@ TOOLS: list[dict[str, Any]] = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "repo_map",
+            "description": (
+                "Outline of the project: its files with their top-level functions, classes "
+                "and constants. Call this first to find your way around"
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {
+                        "type": "string",
+                        "description": "Limit to this directory or file (default: whole project)",
+                    }
+                },
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "apply_patch",
+            "description": (
+                "Apply a unified diff (--- a/path, +++ b/path, @@ hunks) to one or more "
+                "files in one step. Use /dev/null to create or delete files. Context "
+                "must match the files; either every hunk applies or nothing changes"
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {"patch": {"type": "string", "description": "Unified diff"}},
+                "required": ["patch"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
             "name": "bash",
-            "description": "Execute a shell command",
+            "description": (
+                "Execute a shell command. Commands still running after 30 seconds "
+                "continue as background jobs; use background=true to start one right away"
+            ),
             "parameters": {
                 "type": "object",
-                "properties": {"command": {"type": "string", "description": "Command to execute"}},
+                "properties": {
+                    "command": {"type": "string", "description": "Command to execute"},
+                    "background": {
+                        "type": "boolean",
+                        "description": "Return at once with a job id instead of waiting",
+                    },
+                },
                 "required": ["command"],
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "job",
+            "description": "List background jobs, or check on, read the output of or kill one",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": ["list", "status", "output", "kill"]},
+                    "job_id": {"type": "integer", "description": "Job id (not needed for list)"},
+                    "offset": {
+                        "type": "integer",
+                        "description": "Output offset to read from (default: after the last read)",
+                    },
+                },
+                "required": ["action"],
+            },
+        },
+    },
 ]
 
 
@@ -71,11 +143,28 @@ def read_file(path: str) -> str:
     return Path(path).read_text()
 
 
+def _replace(p: Path, content: str) -> None:
+    """Write a file by replacing it, so hardlinked checkpoint copies stay intact.
+
+    Symlinks are followed: the file they point to is replaced, not the link.
+    """
+    p = p.resolve()
+    fd, temp = tempfile.mkstemp(dir=p.parent, prefix=f".{p.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(temp, p.stat().st_mode & 0o7777 if p.exists() else 0o666 & ~current_umask())
+        os.replace(temp, p)
+    except BaseException:
+        Path(temp).unlink(missing_ok=True)
+        raise
+
+
 def write_file(path: str, content: str) -> str:
     """Write content to file. Creates parent dirs if needed."""
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(content)
+    _replace(p, content)
     return "OK"
 
 
@@ -88,37 +177,94 @@ def edit_file(path: str, old_string: str, new_string: str) -> str:
         raise ValueError(f"String not found in {path}")
     if count > 1:
         raise ValueError(f"String appears {count} times in {path}, must be unique")
-    p.write_text(content.replace(old_string, new_string))
+    _replace(p, content.replace(old_string, new_string))
     return "OK"
 
 
-def bash(command: str) -> str:
-    """Execute shell command and return combined stdout+stderr."""
-    try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        output = result.stdout + result.stderr
-        if result.returncode != 0:
-            output += f"\n[exit code: {result.returncode}]"
-        return output.strip() or "(no output)"
-    except subprocess.TimeoutExpired:
-        return "[timed out after 30s]"
-
-
-def execute(name: str, args: dict[str, str]) -> str:
-    """Execute a tool by name and return the result."""
+def bash(command: str, background: bool | str = False, jobs: JobManager = jobs) -> str:
+    """Execute shell command and return combined stdout+stderr.
+
+    Runs as a job of jobs; if it's still running after FOREGROUND_TIMEOUT seconds (or
+    right away with background) it keeps running and the job id is returned.
+    """
+    j = jobs.start(command)
+    if background in (True, "true"):
+        return f"Started job {j.id}; use the job tool to check on it"
+    if not j.wait(FOREGROUND_TIMEOUT):
+        output = j.read(limit=OUTPUT_CHUNK)[0]
+        return (
+            f"{output}\n[still running after {FOREGROUND_TIMEOUT}s, continuing as job {j.id}: "
+            "use the job tool to read more output or kill it]"
+        ).strip()
+    jobs.forget(j)
+    output = j.read()[0]
+    if j.process.returncode != 0:
+        output += f"\n[exit code: {j.process.returncode}]"
+    return output.strip() or "(no output)"
+
+
+def job(
+    action: str,
+    job_id: int | str | None = None,
+    offset: int | str | None = None,
+    jobs: JobManager = jobs,
+) -> str:
+    """Report on or control background jobs started by bash."""
+    if action == "list":
+        lines = [f"{j.id}: {j.status()}: {j.command}" for j in jobs.list_jobs()]
+        return "\n".join(lines) or "No jobs"
+    if job_id is None:
+        raise ValueError(f"{action} needs a job_id")
+    j = jobs.get(int(job_id))
+    if action == "status":
+        return f"Job {j.id} {j.status()}, {j.total} characters of output: {j.command}"
+    if action == "output":
+        text, start, end = j.read(None if offset is None else int(offset), OUTPUT_CHUNK)
+        more = f", more from offset {end}" if end < j.total else ""
+        return f"{text}\n[output {start}-{end} of {j.total}{more}; job {j.status()}]".strip()
+    if action == "kill":
+        j.kill()
+        return f"Job {j.id} {j.status()}"
+    raise ValueError(f"Unknown job action: {action}")
+
+
+def changed_paths(name: str, args: dict[str, Any]) -> list[str]:
+    """Files a tool call is about to change (bash and jobs can't be known)."""
+    if name in ("write_file", "edit_file"):
+        return [args["path"]]
+    if name == "apply_patch":
+        try:
+            patches = parse_patch(args["patch"])
+        except ValueError:
+            return []
+        return [path for p in patches for path in (p.old_path, p.new_path) if path]
+    return []
+
+
+def execute(
+    name: str, args: dict[str, str], turn: Turn | None = None, jobs: JobManager = jobs
+) -> str:
+    """Execute a tool by name and return the result.
+
+    With a checkpoint turn, files are recorded in it before they change. bash
+    and job work on the conversation's jobs.
+    """
+    if turn is not None:
+        for path in changed_paths(name, args):
+            turn.record(path)
     if name == "read_file":
         return read_file(**args)
     elif name == "write_file":
         return write_file(**args)
     elif name == "edit_file":
         return edit_file(**args)
+    elif name == "repo_map":
+        return repo_map(**args)
+    elif name == "apply_patch":
+        return apply_patch(args["patch"])
     elif name == "bash":
-        return bash(**args)
+        return bash(**args, jobs=jobs)
+    elif name == "job":
+        return job(**args, jobs=jobs)
     else:
         return f"Unknown tool: {name}"
@@ -1,6 +1,15 @@
 """Tests for agent module."""
 
-from lsimons_agent.agent import SYSTEM_PROMPT, format_args, new_conversation
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+from lsimons_agent import agent as agent_module
+from lsimons_agent.agent import SYSTEM_PROMPT, format_args, new_conversation, process_message
+from lsimons_agent.budget import REPEAT_NUDGE, ToolCallCache, TurnBudget
+from lsimons_agent.tools import execute
 
 
 def test_new_conversation():
@@ -42,3 +51,94 @@ def testformat_args_empty():
 def test_system_prompt_content():
     assert "coding assistant" in SYSTEM_PROMPT
     assert "edit_file" in SYSTEM_PROMPT
+
+
+def test_process_message_cancelled_before_llm_call():
+    cancel = threading.Event()
+    cancel.set()
+    messages = new_conversation()
+    events = list(process_message(messages, "hi", cancel=cancel))
+    assert events == [("cancelled", None), ("done", None)]
+    assert messages[-1] == {"role": "user", "content": "hi"}
+
+
+class FakeChat:
+    """Stands in for the LLM: every call asks for the tool call make_call(n) returns."""
+
+    def __init__(self, make_call: Any, prompt_tokens: int = 10):
+        self.make_call = make_call
+        self.prompt_tokens = prompt_tokens
+        self.calls = 0
+
+    def __call__(self, messages: list[dict[str, Any]], tools: Any = None) -> dict[str, Any]:
+        self.calls += 1
+        name, args = self.make_call(self.calls)
+        call = {
+            "id": f"call_{self.calls}",
+            "function": {"name": name, "arguments": json.dumps(args)},
+        }
+        message = {"role": "assistant", "content": "", "tool_calls": [call]}
+        usage = {"prompt_tokens": self.prompt_tokens, "completion_tokens": 10}
+        return {"choices": [{"message": message}], "usage": usage}
+
+
+def run_turn(
+    monkeypatch: pytest.MonkeyPatch, fake: FakeChat, budget: TurnBudget
+) -> tuple[list[tuple[str, Any]], list[dict[str, Any]]]:
+    monkeypatch.setattr(agent_module, "chat", fake)
+    monkeypatch.setenv("LSIMONS_AGENT_CHECKPOINTS", "0")
+    messages = new_conversation()
+    events = list(process_message(messages, "go", budget=budget))
+    assert events[-1] == ("done", None)
+    return events, messages
+
+
+def warnings(events: list[tuple[str, Any]]) -> list[str]:
+    return [data for event, data in events if event == "warning"]
+
+
+def test_process_message_stops_at_max_iterations(monkeypatch: pytest.MonkeyPatch):
+    fake = FakeChat(lambda n: ("read_file", {"path": f"missing-{n}.txt"}))
+    events, _ = run_turn(monkeypatch, fake, TurnBudget(max_iterations=3))
+    assert fake.calls == 3
+    assert warnings(events) == ["Turn stopped: reached 3 LLM calls"]
+
+
+def test_process_message_stops_at_max_tokens(monkeypatch: pytest.MonkeyPatch):
+    fake = FakeChat(lambda n: ("read_file", {"path": f"missing-{n}.txt"}), prompt_tokens=80)
+    events, _ = run_turn(monkeypatch, fake, TurnBudget(max_tokens=100))
+    assert fake.calls == 2
+    assert warnings(events) == ["Turn stopped: used 180 tokens (limit 100)"]
+
+
+def test_process_message_stops_at_max_seconds(monkeypatch: pytest.MonkeyPatch):
+    budget = TurnBudget(max_seconds=5)
+    budget.started -= 10
+    fake = FakeChat(lambda n: ("read_file", {"path": "a.txt"}))
+    events, _ = run_turn(monkeypatch, fake, budget)
+    assert fake.calls == 0
+    assert warnings(events)[0].startswith("Turn stopped: ran for 10s")
+
+
+def test_process_message_reuses_repeated_tool_calls(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    (tmp_path / "a.txt").write_text("contents")
+    executed: list[str] = []
+
+    def counting_execute(name: str, args: dict[str, str], turn: Any, jobs: Any) -> str:
+        executed.append(name)
+        return execute(name, args, turn, jobs)
+
+    monkeypatch.setattr(agent_module, "execute", counting_execute)
+    fake = FakeChat(lambda n: ("read_file", {"path": str(tmp_path / "a.txt")}))
+    events, messages = run_turn(monkeypatch, fake, TurnBudget())
+
+    assert executed == ["read_file"]
+    assert fake.calls == 1 + ToolCallCache.MAX_REPEATS
+    tool_events = [data for event, data in events if event == "tool"]
+    assert [bool(data.get("cached")) for data in tool_events] == [False, True, True, True]
+    results = [m["content"] for m in messages if m["role"] == "tool"]
+    assert results[0] == "contents"
+    assert results[1:] == [REPEAT_NUDGE.format(name="read_file") + "contents"] * 3
+    assert warnings(events) == ["Turn stopped: 3 repeated tool calls"]
@@ -0,0 +1,56 @@
+"""Tests for batch module."""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+from lsimons_agent.batch import load_tasks, run_batch, run_task
+
+
+def test_load_tasks(tmp_path: Path) -> None:
+    path = tmp_path / "tasks.jsonl"
+    path.write_text('{"id": "a", "prompt": "hello"}\n\n{"prompts": ["one", "two"]}\n')
+    tasks = load_tasks(path)
+    assert [task["id"] for task in tasks] == ["a", "3"]
+    assert tasks[0]["prompts"] == ["hello"]
+    assert tasks[1]["prompts"] == ["one", "two"]
+
+
+def test_load_tasks_requires_prompt(tmp_path: Path) -> None:
+    path = tmp_path / "tasks.jsonl"
+    path.write_text('{"id": "a"}\n')
+    try:
+        load_tasks(path)
+        raise AssertionError("Should have raised ValueError")
+    except ValueError as e:
+        assert "no prompt" in str(e)
+
+
+def test_run_batch_reports_failures(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Nothing listens on this port, so every task fails on its first LLM call
+    monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9")
+    output = io.StringIO()
+    tasks = [{"id": "x", "prompts": ["hi"]}, {"id": "y", "prompts": ["hi"]}]
+    failed = run_batch(tasks, workers=2, output=output, workdir=str(tmp_path))
+    assert failed == 2
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(result["id"] for result in results) == ["x", "y"]
+    for result in results:
+        assert result["status"] == "error"
+        assert Path(result["cwd"]).parent == tmp_path.resolve()
+        assert result["transcript"][0] == {"role": "user", "content": "hi"}
+
+
+def test_run_task_sanitizes_id_in_directory_name(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9")
+    monkeypatch.chdir(tmp_path)
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    result = run_task({"id": "../../etc/x y", "prompts": ["hi"]}, str(workdir))
+    assert result["id"] == "../../etc/x y"
+    cwd = Path(result["cwd"])
+    assert cwd.parent == workdir.resolve()
+    assert cwd.name.startswith("task-.._.._etc_x_y-")
@@ -0,0 +1,57 @@
+"""Tests for budget module."""
+
+from lsimons_agent.budget import ToolCallCache, TurnBudget
+from lsimons_agent.jobs import JobManager
+
+
+def test_budget_iterations():
+    budget = TurnBudget(max_iterations=2)
+    assert budget.exceeded(0) is None
+    budget.iterations = 2
+    assert "2 LLM calls" in (budget.exceeded(0) or "")
+
+
+def test_budget_tokens_and_time():
+    assert "tokens" in (TurnBudget(max_tokens=100).exceeded(150) or "")
+    assert TurnBudget(max_tokens=0).exceeded(10**9) is None
+    budget = TurnBudget(max_seconds=10)
+    budget.started -= 11
+    assert "ran for 11s" in (budget.exceeded(0) or "")
+
+
+def test_cache_repeated_read():
+    cache = ToolCallCache()
+    assert cache.lookup("read_file", {"path": "a"}) is None
+    cache.store("read_file", {"path": "a"}, "contents")
+    assert cache.lookup("read_file", {"path": "a"}) == "contents"
+    assert cache.lookup("read_file", {"path": "b"}) is None
+    assert cache.repeats == 1
+
+
+def test_cache_invalidated_by_mutation():
+    cache = ToolCallCache()
+    cache.store("read_file", {"path": "a"}, "old")
+    cache.store("write_file", {"path": "a", "content": "new"}, "OK")
+    assert cache.lookup("read_file", {"path": "a"}) is None
+
+
+def test_cache_catches_consecutive_identical_bash():
+    cache = ToolCallCache()
+    cache.store("bash", {"command": "pytest"}, "1 failed")
+    assert cache.lookup("bash", {"command": "pytest"}) == "1 failed"
+    cache.store("edit_file", {"path": "a", "old_string": "x", "new_string": "y"}, "OK")
+    assert cache.lookup("bash", {"command": "pytest"}) is None
+
+
+def test_cache_off_only_while_own_jobs_run():
+    mine, other = JobManager(), JobManager()
+    cache = ToolCallCache(mine)
+    cache.store("read_file", {"path": "a"}, "contents")
+    try:
+        other.start("sleep 30")
+        assert cache.lookup("read_file", {"path": "a"}) == "contents"
+        mine.start("sleep 30")
+        assert cache.lookup("read_file", {"path": "a"}) is None
+    finally:
+        mine.close()
+        other.close()
@@ -0,0 +1,92 @@
+"""Tests for checkpoints module."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from lsimons_agent import checkpoints as checkpoints_module
+from lsimons_agent.checkpoints import Checkpoints
+from lsimons_agent.tools import execute
+
+
+def test_undo_restores_latest_turn(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("a.txt").write_text("one\n")
+    os.chmod("a.txt", 0o755)
+    checkpoints = Checkpoints(tmp_path)
+
+    first = checkpoints.begin("first")
+    execute("edit_file", {"path": "a.txt", "old_string": "one", "new_string": "two"}, first)
+    second = checkpoints.begin("second")
+    execute("write_file", {"path": "a.txt", "content": "three\n"}, second)
+    execute("write_file", {"path": "new/b.txt", "content": "b\n"}, second)
+    # Only the first change in a turn is recorded
+    execute("write_file", {"path": "a.txt", "content": "four\n"}, second)
+    assert checkpoints.begin("no changes").files == {}
+
+    turn = checkpoints.undo()
+    assert turn is not None and turn["label"] == "second"
+    assert sorted(Path(p).name for p in turn["restored"]) == ["a.txt", "b.txt"]
+    assert Path("a.txt").read_text() == "two\n"
+    assert not Path("new/b.txt").exists()
+
+    turn = checkpoints.undo()
+    assert turn is not None and turn["label"] == "first"
+    assert Path("a.txt").read_text() == "one\n"
+    assert Path("a.txt").stat().st_mode & 0o777 == 0o755
+    assert checkpoints.undo() is None
+    assert (tmp_path / ".lsimons-agent" / ".gitignore").read_text() == "*\n"
+
+
+def test_objects_are_shared_and_pruned(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(checkpoints_module, "MAX_TURNS", 2)
+    checkpoints = Checkpoints(tmp_path)
+    for i in range(4):
+        Path("f.txt").write_text(f"{i}\n")
+        checkpoints.begin(str(i)).record("f.txt")
+    assert [t["label"] for t in checkpoints.list_turns()] == ["2", "3"]
+    assert len(list(checkpoints.objects.glob("*/*"))) == 2
+
+
+def test_concurrent_undos_take_one_turn_each(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("a.txt").write_text("one\n")
+    Checkpoints(tmp_path).begin("t").record("a.txt")
+    # Stray files in the turns directory are ignored
+    (tmp_path / ".lsimons-agent" / "checkpoints" / "turns" / "notes.json").write_text("{}")
+
+    # Separate instances, as each web request makes its own
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: Checkpoints(tmp_path).undo(), range(4)))
+    assert sum(result is not None for result in results) == 1
+
+
+def test_changed_in_place_is_not_restored(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("a.txt").write_text("one\n")
+    checkpoints = Checkpoints(tmp_path)
+    checkpoints.begin("t").record("a.txt")
+    with open("a.txt", "a") as f:  # Appends in place, like `>>` in bash
+        f.write("more\n")
+    turn = checkpoints.undo()
+    assert turn is not None and turn["restored"] == []
+    assert "changed in place" in turn["failed"][str(tmp_path / "a.txt")]
+
+
+def test_symlinks_are_written_through(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("target.md").write_text("old\n")
+    Path("link.md").symlink_to("target.md")
+    checkpoints = Checkpoints(tmp_path)
+
+    turn = checkpoints.begin("t")
+    execute("edit_file", {"path": "link.md", "old_string": "old", "new_string": "new"}, turn)
+    assert Path("link.md").is_symlink()
+    assert Path("target.md").read_text() == "new\n"
+    assert list(turn.files) == [str(tmp_path.resolve() / "target.md")]
+
+    checkpoints.undo()
+    assert Path("link.md").is_symlink()
+    assert Path("target.md").read_text() == "old\n"
@@ -0,0 +1,47 @@
+"""Tests for llm module."""
+
+from lsimons_agent.llm import build_payload, canonical_json, mark_cache_points
+from lsimons_agent.tools import TOOLS
+
+
+def test_canonical_json_ignores_key_order():
+    assert canonical_json({"b": 1, "a": [1, {"d": 2, "c": 3}]}) == canonical_json(
+        {"a": [1, {"c": 3, "d": 2}], "b": 1}
+    )
+    assert canonical_json({"a": "é"}) == '{"a":"é"}'
+
+
+def test_build_payload_prefix_is_stable_across_calls():
+    messages = [
+        {"role": "system", "content": "You are a helper"},
+        {"role": "user", "content": "hi"},
+    ]
+    first = canonical_json(build_payload(messages, TOOLS, "m"))
+    messages.append({"role": "assistant", "content": "hello"})
+    messages.append({"role": "user", "content": "again"})
+    second = canonical_json(build_payload(messages, list(reversed(TOOLS)), "m"))
+    # Everything up to the end of the first call's messages is shared
+    cut = first.index('{"content":"hi"')
+    assert second[:cut] == first[:cut]
+    names = [tool["function"]["name"] for tool in build_payload(messages, TOOLS)["tools"]]
+    assert names == sorted(names)
+
+
+def test_mark_cache_points():
+    messages = [
+        {"role": "system", "content": "prompt"},
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "answer"},
+        {"role": "user", "content": "second"},
+        {"role": "assistant", "content": "", "tool_calls": []},
+        {"role": "tool", "tool_call_id": "1", "content": "result"},
+    ]
+    marked = mark_cache_points(messages)
+    assert marked[0]["content"] == [
+        {"type": "text", "text": "prompt", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert marked[2]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    # The current turn is left as it is, and the input isn't modified
+    assert marked[3:] == messages[3:]
+    assert messages[0]["content"] == "prompt"
+    assert build_payload(messages)["messages"] is messages
@@ -0,0 +1,107 @@
+"""Tests for patch module."""
+
+from pathlib import Path
+
+import pytest
+from lsimons_agent.patch import apply_patch, parse_patch
+
+PATCH = """\
+diff --git a/a.py b/a.py
+--- a/a.py
++++ b/a.py
+@@ -1,4 +1,4 @@
+ def f():
+-    return 1
++    return 2
+
+
+@@ -8,3 +8,4 @@
+ def g():
+     pass
++    # done
+--- /dev/null
++++ b/new/c.txt
+@@ -0,0 +1,2 @@
++hello
++world
+--- a/old.txt
++++ /dev/null
+@@ -1 +0,0 @@
+-bye
+"""
+
+
+def write(path: Path, text: str) -> Path:
+    path.write_text(text)
+    return path
+
+
+def test_parse_patch():
+    files = parse_patch(PATCH)
+    assert [(f.old_path, f.new_path, len(f.hunks)) for f in files] == [
+        ("a.py", "a.py", 2),
+        (None, "new/c.txt", 1),
+        ("old.txt", None, 1),
+    ]
+
+
+def test_apply_patch_multi_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    # Lines shifted by one since the diff was made: applied at an offset
+    write(
+        tmp_path / "a.py", "# header\ndef f():\n    return 1\n\n\nx = 1\n\n\ndef g():\n    pass\n"
+    )
+    write(tmp_path / "old.txt", "bye\n")
+
+    report = apply_patch(PATCH)
+
+    assert (tmp_path / "a.py").read_text() == (
+        "# header\ndef f():\n    return 2\n\n\nx = 1\n\n\ndef g():\n    pass\n    # done\n"
+    )
+    assert (tmp_path / "new" / "c.txt").read_text() == "hello\nworld\n"
+    assert not (tmp_path / "old.txt").exists()
+    assert "a.py: hunk 1 applied at line 2" in report
+    assert "old.txt: deleted" in report
+
+
+def test_apply_patch_fuzzy_context(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / "b.txt", "one  \ntwo\nTHREE\nfour\n")
+    patch = "--- b.txt\n+++ b.txt\n@@ -1,4 +1,4 @@\n one\n-two\n+2\n three\n four\n"
+    report = apply_patch(patch)
+    assert (tmp_path / "b.txt").read_text() == "one  \n2\nTHREE\nfour\n"
+    assert "fuzz" in report
+
+
+def test_apply_patch_all_or_nothing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / "a.txt", "a\nb\n")
+    write(tmp_path / "b.txt", "x\ny\n")
+    patch = (
+        "--- a/a.txt\n+++ b/a.txt\n@@ -1,2 +1,2 @@\n a\n-b\n+B\n"
+        "--- a/b.txt\n+++ b/b.txt\n@@ -1,2 +1,2 @@\n x\n-nope\n+Y\n"
+    )
+    with pytest.raises(ValueError) as info:
+        apply_patch(patch)
+    message = str(info.value)
+    assert "a.txt: hunk 1 applied" in message
+    assert "b.txt: hunk 1 @@ -1,2 +1,2 @@ FAILED" in message
+    assert (tmp_path / "a.txt").read_text() == "a\nb\n"
+    assert (tmp_path / "b.txt").read_text() == "x\ny\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "b.txt"]
+
+
+def test_apply_patch_splits_on_newlines_only(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("f.txt").write_text("a\n\x0cb\nc\u2028d\ne\n")
+    report = apply_patch("--- a/f.txt\n+++ b/f.txt\n@@ -3,2 +3,2 @@\n c\u2028d\n-e\n+E\n")
+    assert Path("f.txt").read_text() == "a\n\x0cb\nc\u2028d\nE\n"
+    assert "applied at line 3 (exact)" in report
+
+
+def test_apply_patch_keeps_crlf_line_endings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("f.txt").write_bytes(b"one\r\ntwo\r\nthree\r\n")
+    report = apply_patch("--- a/f.txt\n+++ b/f.txt\n@@ -1,3 +1,4 @@\n one\n-two\n+2\n+2b\n three\n")
+    assert Path("f.txt").read_bytes() == b"one\r\n2\r\n2b\r\nthree\r\n"
+    assert "(exact)" in report
@@ -0,0 +1,93 @@
+"""Tests for repomap module."""
+
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+from lsimons_agent import repomap as repomap_module
+from lsimons_agent.repomap import RepoMap, file_symbols, list_files, python_symbols, repo_map
+
+
+def test_python_symbols():
+    source = (
+        "import os\n"
+        "LIMIT = 3\n"
+        "def f(a, *args, b=1, **kw): pass\n"
+        "class C(Base):\n"
+        "    def m(self): pass\n"
+        "    async def n(self, x): pass\n"
+    )
+    assert python_symbols(source) == [
+        "LIMIT",
+        "def f(a, *args, b, **kw)",
+        "class C(Base)",
+        "  def m(self)",
+        "  async def n(self, x)",
+    ]
+
+
+def test_file_symbols_fallbacks(tmp_path: Path):
+    js = tmp_path / "app.ts"
+    js.write_text("export function start() {}\nclass Store {}\nconst handler = async () => 1\n")
+    assert file_symbols(js) == ["export function start", "class Store", "const handler"]
+    broken = tmp_path / "broken.py"
+    broken.write_text("def (:\n")
+    assert file_symbols(broken) == []
+    assert file_symbols(tmp_path / "data.bin") == []
+
+
+def test_repo_map_cache_is_incremental(tmp_path: Path):
+    project = tmp_path / "project"
+    (project / "pkg").mkdir(parents=True)
+    (project / "pkg" / "a.py").write_text("def a(): pass\n")
+    (project / "b.py").write_text("def b(): pass\n")
+    cache = tmp_path / "cache"
+
+    repo = RepoMap(project, cache)
+    assert repo.refresh() == 2
+    assert repo.outline() == "b.py\n  def b()\npkg/a.py\n  def a()"
+    assert repo.outline("pkg/") == "pkg/a.py\n  def a()"
+
+    # A new instance (another process) reuses the cache and re-parses only changes
+    (project / "b.py").write_text("def b2(): pass\n")
+    (project / "pkg" / "a.py").unlink()
+    repo = RepoMap(project, cache)
+    assert repo.refresh() == 1
+    assert repo.outline() == "b.py\n  def b2()"
+    assert repo.refresh() == 0
+
+
+def test_repo_map_stops_at_max_files(tmp_path: Path):
+    project = tmp_path / "project"
+    project.mkdir()
+    for i in range(5):
+        (project / f"f{i}.py").write_text(f"X{i} = {i}\n")
+    repo = RepoMap(project, tmp_path / "cache", max_files=3)
+    assert repo.refresh() == 3
+    outline = repo.outline()
+    assert outline.startswith("[Stopped listing after 3 files;")
+    assert "f2.py" in outline and "f3.py" not in outline
+
+
+def test_list_files_handles_non_ascii_names_in_git(tmp_path: Path):
+    project = tmp_path / "project"
+    subprocess.run(["git", "init", "-q", str(project)], check=True)
+    (project / "héllo wörld.py").write_text("def f(): pass\n")
+    assert list_files(project) == ["héllo wörld.py"]
+    repo = RepoMap(project, tmp_path / "cache")
+    repo.refresh()
+    assert "héllo wörld.py\n  def f()" in repo.outline()
+
+
+def test_list_files_handles_non_utf8_names_in_git(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    project = tmp_path / "project"
+    subprocess.run(["git", "init", "-q", str(project)], check=True)
+    name = os.fsdecode(b"latin-\xe9.py")
+    (project / name).write_text("def f(): pass\n")
+    assert list_files(project) == [name]
+    # Keep the cache out of the home directory
+    monkeypatch.setitem(
+        repomap_module._maps, project.resolve(), RepoMap(project.resolve(), tmp_path / "cache")
+    )
+    assert repo_map(str(project)).startswith("latin-\ufffd.py\n  def f()")
@@ -0,0 +1,62 @@
+"""Tests for tokens module."""
+
+from lsimons_agent.tokens import (
+    Usage,
+    cached_prompt_tokens,
+    call_usage,
+    estimate_request,
+    estimate_tokens,
+)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_estimate_request_grows_with_messages():
+    short = estimate_request([{"role": "user", "content": "hi"}])
+    longer = estimate_request([{"role": "user", "content": "hi " * 100}])
+    assert 0 < short < longer
+
+
+def test_call_usage_prefers_api_usage():
+    response = {"usage": {"prompt_tokens": 120, "completion_tokens": 7}}
+    assert call_usage(response, 100, {"content": "hello"}) == (120, 7, False)
+
+
+def test_call_usage_estimates_without_usage_block():
+    prompt, completion, estimated = call_usage({}, 100, {"content": "a" * 40})
+    assert (prompt, completion, estimated) == (100, 10, True)
+
+
+def test_cached_prompt_tokens():
+    openai = {"usage": {"prompt_tokens": 900, "prompt_tokens_details": {"cached_tokens": 768}}}
+    anthropic = {"usage": {"prompt_tokens": 900, "cache_read_input_tokens": 512}}
+    assert cached_prompt_tokens(openai) == 768
+    assert cached_prompt_tokens(anthropic) == 512
+    assert cached_prompt_tokens({"usage": {"prompt_tokens": 900}}) == 0
+    assert cached_prompt_tokens({}) == 0
+
+
+def test_usage_merge():
+    session = Usage()
+    turn = Usage()
+    turn.add(100, 10, cached_tokens=80)
+    turn.add(150, 5, estimated=True)
+    session.merge(turn)
+    assert session.to_dict() == {
+        "calls": 2,
+        "prompt_tokens": 250,
+        "completion_tokens": 15,
+        "total_tokens": 265,
+        "cached_tokens": 80,
+        "estimated": True,
+    }
+
+
+def test_usage_from_dict_round_trip():
+    usage = Usage()
+    usage.add(100, 20, estimated=True)
+    assert Usage.from_dict(usage.to_dict()).to_dict() == usage.to_dict()
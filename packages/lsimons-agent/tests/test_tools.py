@@ -1,9 +1,14 @@
 """Tests for tools module."""
 
+import re
 import tempfile
+import time
 from pathlib import Path
 
-from lsimons_agent.tools import bash, edit_file, execute, read_file, write_file
+import lsimons_agent.tools as tools_module
+import pytest
+from lsimons_agent.jobs import MAX_FINISHED, JobManager, jobs
+from lsimons_agent.tools import bash, edit_file, execute, job, read_file, write_file
 
 
 def test_read_file():
@@ -115,3 +120,64 @@ def test_execute_bash():
 def test_execute_unknown_tool():
     result = execute("unknown_tool", {})
     assert "Unknown tool" in result
+
+
+def job_id(result: str) -> int:
+    match = re.search(r"job (\d+)", result)
+    assert match is not None, result
+    return int(match.group(1))
+
+
+def test_bash_background_job_output_and_status():
+    started = bash("echo one; sleep 0.2; echo two", background=True)
+    j = jobs.get(job_id(started))
+    assert j.wait(5)
+    assert "exited with code 0" in job("status", j.id)
+    first = job("output", j.id)
+    assert first.startswith("one\ntwo") and "[output 0-8 of 8" in first
+    # Reads continue where the last one stopped, or from an explicit offset
+    assert job("output", j.id).startswith("[output 8-8 of 8")
+    assert job("output", j.id, offset=4).startswith("two")
+    assert str(j.id) in job("list")
+
+
+def test_bash_foreground_timeout_becomes_job(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(tools_module, "FOREGROUND_TIMEOUT", 0.2)
+    result = bash("echo started; sleep 30")
+    assert result.startswith("started") and "still running" in result
+    j = jobs.get(job_id(result.splitlines()[-1]))
+    assert j.running
+    start = time.monotonic()
+    assert "killed" in execute("job", {"action": "kill", "job_id": str(j.id)})
+    assert time.monotonic() - start < 5
+
+
+def test_jobs_are_scoped_to_their_manager():
+    mine, other = JobManager(), JobManager()
+    try:
+        started = execute("bash", {"command": "sleep 30", "background": "true"}, jobs=mine)
+        assert str(job_id(started)) in job("list", jobs=mine)
+        assert job("list", jobs=other) == "No jobs"
+        with pytest.raises(ValueError):
+            job("kill", job_id(started), jobs=other)
+    finally:
+        mine.close()
+        other.close()
+    assert mine.list_jobs() == []
+
+
+def test_finished_jobs_are_capped():
+    manager = JobManager()
+    for _ in range(MAX_FINISHED + 3):
+        assert manager.start("true").wait(5)
+    try:
+        running = manager.start("sleep 30")
+        assert len(manager.list_jobs()) == MAX_FINISHED + 1
+        assert running in manager.list_jobs()
+    finally:
+        manager.close()
+
+
+def test_job_unknown_id():
+    with pytest.raises(ValueError):
+        job("status", 99999)
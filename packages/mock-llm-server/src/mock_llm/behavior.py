@@ -0,0 +1,111 @@
+"""Simulated model behaviour: latency, streaming speed, errors and usage."""
+
+import json
+import math
+import re
+import threading
+from random import Random
+from typing import Any
+
+# Words with their trailing whitespace stand in for tokens when streaming
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+def split_tokens(text: str) -> list[str]:
+    """Split text into token-sized pieces that join back to the original."""
+    return _TOKEN.findall(text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    """Rough token count of a request's messages."""
+    return sum(estimate_tokens(json.dumps(message)) for message in messages)
+
+
+class Behavior:
+    """Knobs for how the mock answers, from a "settings" block.
+
+    Settings (all optional):
+    - ttft: seconds before the first token, either a number or a distribution
+      {"dist": "uniform", "min", "max"}, {"dist": "normal", "mean", "stddev"}
+      or {"dist": "lognormal", "median", "sigma"}
+    - tokens_per_second: streaming speed; 0 sends everything at once
+    - error_rates: {"429": 0.05, "500": 0.01, ...} chance of failing with that status
+    - usage: include a synthetic "usage" block
+    - seed: seed for the random choices, for repeatable runs (global only)
+
+    Scenario settings override the global ones key by key.
+    """
+
+    def __init__(self, settings: dict[str, Any], rng: Random, lock: threading.Lock):
+        self.ttft: float | dict[str, Any] = settings.get("ttft", 0)
+        self.tokens_per_second = float(settings.get("tokens_per_second", 0))
+        self.error_rates: dict[str, float] = settings.get("error_rates", {})
+        self.usage = bool(settings.get("usage", False))
+        self._rng = rng
+        self._lock = lock
+
+    def first_token_delay(self) -> float:
+        """Sample the time to first token."""
+        spec = self.ttft
+        if not isinstance(spec, dict):
+            return max(0.0, float(spec))
+        dist: str = spec.get("dist", "fixed")
+        with self._lock:
+            if dist == "uniform":
+                value = self._rng.uniform(spec.get("min", 0), spec.get("max", 0))
+            elif dist == "normal":
+                value = self._rng.gauss(spec.get("mean", 0), spec.get("stddev", 0))
+            elif dist == "lognormal":
+                value = spec.get("median", 0) * math.exp(self._rng.gauss(0, spec.get("sigma", 0)))
+            else:
+                value = float(spec.get("value", 0))
+        return max(0.0, value)
+
+    def token_delay(self) -> float:
+        """Seconds between streamed tokens."""
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def injected_error(self) -> int | None:
+        """Status code to fail this request with, if the dice say so."""
+        if not self.error_rates:
+            return None
+        with self._lock:
+            roll = self._rng.random()
+        for status, rate in sorted(self.error_rates.items()):
+            if roll < rate:
+                return int(status)
+            roll -= rate
+        return None
+
+
+class BehaviorSettings:
+    """Global settings plus the shared random generator, rebuilt on reload."""
+
+    def __init__(self, settings: dict[str, Any]):
+        self.settings = settings
+        self._rng = Random(settings.get("seed"))
+        self._lock = threading.Lock()
+
+    def for_scenario(self, scenario: dict[str, Any] | None) -> Behavior:
+        """Behaviour for a scenario, with its overrides applied."""
+        settings = self.settings
+        if scenario is not None and scenario.get("settings"):
+            settings = {**settings, **scenario["settings"]}
+        return Behavior(settings, self._rng, self._lock)
+
+
+def error_body(status: int) -> dict[str, Any]:
+    """OpenAI-style error body for an injected failure."""
+    error_type = "rate_limit_error" if status == 429 else "server_error"
+    return {
+        "error": {
+            "message": f"Injected {status} from mock server",
+            "type": error_type,
+            "code": status,
+        }
+    }
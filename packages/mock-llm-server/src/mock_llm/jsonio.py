@@ -0,0 +1,34 @@
+"""JSON encoding and decoding, using orjson when it is installed."""
+
+import json
+from typing import Any, cast
+
+from fastapi import Response
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON."""
+    if orjson is not None:
+        return cast(bytes, orjson.dumps(value))  # type: ignore
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(data: bytes) -> Any:
+    """Decode JSON."""
+    if orjson is not None:
+        return orjson.loads(data)  # type: ignore
+    return json.loads(data)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered directly, without FastAPI's jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,65 @@
+"""Aho-Corasick matcher for finding scenario triggers in user messages."""
+
+from collections import deque
+
+
+class TriggerMatcher:
+    """Finds which of many trigger strings occur in a text, in one pass.
+
+    The automaton is built once per scenario library; matching costs time
+    proportional to the text length, however many triggers there are. An
+    empty trigger occurs in every text, as with a plain substring test.
+    """
+
+    def __init__(self, triggers: list[str]):
+        # Trie nodes: goto transitions, failure link, and ids of triggers ending here
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        self._empty: int | None = None  # Lowest id of an empty trigger
+        for trigger_id, trigger in enumerate(triggers):
+            if trigger:
+                self._add(trigger, trigger_id)
+            elif self._empty is None:
+                self._empty = trigger_id
+        self._build()
+
+    def _add(self, trigger: str, trigger_id: int) -> None:
+        node = 0
+        for char in trigger:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+        self._out[node].append(trigger_id)
+
+    def _build(self) -> None:
+        """Compute failure links breadth-first, merging outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def first_match(self, text: str) -> int | None:
+        """Return the lowest id of the triggers occurring in text, or None."""
+        best = self._empty
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for trigger_id in self._out[node]:
+                if best is None or trigger_id < best:
+                    best = trigger_id
+        return best
@@ -0,0 +1,137 @@
+"""Record real LLM exchanges and replay them by request fingerprint."""
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_text(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def _normalize_arguments(arguments: Any) -> Any:
+    """Tool call arguments as parsed JSON, so formatting differences don't matter."""
+    if isinstance(arguments, str):
+        try:
+            return json.loads(arguments)
+        except ValueError:
+            return _normalize_text(arguments)
+    return arguments
+
+
+def normalize_request(request: dict[str, Any]) -> dict[str, Any]:
+    """The parts of a request that decide the answer.
+
+    Keeps roles, whitespace-collapsed content and tool calls (by name and
+    parsed arguments) plus the offered tool names. Drops tool call ids (they
+    are random per run), sampling and streaming options, and the model name.
+    """
+    messages: list[dict[str, Any]] = []
+    for message in request.get("messages", []):
+        normalized: dict[str, Any] = {
+            "role": message.get("role"),
+            "content": _normalize_text(message.get("content")),
+        }
+        tool_calls: list[dict[str, Any]] = message.get("tool_calls") or []
+        if tool_calls:
+            normalized["tool_calls"] = [
+                {
+                    "name": call.get("function", {}).get("name"),
+                    "arguments": _normalize_arguments(call.get("function", {}).get("arguments")),
+                }
+                for call in tool_calls
+            ]
+        messages.append(normalized)
+    tools: list[dict[str, Any]] = request.get("tools") or []
+    return {
+        "messages": messages,
+        "tools": sorted(str(tool.get("function", {}).get("name")) for tool in tools),
+    }
+
+
+def fingerprint(request: dict[str, Any]) -> str:
+    """Stable hash of a normalized request."""
+    canonical = json.dumps(normalize_request(request), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:24]
+
+
+class RecordingStore:
+    """Directory of recorded exchanges, one <fingerprint>.json file each.
+
+    Files are loaded lazily: a lookup that isn't in memory yet reads just the
+    file named by the request's fingerprint, so recordings added while
+    replaying are picked up without rescanning the directory.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._responses: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def save(self, request: dict[str, Any], response: dict[str, Any]) -> Path:
+        """Write one request/response pair (blocking; call it off the event loop)."""
+        key = fingerprint(request)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{key}.json"
+        record = {"fingerprint": key, "request": request, "response": response}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, indent=2) + "\n")
+        tmp.replace(path)
+        with self._lock:
+            self._responses[key] = response
+        return path
+
+    def _load(self, key: str) -> dict[str, Any] | None:
+        path = self.directory / f"{key}.json"
+        try:
+            record: dict[str, Any] = json.loads(path.read_text())
+            response: dict[str, Any] = record["response"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Skipping recording %s: %s", path, e)
+            return None
+        with self._lock:
+            self._responses[key] = response
+        return response
+
+    def lookup(self, request: dict[str, Any]) -> dict[str, Any] | None:
+        """The recorded response for a request, or None."""
+        key = fingerprint(request)
+        with self._lock:
+            response = self._responses.get(key)
+        if response is None:
+            response = self._load(key)
+        return response
+
+
+class UpstreamProxy:
+    """Forwards completion requests to a real OpenAI-compatible endpoint."""
+
+    def __init__(self, base_url: str, auth_token: str = "", timeout: float = 120.0):
+        headers = {"Authorization": f"Bearer {auth_token}"} if auth_token else {}
+        self._http = httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout)
+
+    async def complete(self, request: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        """Send a (non-streaming) request upstream; returns (status, body)."""
+        payload = {k: v for k, v in request.items() if k not in ("stream", "stream_options")}
+        try:
+            response = await self._http.post("/chat/completions", json=payload)
+        except httpx.RequestError as e:
+            # Unreachable or timed out: answer like a gateway would
+            error = {"message": f"Upstream request failed: {e!r}", "type": "server_error"}
+            return 502, {"error": {**error, "code": 502}}
+        try:
+            body: dict[str, Any] = response.json()
+        except ValueError:
+            body = {"error": {"message": response.text, "code": response.status_code}}
+        return response.status_code, body
@@ -1,44 +1,179 @@
 """Mock LLM server that returns canned responses."""
 
+import argparse
+import asyncio
 import json
+import logging
+import os
+import threading
+import time
 import uuid
+from collections.abc import AsyncGenerator
 from pathlib import Path
-from typing import Any
+from typing import Any, cast
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
 
-app = FastAPI()
+from mock_llm.behavior import (
+    Behavior,
+    BehaviorSettings,
+    error_body,
+    estimate_tokens,
+    prompt_tokens,
+    split_tokens,
+)
+from mock_llm.jsonio import FastJSONResponse, dumps, loads
+from mock_llm.matcher import TriggerMatcher
+from mock_llm.recorder import RecordingStore, UpstreamProxy, fingerprint
+from mock_llm.stats import Stats
 
-# Load scenarios from file
-SCENARIOS_PATH = Path(__file__).parent.parent.parent / "scenarios.json"
-with open(SCENARIOS_PATH) as f:
-    SCENARIOS: dict[str, Any] = json.load(f)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# Scenarios file, or a directory of *.json scenario files (merged in name order)
+SCENARIOS_PATH = Path(
+    os.environ.get("MOCK_LLM_SCENARIOS") or Path(__file__).parent.parent.parent / "scenarios.json"
+)
+
+# "scenarios" (default), "record" (proxy to MOCK_LLM_UPSTREAM and save each
+# exchange) or "replay" (answer from the saved exchanges)
+MODE = os.environ.get("MOCK_LLM_MODE", "scenarios")
+RECORDINGS_DIR = Path(os.environ.get("MOCK_LLM_RECORDINGS", "recordings"))
+
+
+class ScenarioLibrary:
+    """Scenarios with a precompiled trigger matcher, reloaded when the files change.
+
+    Edits are picked up without a restart: at most every RELOAD_INTERVAL
+    seconds a request checks the files' mtimes and rebuilds the matcher if
+    anything changed. A file that fails to load keeps the previous scenarios.
+    """
+
+    RELOAD_INTERVAL = 1.0
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._signature: list[tuple[str, int]] = []
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        # Swapped as a whole on reload, so requests never see a half-built library
+        self._state: tuple[
+            list[dict[str, Any]], TriggerMatcher, dict[str, Any], BehaviorSettings
+        ] = ([], TriggerMatcher([]), {"content": ""}, BehaviorSettings({}))
+        self.reload()
+
+    def _files(self) -> list[Path]:
+        if self.path.is_dir():
+            return sorted(self.path.glob("*.json"))
+        return [self.path]
+
+    def _current_signature(self) -> list[tuple[str, int]]:
+        signature: list[tuple[str, int]] = []
+        for file in self._files():
+            try:
+                signature.append((str(file), file.stat().st_mtime_ns))
+            except OSError:
+                continue
+        return signature
+
+    def reload(self) -> None:
+        """Load all scenario files and rebuild the matcher."""
+        signature = self._current_signature()
+        scenarios: list[dict[str, Any]] = []
+        default_response: dict[str, Any] = {"content": ""}
+        settings: dict[str, Any] = {}
+        for file, _ in signature:
+            with open(file) as f:
+                data: dict[str, Any] = json.load(f)
+            scenarios.extend(data.get("scenarios", []))
+            default_response = data.get("default_response", default_response)
+            settings.update(data.get("settings", {}))
+        matcher = TriggerMatcher([str(scenario["trigger"]) for scenario in scenarios])
+        self._state = (scenarios, matcher, default_response, BehaviorSettings(settings))
+        self._signature = signature
+
+    def reload_due(self) -> bool:
+        """Whether check_reload would look at the files now (cheap, no I/O)."""
+        return time.monotonic() - self._checked >= self.RELOAD_INTERVAL
+
+    def check_reload(self) -> None:
+        """Reload if the scenario files changed (checked at most every RELOAD_INTERVAL).
+
+        Stats the files and may rebuild the matcher: call it off the event loop.
+        """
+        now = time.monotonic()
+        if now - self._checked < self.RELOAD_INTERVAL:
+            return
+        with self._lock:
+            if now - self._checked < self.RELOAD_INTERVAL:
+                return
+            self._checked = now
+            if self._current_signature() == self._signature:
+                return
+            try:
+                self.reload()
+                logger.info("Reloaded scenarios from %s", self.path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Keeping previous scenarios, failed to reload %s: %s", self.path, e)
+
+    def find(self, user_message: str) -> dict[str, Any] | None:
+        """First scenario (in file order) whose trigger occurs in the message."""
+        scenarios, matcher, _, _ = self._state
+        index = matcher.first_match(user_message.lower())
+        return scenarios[index] if index is not None else None
+
+    @property
+    def default_response(self) -> dict[str, Any]:
+        return self._state[2]
+
+    def behavior(self, scenario: dict[str, Any] | None) -> Behavior:
+        """Latency, streaming and error settings for a scenario (or the default response)."""
+        return self._state[3].for_scenario(scenario)
+
+
+scenarios = ScenarioLibrary(SCENARIOS_PATH)
+recordings = RecordingStore(RECORDINGS_DIR)
+stats = Stats()
+upstream = UpstreamProxy(
+    os.environ.get("MOCK_LLM_UPSTREAM", "https://api.openai.com/v1"),
+    os.environ.get("MOCK_LLM_UPSTREAM_TOKEN", ""),
+)
 
 
 def find_scenario(user_message: str) -> dict[str, Any] | None:
     """Find a scenario matching the user message."""
-    user_lower = user_message.lower()
-    for scenario in SCENARIOS["scenarios"]:
-        if scenario["trigger"] in user_lower:
-            result: dict[str, Any] = scenario
-            return result
-    return None
+    return scenarios.find(user_message)
+
 
+def scan_messages(messages: list[dict[str, Any]]) -> tuple[str, int]:
+    """Return the last user message and the number of tool results after it.
 
-def get_step_index(messages: list[dict[str, Any]]) -> int:
-    """Count tool result messages to determine current step."""
-    return sum(1 for m in messages if m.get("role") == "tool")
+    One pass backwards from the end, stopping at the last user message, so the
+    cost depends on the current turn rather than the conversation length.
+    """
+    step_index = 0
+    for msg in reversed(messages):
+        role = msg.get("role")
+        if role == "tool":
+            step_index += 1
+        elif role == "user" and msg.get("content"):
+            return str(msg["content"]), step_index
+    return "", step_index
 
 
 def build_response(
-    content: str | None, tool_calls: list[dict[str, Any]] | None = None
+    content: str | None,
+    tool_calls: list[dict[str, Any]] | None = None,
+    usage: dict[str, int] | None = None,
 ) -> dict[str, Any]:
     """Build OpenAI-format response."""
     message: dict[str, Any] = {"role": "assistant", "content": content}
     if tool_calls:
         message["tool_calls"] = tool_calls
 
-    return {
+    response: dict[str, Any] = {
         "id": f"mock-{uuid.uuid4().hex[:8]}",
         "object": "chat.completion",
         "model": "mock-model",
@@ -50,51 +185,241 @@ def build_response(
             }
         ],
     }
+    if usage is not None:
+        response["usage"] = usage
+    return response
 
 
-@app.post("/chat/completions")
-def chat_completions(request: dict[str, Any]) -> dict[str, Any]:
-    """Handle chat completion requests."""
-    messages: list[dict[str, Any]] = request.get("messages", [])
+def build_usage(
+    messages: list[dict[str, Any]], content: str | None, tool_calls: list[dict[str, Any]] | None
+) -> dict[str, int]:
+    """Synthetic token usage for a response."""
+    completion = estimate_tokens(content or "")
+    for call in tool_calls or []:
+        completion += estimate_tokens(json.dumps(call["function"]))
+    prompt = prompt_tokens(messages)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+    }
 
-    # Get last user message
-    last_user_message = ""
-    for msg in reversed(messages):
-        if msg.get("role") == "user" and msg.get("content"):
-            last_user_message = str(msg["content"])
-            break
 
-    # Find matching scenario
-    scenario = find_scenario(last_user_message)
+def pick_response(
+    scenario: dict[str, Any] | None, step_index: int
+) -> tuple[str | None, list[dict[str, Any]] | None]:
+    """Content and tool calls for the current step of a scenario."""
     if not scenario:
-        return build_response(str(SCENARIOS["default_response"]["content"]))
+        return str(scenarios.default_response.get("content", "")), None
 
-    # Determine step based on tool result count
-    step_index = get_step_index(messages)
     steps: list[dict[str, Any]] = scenario["steps"]
     if step_index >= len(steps):
-        return build_response("Scenario complete.")
+        return "Scenario complete.", None
 
     step: dict[str, Any] = steps[step_index]
     response: dict[str, Any] = step["response"]
-    return build_response(
-        response.get("content"),
-        response.get("tool_calls"),
+    return response.get("content"), response.get("tool_calls")
+
+
+async def _sleep(seconds: float) -> None:
+    if seconds > 0:
+        await asyncio.sleep(seconds)
+
+
+async def stream_response(
+    content: str | None,
+    tool_calls: list[dict[str, Any]] | None,
+    usage: dict[str, int] | None,
+    behavior: Behavior,
+) -> AsyncGenerator[str]:
+    """Stream a response as OpenAI-format SSE chunks, paced like a model."""
+    response_id = f"mock-{uuid.uuid4().hex[:8]}"
+    delay = behavior.token_delay()
+
+    def chunk(delta: dict[str, Any], finish_reason: str | None = None) -> str:
+        data: dict[str, Any] = {
+            "id": response_id,
+            "object": "chat.completion.chunk",
+            "model": "mock-model",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {dumps(data).decode()}\n\n"
+
+    await _sleep(behavior.first_token_delay())
+    yield chunk({"role": "assistant", "content": ""})
+    for token in split_tokens(content or ""):
+        yield chunk({"content": token})
+        await _sleep(delay)
+    for index, call in enumerate(tool_calls or []):
+        function: dict[str, Any] = call["function"]
+        yield chunk(
+            {
+                "tool_calls": [
+                    {
+                        "index": index,
+                        "id": call.get("id"),
+                        "type": "function",
+                        "function": {"name": function["name"], "arguments": ""},
+                    }
+                ]
+            }
+        )
+        for piece in split_tokens(str(function.get("arguments", ""))):
+            yield chunk({"tool_calls": [{"index": index, "function": {"arguments": piece}}]})
+            await _sleep(delay)
+    yield chunk({}, "tool_calls" if tool_calls else "stop")
+    if usage is not None:
+        data: dict[str, Any] = {
+            "id": response_id,
+            "object": "chat.completion.chunk",
+            "model": "mock-model",
+            "choices": [],
+            "usage": usage,
+        }
+        yield f"data: {dumps(data).decode()}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def recorded_reply(request: dict[str, Any], response: dict[str, Any]) -> Response:
+    """Send a recorded (or just proxied) response, streaming it if asked to."""
+    if not request.get("stream"):
+        return FastJSONResponse(response)
+    message: dict[str, Any] = response.get("choices", [{}])[0].get("message", {})
+    return StreamingResponse(
+        stream_response(
+            message.get("content"),
+            message.get("tool_calls"),
+            response.get("usage"),
+            scenarios.behavior(None),
+        ),
+        media_type="text/event-stream",
     )
 
 
+async def record_completion(request: dict[str, Any]) -> Response:
+    """Proxy a request upstream and save the exchange for replay."""
+    status, body = await upstream.complete(request)
+    stats.record("record", status)
+    if status != 200:
+        return FastJSONResponse(body, status_code=status)
+    await asyncio.to_thread(recordings.save, request, body)
+    return recorded_reply(request, body)
+
+
+async def replay_completion(request: dict[str, Any]) -> Response:
+    """Answer from a recorded exchange with the same fingerprint."""
+    # Reading and decoding the recording would stall every stream in flight
+    response = await asyncio.to_thread(recordings.lookup, request)
+    stats.record("replay", 200 if response is not None else 404)
+    if response is None:
+        error = {
+            "error": {
+                "message": f"No recording for request fingerprint {fingerprint(request)}",
+                "type": "invalid_request_error",
+                "code": 404,
+            }
+        }
+        return FastJSONResponse(error, status_code=404)
+    return recorded_reply(request, response)
+
+
+def invalid_request(message: str) -> Response:
+    """OpenAI-style 400 error."""
+    stats.record("invalid", 400)
+    error = {"error": {"message": message, "type": "invalid_request_error", "code": 400}}
+    return FastJSONResponse(error, status_code=400)
+
+
+@app.post("/chat/completions")
+async def chat_completions(http_request: Request) -> Response:
+    """Handle chat completion requests."""
+    # Decoded directly rather than validated into a model: bodies grow with the conversation
+    try:
+        body: Any = loads(await http_request.body())
+    except ValueError as e:
+        return invalid_request(f"Request body is not valid JSON: {e}")
+    if not isinstance(body, dict):
+        return invalid_request("Request body must be a JSON object")
+    request = cast(dict[str, Any], body)
+    messages: list[dict[str, Any]] = request.get("messages", [])
+    if scenarios.reload_due():
+        # File checks and rebuilds would stall every stream in flight
+        await asyncio.to_thread(scenarios.check_reload)
+    if MODE == "record":
+        return await record_completion(request)
+    if MODE == "replay":
+        return await replay_completion(request)
+
+    # Last user message, and how far into its scenario we are
+    last_user_message, step_index = scan_messages(messages)
+
+    # Find matching scenario
+    scenario = find_scenario(last_user_message)
+    behavior = scenarios.behavior(scenario)
+    name = str(scenario.get("name", "unnamed")) if scenario else "default"
+
+    # Fault injection: fail fast, like an overloaded or rate-limiting API
+    status = behavior.injected_error()
+    stats.record(name, status or 200)
+    if status is not None:
+        headers = {"Retry-After": "1"} if status == 429 else None
+        return FastJSONResponse(error_body(status), status_code=status, headers=headers)
+
+    content, tool_calls = pick_response(scenario, step_index)
+    stream_options: dict[str, Any] = request.get("stream_options") or {}
+    usage = None
+    if behavior.usage or (request.get("stream") and stream_options.get("include_usage")):
+        usage = build_usage(messages, content, tool_calls)
+
+    if request.get("stream"):
+        return StreamingResponse(
+            stream_response(content, tool_calls, usage, behavior),
+            media_type="text/event-stream",
+        )
+
+    # Without streaming the whole answer arrives after it has been "generated"
+    tokens = len(split_tokens(content or ""))
+    for call in tool_calls or []:
+        tokens += len(split_tokens(str(call["function"].get("arguments", ""))))
+    await _sleep(behavior.first_token_delay() + tokens * behavior.token_delay())
+    return FastJSONResponse(build_response(content, tool_calls, usage))
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
     """Health check endpoint."""
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def get_stats() -> dict[str, Any]:
+    """Request rate and scenario hit counts (of the worker answering)."""
+    return stats.to_dict()
+
+
 def main() -> None:
     """Run the mock server."""
     import uvicorn
 
-    print("Starting mock LLM server on http://localhost:8000")
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+    print(f"Starting mock LLM server on http://{args.host}:{args.port} ({MODE} mode)")
+    if args.workers > 1:
+        # Workers import the app themselves, so it has to be passed by name
+        uvicorn.run(
+            "mock_llm.server:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            access_log=False,
+        )
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
 
 
 if __name__ == "__main__":
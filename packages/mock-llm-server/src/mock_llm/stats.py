@@ -0,0 +1,53 @@
+"""Request counters for the mock server's /stats endpoint."""
+
+import os
+import threading
+import time
+from typing import Any
+
+
+class Stats:
+    """Counts requests per second and per scenario.
+
+    Counters are per worker process; with several workers each /stats
+    request reports the worker that happened to answer it (see "pid").
+    """
+
+    WINDOW = 10  # Seconds averaged for the current request rate
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.hits: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self._buckets: dict[int, int] = {}  # whole second -> requests
+        self._lock = threading.Lock()
+
+    def record(self, scenario: str, status: int = 200) -> None:
+        """Count one answered request."""
+        second = int(time.monotonic())
+        with self._lock:
+            self.requests += 1
+            self.hits[scenario] = self.hits.get(scenario, 0) + 1
+            if status != 200:
+                self.errors[str(status)] = self.errors.get(str(status), 0) + 1
+            self._buckets[second] = self._buckets.get(second, 0) + 1
+            if len(self._buckets) > self.WINDOW * 2:
+                for old in [s for s in self._buckets if s < second - self.WINDOW]:
+                    del self._buckets[old]
+
+    def to_dict(self) -> dict[str, Any]:
+        now = int(time.monotonic())
+        uptime = time.time() - self.started
+        with self._lock:
+            # Completed seconds only, so a fresh second doesn't drag the rate down
+            recent = sum(n for s, n in self._buckets.items() if now - self.WINDOW <= s < now)
+            return {
+                "pid": os.getpid(),
+                "uptime": uptime,
+                "requests": self.requests,
+                "requests_per_second": recent / self.WINDOW,
+                "average_requests_per_second": self.requests / uptime if uptime else 0.0,
+                "scenario_hits": dict(self.hits),
+                "errors": dict(self.errors),
+            }
@@ -0,0 +1,101 @@
+"""Tests for behavior module."""
+
+import asyncio
+import json
+from typing import Any
+
+from mock_llm.behavior import BehaviorSettings, error_body, split_tokens
+from mock_llm.server import stream_response
+
+
+def test_split_tokens_joins_back():
+    text = "Hello,  world!\nNext line "
+    assert split_tokens(text) == ["Hello,  ", "world!\n", "Next ", "line "]
+    assert "".join(split_tokens(text)) == text
+    assert split_tokens("") == []
+
+
+def test_latency_is_repeatable_with_a_seed():
+    settings = {"ttft": {"dist": "uniform", "min": 0.1, "max": 0.5}, "seed": 7}
+    first = BehaviorSettings(settings).for_scenario(None)
+    second = BehaviorSettings(settings).for_scenario(None)
+    samples = [first.first_token_delay() for _ in range(20)]
+    assert samples == [second.first_token_delay() for _ in range(20)]
+    assert all(0.1 <= s <= 0.5 for s in samples)
+    assert len(set(samples)) == 20
+
+
+def test_latency_distributions():
+    for ttft in (
+        {"dist": "normal", "mean": 0.2, "stddev": 0.05},
+        {"dist": "lognormal", "median": 0.2, "sigma": 0.5},
+    ):
+        behavior = BehaviorSettings({"ttft": ttft, "seed": 1}).for_scenario(None)
+        samples = [behavior.first_token_delay() for _ in range(1000)]
+        assert min(samples) >= 0
+        assert 0.15 < sorted(samples)[500] < 0.25  # Median
+    fixed = BehaviorSettings({"ttft": 0.3}).for_scenario(None)
+    assert fixed.first_token_delay() == 0.3
+    assert BehaviorSettings({"ttft": -1}).for_scenario(None).first_token_delay() == 0
+    assert BehaviorSettings({"tokens_per_second": 50}).for_scenario(None).token_delay() == 0.02
+    assert fixed.token_delay() == 0
+
+
+def test_injected_errors_follow_rates():
+    settings = BehaviorSettings({"error_rates": {"429": 0.2, "500": 0.1}, "seed": 3})
+    behavior = settings.for_scenario(None)
+    results = [behavior.injected_error() for _ in range(10_000)]
+    assert 1800 < results.count(429) < 2200
+    assert 800 < results.count(500) < 1200
+    assert set(results) == {None, 429, 500}
+    again = BehaviorSettings({"error_rates": {"429": 0.2, "500": 0.1}, "seed": 3})
+    assert [again.for_scenario(None).injected_error() for _ in range(100)] == results[:100]
+    assert BehaviorSettings({}).for_scenario(None).injected_error() is None
+    assert error_body(429)["error"]["type"] == "rate_limit_error"
+
+
+def test_scenario_settings_override_globals():
+    settings = BehaviorSettings({"tokens_per_second": 10, "usage": True})
+    behavior = settings.for_scenario({"settings": {"tokens_per_second": 100}})
+    assert behavior.token_delay() == 0.01
+    assert behavior.usage
+
+
+def collect(
+    content: str | None, tool_calls: list[dict[str, Any]] | None, usage: bool
+) -> list[dict[str, Any]]:
+    async def run() -> list[str]:
+        behavior = BehaviorSettings({}).for_scenario(None)
+        usage_block = {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+        stream = stream_response(content, tool_calls, usage_block if usage else None, behavior)
+        return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(run())
+    assert chunks[-1] == "data: [DONE]\n\n"
+    assert all(c.startswith("data: ") and c.endswith("\n\n") for c in chunks)
+    return [json.loads(c[6:]) for c in chunks[:-1]]
+
+
+def test_stream_chunks_content():
+    chunks = collect("Hello there world", None, usage=False)
+    deltas = [c["choices"][0]["delta"] for c in chunks]
+    assert deltas[0] == {"role": "assistant", "content": ""}
+    assert "".join(d.get("content", "") for d in deltas) == "Hello there world"
+    assert len(deltas) == 5  # Role, three words, finish
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+    assert len({c["id"] for c in chunks}) == 1
+
+
+def test_stream_chunks_tool_calls_and_usage():
+    call: dict[str, Any] = {
+        "id": "c1",
+        "function": {"name": "bash", "arguments": '{"command": "ls -la"}'},
+    }
+    chunks = collect(None, [call], usage=True)
+    assert chunks[-1]["usage"]["total_tokens"] == 3
+    assert chunks[-1]["choices"] == []
+    assert chunks[-2]["choices"][0]["finish_reason"] == "tool_calls"
+    deltas = [c["choices"][0]["delta"] for c in chunks[:-2]]
+    calls = [d["tool_calls"][0] for d in deltas if d.get("tool_calls")]
+    assert calls[0]["function"] == {"name": "bash", "arguments": ""}
+    assert "".join(c["function"]["arguments"] for c in calls) == call["function"]["arguments"]
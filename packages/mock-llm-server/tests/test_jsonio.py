@@ -0,0 +1,30 @@
+"""Tests for jsonio module."""
+
+import json
+
+import pytest
+from mock_llm import jsonio
+from mock_llm.jsonio import FastJSONResponse, dumps, loads
+
+VALUE = {"text": "héllo", "n": [1, 2.5, None, True], "nested": {"a": "b"}}
+
+
+def test_round_trip():
+    assert loads(dumps(VALUE)) == VALUE
+
+
+def test_stdlib_fallback(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(jsonio, "orjson", None)
+    encoded = dumps(VALUE)
+    # Compact and not ASCII-escaped, like orjson
+    assert encoded == json.dumps(VALUE, separators=(",", ":"), ensure_ascii=False).encode()
+    assert loads(encoded) == VALUE
+    with pytest.raises(ValueError):
+        loads(b"{not json")
+
+
+def test_fast_json_response():
+    response = FastJSONResponse({"ok": True}, status_code=201)
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert json.loads(bytes(response.body)) == {"ok": True}
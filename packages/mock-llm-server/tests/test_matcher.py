@@ -0,0 +1,45 @@
+"""Tests for matcher module."""
+
+from random import Random
+
+from mock_llm.matcher import TriggerMatcher
+
+
+def brute_force(triggers: list[str], text: str) -> int | None:
+    return next((i for i, trigger in enumerate(triggers) if trigger in text), None)
+
+
+def test_first_scenario_wins():
+    matcher = TriggerMatcher(["world", "hello", "hello world"])
+    assert matcher.first_match("say hello world") == 0
+    assert matcher.first_match("hello there") == 1
+    assert matcher.first_match("nothing here") is None
+
+
+def test_overlapping_triggers():
+    triggers = ["she", "he", "hers", "his", "ushers"]
+    matcher = TriggerMatcher(triggers)
+    for text in ("ushers", "hers", "ahishers", "h", "sh", "xhe"):
+        assert matcher.first_match(text) == brute_force(triggers, text), text
+
+
+def test_empty_input_and_triggers():
+    assert TriggerMatcher([]).first_match("anything") is None
+    assert TriggerMatcher(["a"]).first_match("") is None
+    # An empty trigger matches everything, like a substring test
+    assert TriggerMatcher(["zzz", "", "b"]).first_match("abc") == 1
+    assert TriggerMatcher(["zzz", "", "b"]).first_match("") == 1
+    assert TriggerMatcher(["b", ""]).first_match("abc") == 0
+
+
+def test_matches_brute_force():
+    rng = Random(1)
+    for _ in range(300):
+        triggers = [
+            "".join(rng.choice("abc") for _ in range(rng.randint(0, 4)))
+            for _ in range(rng.randint(1, 8))
+        ]
+        matcher = TriggerMatcher(triggers)
+        for _ in range(10):
+            text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 12)))
+            assert matcher.first_match(text) == brute_force(triggers, text), (triggers, text)
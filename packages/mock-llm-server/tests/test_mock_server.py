@@ -0,0 +1,21 @@
+"""Tests for the mock server's HTTP endpoints."""
+
+from fastapi.testclient import TestClient
+from mock_llm.server import app
+
+
+def test_chat_completions():
+    response = TestClient(app).post(
+        "/chat/completions", json={"messages": [{"role": "user", "content": "how are you"}]}
+    )
+    assert response.status_code == 200
+    assert response.json()["choices"][0]["message"]["role"] == "assistant"
+
+
+def test_malformed_body_is_400():
+    client = TestClient(app)
+    response = client.post("/chat/completions", content=b"{not json")
+    assert response.status_code == 400
+    assert response.json()["error"]["type"] == "invalid_request_error"
+    assert client.post("/chat/completions", content=b"[]").status_code == 400
+    assert client.get("/stats").json()["errors"]["400"] >= 2
@@ -0,0 +1,93 @@
+"""Tests for recorder module."""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from mock_llm import server as server_module
+from mock_llm.recorder import RecordingStore, UpstreamProxy, fingerprint, normalize_request
+
+
+def request(content: str = "hello  world", call_id: str = "call_1") -> dict[str, Any]:
+    return {
+        "model": "gpt-x",
+        "temperature": 0.2,
+        "stream": True,
+        "messages": [
+            {"role": "user", "content": content},
+            {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": call_id,
+                        "function": {"name": "read_file", "arguments": '{"path": "a.txt"}'},
+                    }
+                ],
+            },
+        ],
+        "tools": [{"function": {"name": "write_file"}}, {"function": {"name": "read_file"}}],
+    }
+
+
+def test_normalize_request():
+    assert normalize_request(request()) == {
+        "messages": [
+            {"role": "user", "content": "hello world"},
+            {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{"name": "read_file", "arguments": {"path": "a.txt"}}],
+            },
+        ],
+        "tools": ["read_file", "write_file"],
+    }
+
+
+def test_fingerprint_ignores_ids_whitespace_and_options():
+    other = request(" hello world ", call_id="call_2")
+    other["model"] = "other"
+    other["messages"][1]["tool_calls"][0]["function"]["arguments"] = '{"path":"a.txt"}'
+    assert fingerprint(other) == fingerprint(request())
+    assert fingerprint(request("goodbye")) != fingerprint(request())
+
+
+def test_store_lookup_hit_and_miss(tmp_path: Path):
+    store = RecordingStore(tmp_path)
+    assert store.lookup(request()) is None
+    path = store.save(request(), {"id": "r1"})
+    assert path == tmp_path / f"{fingerprint(request())}.json"
+    assert store.lookup(request()) == {"id": "r1"}
+
+    # Recorded by another process after this store started
+    key = fingerprint(request("later"))
+    record = {"fingerprint": key, "request": request("later"), "response": {"id": "r2"}}
+    (tmp_path / f"{key}.json").write_text(json.dumps(record))
+    assert RecordingStore(tmp_path).lookup(request("later")) == {"id": "r2"}
+    assert store.lookup(request("later")) == {"id": "r2"}
+
+    (tmp_path / f"{fingerprint(request('broken'))}.json").write_text("{")
+    assert store.lookup(request("broken")) is None
+
+
+def test_replay_completion(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    store = RecordingStore(tmp_path)
+    monkeypatch.setattr(server_module, "recordings", store)
+    miss = asyncio.run(server_module.replay_completion(request()))
+    assert miss.status_code == 404
+    assert fingerprint(request()) in bytes(miss.body).decode()
+
+    message = {"role": "assistant", "content": "recorded"}
+    store.save(request(), {"choices": [{"message": message, "finish_reason": "stop"}]})
+    hit = asyncio.run(server_module.replay_completion({**request(), "stream": False}))
+    assert hit.status_code == 200
+    assert json.loads(bytes(hit.body))["choices"][0]["message"]["content"] == "recorded"
+
+
+def test_upstream_unreachable_is_502():
+    proxy = UpstreamProxy("http://127.0.0.1:9", timeout=2)
+    status, body = asyncio.run(proxy.complete(request()))
+    assert status == 502
+    assert body["error"]["code"] == 502
@@ -0,0 +1,35 @@
+"""Tests for stats module."""
+
+import pytest
+from mock_llm import stats as stats_module
+from mock_llm.stats import Stats
+
+
+def test_counters():
+    stats = Stats()
+    stats.record("hello")
+    stats.record("hello")
+    stats.record("default", 429)
+    stats.record("default", 500)
+    data = stats.to_dict()
+    assert data["requests"] == 4
+    assert data["scenario_hits"] == {"hello": 2, "default": 2}
+    assert data["errors"] == {"429": 1, "500": 1}
+
+
+def test_rate_counts_completed_seconds(monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(stats_module.time, "monotonic", lambda: now[0])
+    stats = Stats()
+    for second in range(990, 1000):
+        now[0] = second + 0.5
+        for _ in range(3):
+            stats.record("s")
+    now[0] = 1000.2
+    stats.record("s")  # The current second isn't counted yet
+    assert stats.to_dict()["requests_per_second"] == 3.0
+    # Old seconds are dropped as new ones come in
+    now[0] = 1030.0
+    stats.record("s")
+    assert stats.to_dict()["requests_per_second"] == 0.0
+    assert stats.to_dict()["requests"] == 32